@@ -0,0 +1,115 @@
+"""
+Re-run the current parsers over archived raw captures and rebuild history.
+
+    python backfill.py --since 2026-08-01 --until 2026-08-31 [--source lmsys]
+                       [--workers 4] [--output-dir data/backfill] [--apply]
+
+Captures are grouped per day (the latest capture of each source that day)
+and re-parsed in a process pool. --apply writes each day's rebuilt
+snapshots into the history store in place of that day's runs (keeping the
+live run's time, or the capture time for a day without one); without it
+the run is a dry run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compare import DeltaEngine
+from scrapers.registry import available_sources, load_source
+from utils.capture_archive import ARCHIVE_DIR, CaptureArchive
+
+
+def _reparse(job):
+    root, source_name, kind, digest = job
+    spec = load_source(source_name)
+    raw = CaptureArchive(root).load(digest)
+    # 解析函数中的诊断输出在批量回放时没有意义
+    with contextlib.redirect_stdout(io.StringIO()):
+        return spec.parse_capture(kind, raw)
+
+
+def select_runs(entries):
+    """{day: {source: entry}} keeping the latest capture per source per day."""
+    known = set(available_sources())
+    runs = {}
+    for entry in entries:
+        if entry["source"] not in known:
+            continue
+        runs.setdefault(entry["captured_at"][:10], {})[entry["source"]] = entry
+    return runs
+
+
+def to_updates(source_payloads):
+    updates = {}
+    for source_name, payload in source_payloads.items():
+        if payload:
+            updates.update(load_source(source_name).history_keys(payload))
+    return updates
+
+
+def reparse(archive, since=None, until=None, source_name=None, workers=None):
+    runs = select_runs(archive.entries(since, until, source_name))
+    jobs = sorted({
+        (archive.root, entry["source"], entry["kind"], entry["sha256"])
+        for per_source in runs.values()
+        for entry in per_source.values()
+    })
+
+    # 相同内容的抓取只解析一次
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = dict(zip(jobs, executor.map(_reparse, jobs)))
+
+    # {day: (run_at, {source: payload})}，run_at 取当天最后一次抓取的时间
+    results = {}
+    for day, per_source in sorted(runs.items()):
+        run_at = max(entry["captured_at"] for entry in per_source.values())
+        results[day] = run_at, {
+            name: parsed[(archive.root, name, entry["kind"], entry["sha256"])]
+            for name, entry in per_source.items()
+        }
+    return results, len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse archived captures and rebuild history.")
+    parser.add_argument("--since", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--source", choices=available_sources())
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    parser.add_argument("--output-dir", help="write each day's re-parsed results as JSON")
+    parser.add_argument("--apply", action="store_true", help="write the rebuilt snapshots into history")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, parsed_count = reparse(
+        CaptureArchive(args.archive), args.since, args.until, args.source, args.workers
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Re-parsed {parsed_count} unique captures across {len(results)} days in {elapsed:.2f}s.")
+
+    engine = DeltaEngine() if args.apply else None
+    applied = 0
+    for day, (run_at, source_payloads) in results.items():
+        updates = to_updates(source_payloads)
+        print(f"  {day}: {len(updates)} source/category entries")
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            with open(os.path.join(args.output_dir, f"{day}.json"), "w", encoding="utf-8") as f:
+                json.dump(updates, f, indent=4, ensure_ascii=False)
+        if engine is not None:
+            engine.update_many(updates, run_at=run_at, replace_day=True)
+            applied += len(updates)
+
+    if args.apply:
+        print(f"History rebuilt: {applied} snapshots across {len(results)} runs.")
+    else:
+        print("Dry run: pass --apply to write the rebuilt snapshots into history.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Delta computation benchmark: per-key DeltaEngine.compare vs. compare_batch.
+
+    python -m benchmarks.bench_batch_compare --categories 2000 --models 200
+
+Seeds a throwaway history store with two runs of synthetic rankings (the
+second shuffled, with some models replaced), then times both against the
+previous-run and 7-day baselines and checks they agree. compare_batch runs
+compare() once per key and adds the numeric frame used by highlights, so
+its cost over the loop is that frame; the gain is computing it once per
+run instead of once per consumer.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from compare import PREVIOUS, DeltaEngine
+
+
+def _ranking(category, models, rng, churn=0.0):
+    ids = [f"{category}/model-{i}" for i in range(models)]
+    ids = [f"{model_id}-v2" if rng.random() < churn else model_id for model_id in ids]
+    rng.shuffle(ids)
+    return [{"rank": rank, "model_id": model_id, "score": str(1500 - rank)} for rank, model_id in enumerate(ids, 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--categories", type=int, default=2000)
+    parser.add_argument("--models", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    categories = [f"bench_{i}" for i in range(args.categories)]
+    now = datetime.now()
+    baselines = (PREVIOUS, "7d")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 历史库与备份都放在临时目录，不写入项目数据
+        engine = DeltaEngine(
+            history_file=os.path.join(tmp, "none.json"),
+            db_file=os.path.join(tmp, "history.db"),
+            as_of=now,
+            backup_dir=os.path.join(tmp, "backups"),
+        )
+        start = time.perf_counter()
+        engine.update_many(
+            {c: _ranking(c, args.models, rng) for c in categories},
+            run_at=(now - timedelta(days=8)).isoformat(timespec="seconds"),
+        )
+        engine.update_many(
+            {c: _ranking(c, args.models, rng, churn=0.05) for c in categories},
+            run_at=(now - timedelta(days=1)).isoformat(timespec="seconds"),
+        )
+        current = {c: _ranking(c, args.models, rng, churn=0.05) for c in categories}
+        print(f"Seeded {args.categories} categories x {args.models} models in {time.perf_counter() - start:.2f}s")
+
+        # 基线排名索引两种方式共用，单独计时
+        start = time.perf_counter()
+        for c in categories:
+            for baseline in baselines:
+                engine.rank_index(c, baseline)
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        looped = {c: engine.compare(c, current[c], baselines) for c in categories}
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = engine.compare_batch(current, baselines)
+        batch_time = time.perf_counter() - start
+        # 报告每个 key 只渲染前 10 行
+        for c in categories:
+            batch.report(c, limit=10)
+        top_time = time.perf_counter() - start
+        reports = batch.reports()
+
+        engine.store.close()
+
+    rows = args.categories * args.models
+    print(f"Baseline rank indexes ({len(baselines)} baselines): {index_time:.2f}s")
+    print(f"Per-key compare():  {loop_time:.3f}s ({rows / loop_time:,.0f} rows/s)")
+    print(f"compare_batch():    {batch_time:.3f}s incl. numeric frame, {top_time:.3f}s incl. top-10 rows per key")
+    print(f"Dropped models found: {len(batch.dropped)}")
+    print(f"Results identical: {looped == reports}")
+
+
+if __name__ == "__main__":
+    main()
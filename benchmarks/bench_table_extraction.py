@@ -0,0 +1,96 @@
+"""
+Table extraction benchmark: per-row locator calls vs. one page.evaluate.
+
+    python -m benchmarks.bench_table_extraction --rows 400 --cols 8
+
+Renders a synthetic leaderboard table with page.set_content (no network) and
+reports the Playwright round trips and wall time of both strategies, for the
+Artificial Analysis row loop and the Arena matrix fallback parser.
+"""
+import argparse
+import asyncio
+import time
+
+from scrapers.browser_pool import BrowserPool
+from scrapers.lmsys_scraper import _parse_text_matrix_tables
+from scrapers.table_extract import extract_page_matrix, extract_table_matrices
+
+
+def _build_table_html(rows, cols):
+    headers = "".join(f"<th>{'Model' if c == 0 else f'Col {c}'}</th>" for c in range(cols))
+    body = "".join(
+        "<tr>" + "".join(
+            f"<td>model-{r}</td>" if c == 0 else f"<td>{(r * c) % rows + 1}</td>" for c in range(cols)
+        ) + "</tr>"
+        for r in range(rows)
+    )
+    return f"<table><tr>{headers}</tr>{body}</table>"
+
+
+async def _legacy_aa_rows(page, counter):
+    # 旧实现：每行一次 all_inner_texts()
+    await page.locator("th").all_inner_texts()
+    counter[0] += 1
+    rows = await page.locator("tr").all()
+    counter[0] += 1
+    cells = []
+    for row in rows:
+        cells.append(await row.locator("td, th").all_inner_texts())
+        counter[0] += 1
+    return cells
+
+
+async def _legacy_arena_matrix(page, counter):
+    # 旧实现：每个列头都重新读取一遍所有行
+    tables = await page.locator("table").all()
+    counter[0] += 1
+    total = 0
+    for table in tables:
+        headers = await table.locator("th").all_inner_texts()
+        counter[0] += 1
+        rows = await table.locator("tr").all()
+        counter[0] += 1
+        for _ in headers[1:]:
+            for row in rows[1:]:
+                total += len(await row.locator("td").all_inner_texts())
+                counter[0] += 1
+    return total
+
+
+async def _timed(label, coro_factory):
+    counter = [0]
+    start = time.perf_counter()
+    await coro_factory(counter)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} round trips={counter[0]:>6}  time={elapsed * 1000:9.1f} ms")
+
+
+async def run(rows, cols):
+    async with BrowserPool() as pool:
+        async with pool.context() as context:
+            page = await context.new_page()
+            await page.set_content(_build_table_html(rows, cols))
+
+            async def single_aa(counter):
+                await extract_page_matrix(page)
+                counter[0] += 1
+
+            async def single_arena(counter):
+                _parse_text_matrix_tables(await extract_table_matrices(page, "table", "td"))
+                counter[0] += 1
+
+            print(f"Table: {rows} rows x {cols} columns")
+            print("Artificial Analysis rows:")
+            await _timed("per-row locator (before)", lambda c: _legacy_aa_rows(page, c))
+            await _timed("single evaluate (after)", single_aa)
+            print("Arena matrix fallback:")
+            await _timed("per-column re-read (before)", lambda c: _legacy_arena_matrix(page, c))
+            await _timed("single evaluate (after)", single_arena)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--cols", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.cols))
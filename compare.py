@@ -1,89 +1,227 @@
 import os
-import shutil
-import json
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.history_backup import HistoryBackup, backup_history
+from utils.history_store import (
+    HISTORY_DB, LEGACY_HISTORY_FILE, HistoryStore, LatestHistory, import_legacy_file,
+)
+
+
+# 对比基线："previous" 为上一次运行，"7d" 等为 N 天前（含）最近一次运行，"first_seen" 为模型首次上榜时的排名
+PREVIOUS = "previous"
+FIRST_SEEN = "first_seen"
+DAYS_BASELINE = re.compile(r"^(\d+)d$")
+DEFAULT_BASELINES = (PREVIOUS,)
+
+
+def _rank_map(items):
+    # 同一快照中重复出现的模型以最后一条为准（与迁移前按列表构建 prev_map 一致）
+    ranks = {}
+    for item in items or []:
+        if not isinstance(item, dict) or "model_id" not in item:
+            continue
+        try:
+            ranks[item["model_id"]] = int(item["rank"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ranks
+
+
+def format_shift(prev_rank, curr_rank):
+    if prev_rank is None:
+        return "New"
+    shift = prev_rank - curr_rank
+    if shift > 0:
+        return f"↑{shift}"
+    if shift < 0:
+        return f"↓{abs(shift)}"
+    return "-"
+
+
+class BatchComparison:
+    """
+    compare() results of many keys against the same baselines, as returned
+    by DeltaEngine.compare_batch.
+
+    `frame` has one row per (key, model) in input order with `rank`,
+    `score` and, per baseline, `prev_rank_<b>`, `shift_<b>` (positive =
+    moved up; NaN for new models or an unavailable baseline), `new_<b>` and
+    the formatted `delta_<b>`. `dropped` lists models present in a baseline
+    but missing now (key, baseline, model_id, prev_rank).
+    """
+
+    def __init__(self, rows, frame, dropped, baselines):
+        self.rows = rows
+        self.frame = frame
+        self.dropped = dropped
+        self.baselines = tuple(baselines)
+
+    def report(self, key, limit=None):
+        """Rows of one key as returned by DeltaEngine.compare (the first `limit` only)."""
+        return self.rows.get(key, [])[:limit]
+
+    def reports(self):
+        return dict(self.rows)
+
 
 class DeltaEngine:
-    def __init__(self, history_file="data/history.json"):
+    """
+    Rank deltas of each source/category key against one or more baselines
+    (previous run, N days ago, first seen). History lives in an append-only
+    HistoryStore; `history` is a read-only {key: latest snapshot} view of it.
+    """
+
+    def __init__(self, history_file=LEGACY_HISTORY_FILE, db_file=HISTORY_DB, as_of=None, backup_dir=None):
+        # history.json 是迁移前的历史格式，仅在新库为空时导入一次
         self.history_file = history_file
-        self.history = self._load_history()
+        self.store = HistoryStore(db_file)
+        # 备份写在历史库所在的数据目录下（默认 data/backups），临时库不会写入项目数据
+        self.backup = HistoryBackup(backup_dir or os.path.join(os.path.dirname(db_file) or ".", "backups"))
+        self._import_legacy_history()
+        self.history = LatestHistory(self.store)
+        self.as_of = as_of or datetime.now()
+        # {(key, baseline): {model_id: rank} 或 None（基线不存在）}
+        self._rank_indexes = {}
 
-    def _load_history(self):
-        if os.path.exists(self.history_file):
-            with open(self.history_file, "r", encoding="utf-8-sig") as f:
-                return json.load(f)
-        return {}
+    def _import_legacy_history(self):
+        if not os.path.exists(self.history_file) or not self.store.is_empty():
+            return
+        count = import_legacy_file(self.store, self.history_file)
+        print(f"Imported {count} history keys from {self.history_file} into {self.store.db_file}.")
 
-    def compare(self, source_name, current_data):
-        """
-        current_data: list of dicts with 'model_id' and 'rank'
-        """
-        if not isinstance(current_data, list):
-            print(f"Warning: Expected list for {source_name}, got {type(current_data)}")
-            return []
+    def _build_rank_index(self, key, baseline):
+        if baseline == PREVIOUS:
+            return _rank_map(self.history.get(key, []))
+        if baseline == FIRST_SEEN:
+            return self.store.first_seen_ranks(key)
 
-        prev_data = self.history.get(source_name, [])
-        prev_map = {item["model_id"]: item["rank"] for item in prev_data if isinstance(item, dict) and "model_id" in item}
-        
-        report = []
+        match = DAYS_BASELINE.match(baseline)
+        if match is None:
+            raise ValueError(f"unknown baseline: {baseline}")
+        at = (self.as_of - timedelta(days=int(match.group(1)))).isoformat(timespec="seconds")
+        items = self.store.snapshot(key, at)
+        return None if items is None else _rank_map(items)
+
+    def rank_index(self, key, baseline=PREVIOUS):
+        """{model_id: rank} for `key` at `baseline`, or None when history does not reach back that far."""
+        if (key, baseline) not in self._rank_indexes:
+            self._rank_indexes[key, baseline] = self._build_rank_index(key, baseline)
+        return self._rank_indexes[key, baseline]
+
+    def _compared(self, source_name, current_data, baselines):
+        # compare() 与 compare_batch() 共用：各行结果、每行在各基线中的排名（None 为不在榜）及基线索引
+        indexes = {baseline: self.rank_index(source_name, baseline) for baseline in baselines}
+        rows, previous = [], {baseline: [] for baseline in baselines}
         for item in current_data:
             model_id = item.get("model_id")
             if not model_id: continue
-            
+
             curr_rank = int(item["rank"])
-            
-            if model_id not in prev_map:
-                diff = "New"
-            else:
-                prev_rank = int(prev_map[model_id])
-                shift = prev_rank - curr_rank
-                if shift > 0:
-                    diff = f"↑{shift}"
-                elif shift < 0:
-                    diff = f"↓{abs(shift)}"
-                else:
-                    diff = "-"
-            
-            report.append({
+            deltas = {}
+            for baseline, index in indexes.items():
+                prev_rank = None if index is None else index.get(model_id)
+                previous[baseline].append(prev_rank)
+                deltas[baseline] = None if index is None else format_shift(prev_rank, curr_rank)
+
+            rows.append({
                 "model_id": model_id,
                 "rank": curr_rank,
-                "delta": diff,
+                "delta": deltas[baselines[0]] or "-",
+                "deltas": deltas,
                 "score": item.get("score", "-")
             })
-            
-        return report
-
-    def _backup_history(self):
-        if os.path.exists(self.history_file):
-            backup_dir = "data/backups"
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"history_{timestamp}.json")
-            try:
-                shutil.copy2(self.history_file, backup_file)
-                # print(f"History backed up to {backup_file}")
-            except:
-                pass
-
-    def _save_history(self):
-        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-        with open(self.history_file, "w", encoding="utf-8") as f:
-            json.dump(self.history, f, indent=4, ensure_ascii=False)
-
-    def update_history(self, source_name, current_data):
-        # 备份旧的历史文件
-        self._backup_history()
-        self.history[source_name] = current_data
-        self._save_history()
-
-    def update_many(self, updates):
-        if not updates:
-            return
+        return rows, previous, indexes
 
-        self._backup_history()
-        for source_name, current_data in updates.items():
-            self.history[source_name] = current_data
-        self._save_history()
+    def compare(self, source_name, current_data, baselines=DEFAULT_BASELINES):
+        """
+        current_data: list of dicts with 'model_id' and 'rank'
 
+        Each row carries `deltas` ({baseline: "New" / "↑n" / "↓n" / "-", or
+        None when that baseline is unavailable}) and `delta`, the first
+        baseline's value.
+        """
+        if not isinstance(current_data, list):
+            print(f"Warning: Expected list for {source_name}, got {type(current_data)}")
+            return []
+        return self._compared(source_name, current_data, baselines)[0]
+
+    def compare_batch(self, current, baselines=DEFAULT_BASELINES):
+        """
+        compare() every (key, current list) pair, given as a dict or an
+        iterable of pairs, once per run; see BatchComparison for the result
+        shared by the console output, the report and highlights.
+        """
+        pairs = current.items() if isinstance(current, dict) else current
+        rows_by_key, dropped = {}, []
+        columns = {"key": [], "model_id": [], "rank": [], "score": []}
+        previous = {baseline: [] for baseline in baselines}
+        available = {baseline: [] for baseline in baselines}
+        deltas = {baseline: [] for baseline in baselines}
+        for key, items in pairs:
+            if not isinstance(items, list):
+                print(f"Warning: Expected list for {key}, got {type(items)}")
+                continue
+            rows, prev_ranks, indexes = self._compared(key, items, baselines)
+            rows_by_key.setdefault(key, []).extend(rows)
+            columns["key"].extend([key] * len(rows))
+            for name in ("model_id", "rank", "score"):
+                columns[name].extend(row[name] for row in rows)
+
+            current_ids = {row["model_id"] for row in rows}
+            for baseline, index in indexes.items():
+                previous[baseline].extend(prev_ranks[baseline])
+                available[baseline].extend([index is not None] * len(rows))
+                deltas[baseline].extend(row["deltas"][baseline] for row in rows)
+                dropped.extend(
+                    (key, baseline, model_id, prev_rank)
+                    for model_id, prev_rank in (index or {}).items()
+                    if model_id not in current_ids
+                )
+
+        # 数值列供高亮检测按位移与 z 值筛选，格式化后的变动与 compare() 的结果一致
+        frame = pd.DataFrame({
+            "key": pd.Series(columns["key"], dtype=object),
+            "model_id": pd.Series(columns["model_id"], dtype=object),
+            "rank": np.asarray(columns["rank"], dtype=np.int64),
+            "score": pd.Series(columns["score"], dtype=object),
+        })
+        for baseline in baselines:
+            prev = np.asarray([np.nan if r is None else r for r in previous[baseline]], dtype=np.float64)
+            frame[f"prev_rank_{baseline}"] = prev
+            frame[f"shift_{baseline}"] = prev - frame["rank"].to_numpy(dtype=np.float64)
+            frame[f"new_{baseline}"] = np.isnan(prev) & np.asarray(available[baseline], dtype=bool)
+            # object 列保留 None（str 列会把 None 转成 NaN）
+            frame[f"delta_{baseline}"] = pd.Series(deltas[baseline], dtype=object)
+
+        dropped = pd.DataFrame(dropped, columns=["key", "baseline", "model_id", "prev_rank"])
+        return BatchComparison(rows_by_key, frame, dropped, baselines)
+
+    def update_history(self, source_name, current_data, run_at=None):
+        self.update_many({source_name: current_data}, run_at)
+
+    def update_many(self, updates, run_at=None, replace_day=False):
+        """
+        Append this run's snapshots and return the run time; earlier runs are
+        kept as they are. With `replace_day` the snapshots replace the runs
+        of `run_at`'s day instead (see HistoryStore.replace_day).
+        """
+        if not updates:
+            return None
 
+        # 更新前后各备份一次（只写入有变化的 key）：更新后的备份使不入 git 的历史库
+        # 可由备份完整重建；更新前的状态通常已在上次备份中，此时不会追加条目
+        backup_history(dict(self.history), self.backup)
+        if replace_day:
+            self.store.replace_day(updates, run_at)
+        else:
+            run_at = self.store.append(updates, run_at)
+        self.history.refresh(updates.keys())
+        backup_history(dict(self.history), self.backup)
+        for key, baseline in list(self._rank_indexes):
+            if key in updates:
+                del self._rank_indexes[key, baseline]
+        return run_at
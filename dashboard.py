@@ -0,0 +1,245 @@
+"""
+Static rank-history dashboard, built incrementally.
+
+    python dashboard.py            # re-render pages whose data changed
+    python dashboard.py --rebuild  # seed the chart data from the history store
+
+Every source/category key tracked by DeltaEngine has an append-only chart
+data file, data/dashboard/<key>.jsonl, with one line per run:
+{"run_at": ..., "ranks": {model_id: rank}}. Each run appends the keys it
+updated and re-renders only their pages (reports/dashboard/<key>.html);
+manifest.json records what each page was rendered from, so unchanged
+pages are skipped. The index page is built from the manifest alone.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from collections import deque
+
+from utils.history_store import HISTORY_DB, HistoryStore
+
+
+DATA_DIR = "data/dashboard"
+PAGES_DIR = "reports/dashboard"
+MANIFEST_FILE = "manifest.json"
+# 每页图表只画最近若干次运行、最新一次运行的前若干名模型
+WINDOW = 90
+TOP_MODELS = 10
+PALETTE = (
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+)
+SLUG = re.compile(r"[^A-Za-z0-9_-]+")
+
+WIDTH, HEIGHT, PAD = 900, 360, 40
+
+
+def key_slug(key):
+    return SLUG.sub("_", key)
+
+
+def _ranks(items):
+    ranks = {}
+    for item in items or []:
+        if not isinstance(item, dict) or not item.get("model_id"):
+            continue
+        try:
+            ranks.setdefault(item["model_id"], int(item["rank"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ranks
+
+
+class Dashboard:
+    def __init__(self, data_dir=DATA_DIR, pages_dir=PAGES_DIR, window=WINDOW):
+        self.data_dir = data_dir
+        self.pages_dir = pages_dir
+        self.window = window
+        self.manifest = self._load_manifest()
+
+    def _manifest_path(self):
+        return os.path.join(self.data_dir, MANIFEST_FILE)
+
+    def _series_path(self, key):
+        return os.path.join(self.data_dir, f"{key_slug(key)}.jsonl")
+
+    def _page_name(self, key):
+        return f"{key_slug(key)}.html"
+
+    def _load_manifest(self):
+        path = self._manifest_path()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8-sig") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(self._manifest_path(), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1, ensure_ascii=False, sort_keys=True)
+
+    def append(self, key, run_at, items):
+        """Append one run of `key`; a run already recorded as the last line is skipped."""
+        entry = self.manifest.setdefault(key, {"runs": 0})
+        if entry.get("last_run") is not None and run_at <= entry["last_run"]:
+            return False
+        os.makedirs(self.data_dir, exist_ok=True)
+        line = json.dumps({"run_at": run_at, "ranks": _ranks(items)}, ensure_ascii=False, separators=(",", ":"))
+        with open(self._series_path(key), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        entry["runs"] += 1
+        entry["last_run"] = run_at
+        return True
+
+    def _recent(self, key):
+        # 只解析窗口内的行
+        path = self._series_path(key)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            lines = deque((line for line in f if line.strip()), maxlen=self.window)
+        return [json.loads(line) for line in lines]
+
+    def _chart(self, runs):
+        latest = runs[-1]["ranks"]
+        models = sorted(latest, key=latest.get)[:TOP_MODELS]
+        max_rank = max((rank for run in runs for m, rank in run["ranks"].items() if m in models), default=1)
+        step = (WIDTH - 2 * PAD) / max(len(runs) - 1, 1)
+
+        def y(rank):
+            return PAD + (rank - 1) * (HEIGHT - 2 * PAD) / max(max_rank - 1, 1)
+
+        shapes = []
+        for color, model in zip(PALETTE, models):
+            points = [
+                (PAD + i * step, y(run["ranks"][model]), run["run_at"], run["ranks"][model])
+                for i, run in enumerate(runs)
+                if model in run["ranks"]
+            ]
+            label = html.escape(model)
+            shapes.append(
+                f'<polyline fill="none" stroke="{color}" stroke-width="2" '
+                f'points="{" ".join(f"{px:.1f},{py:.1f}" for px, py, _, _ in points)}"><title>{label}</title></polyline>'
+            )
+            shapes.extend(
+                f'<circle cx="{px:.1f}" cy="{py:.1f}" r="3" fill="{color}"><title>{label} #{rank} ({run_at[:10]})</title></circle>'
+                for px, py, run_at, rank in points
+            )
+        axis = (
+            f'<text x="4" y="{PAD}" font-size="11">#1</text>'
+            f'<text x="4" y="{HEIGHT - PAD}" font-size="11">#{max_rank}</text>'
+            f'<text x="{PAD}" y="{HEIGHT - 8}" font-size="11">{runs[0]["run_at"][:10]}</text>'
+            f'<text x="{WIDTH - PAD}" y="{HEIGHT - 8}" font-size="11" text-anchor="end">{runs[-1]["run_at"][:10]}</text>'
+        )
+        legend = "".join(
+            f'<li><span style="color:{color}">■</span> #{latest[model]} {html.escape(model)}</li>'
+            for color, model in zip(PALETTE, models)
+        )
+        svg = f'<svg viewBox="0 0 {WIDTH} {HEIGHT}" width="100%">{axis}{"".join(shapes)}</svg>'
+        return svg, legend
+
+    def _render_page(self, key, runs):
+        svg, legend = self._chart(runs)
+        title = html.escape(key)
+        page = (
+            f'<!DOCTYPE html>\n<html lang="zh-CN"><head><meta charset="utf-8"><title>{title} 排名走势</title>'
+            "<style>body{font-family:sans-serif;max-width:960px;margin:auto;padding:1em}ul{columns:2}</style>"
+            f'</head><body><p><a href="index.html">← 全部榜单</a></p><h1>{title} 排名走势</h1>'
+            f"<p>最近 {len(runs)} 次运行，最新一次前 {TOP_MODELS} 名模型</p>{svg}<ul>{legend}</ul></body></html>\n"
+        )
+        os.makedirs(self.pages_dir, exist_ok=True)
+        with open(os.path.join(self.pages_dir, self._page_name(key)), "w", encoding="utf-8") as f:
+            f.write(page)
+
+    def _render_index(self):
+        rows = "".join(
+            f'<tr><td><a href="{self._page_name(key)}">{html.escape(key)}</a></td>'
+            f"<td>{entry.get('runs', 0)}</td><td>{(entry.get('last_run') or '-')[:10]}</td>"
+            f"<td>{html.escape(entry.get('leader') or '-')}</td></tr>"
+            for key, entry in sorted(self.manifest.items())
+        )
+        page = (
+            '<!DOCTYPE html>\n<html lang="zh-CN"><head><meta charset="utf-8"><title>排名走势</title>'
+            "<style>body{font-family:sans-serif;max-width:960px;margin:auto;padding:1em}"
+            "table{border-collapse:collapse;width:100%}td,th{border:1px solid #ddd;padding:4px 8px;text-align:left}</style>"
+            "</head><body><h1>📈 排名走势</h1><table><thead><tr><th>榜单</th><th>运行次数</th><th>最近更新</th>"
+            f"<th>当前第一</th></tr></thead><tbody>{rows}</tbody></table></body></html>\n"
+        )
+        os.makedirs(self.pages_dir, exist_ok=True)
+        with open(os.path.join(self.pages_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(page)
+
+    def render(self, keys=None):
+        """Re-render the pages of `keys` (None means every key) whose chart data changed."""
+        rendered = 0
+        for key in self.manifest if keys is None else keys:
+            entry = self.manifest.get(key)
+            if entry is None:
+                continue
+            runs = self._recent(key)
+            if not runs:
+                continue
+            digest = hashlib.sha256(json.dumps(runs, sort_keys=True).encode("utf-8")).hexdigest()
+            page = os.path.join(self.pages_dir, self._page_name(key))
+            if entry.get("rendered") == digest and os.path.exists(page):
+                continue
+            self._render_page(key, runs)
+            latest = runs[-1]["ranks"]
+            entry["leader"] = min(latest, key=latest.get) if latest else None
+            entry["rendered"] = digest
+            rendered += 1
+        self._render_index()
+        self._save_manifest()
+        return rendered
+
+    def update(self, updates, run_at):
+        """Append this run's {key: items} and re-render only those keys."""
+        changed = [key for key, items in updates.items() if self.append(key, run_at, items)]
+        return self.render(changed)
+
+    def rebuild(self, store):
+        """Seed the chart data of every key from the history store, keeping what is already there."""
+        keys = store.keys()
+        for key in keys:
+            last_run = self.manifest.get(key, {}).get("last_run")
+            for run_at in store.runs(key):
+                if last_run is None or run_at > last_run:
+                    self.append(key, run_at, store.run_snapshot(key, run_at))
+        return self.render(keys)
+
+
+def update_dashboard(updates, run_at):
+    # 看板更新失败不应影响本次运行
+    try:
+        return Dashboard().update(updates, run_at)
+    except Exception as e:
+        print(f"Warning: could not update dashboard: {e}")
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental rank-history dashboard.")
+    parser.add_argument("--db", default=HISTORY_DB)
+    parser.add_argument("--rebuild", action="store_true", help="seed chart data from the history store")
+    args = parser.parse_args()
+
+    dashboard = Dashboard()
+    start = time.perf_counter()
+    if args.rebuild:
+        store = HistoryStore(args.db)
+        rendered = dashboard.rebuild(store)
+        store.close()
+    else:
+        rendered = dashboard.render()
+    print(f"Rendered {rendered} of {len(dashboard.manifest)} pages in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Highlight detection on numeric rank shifts and score changes.
+
+Every source/category key has its own volatility: the root-mean-square of
+run-to-run rank shifts (and of score changes) of all its models over the
+key's last WINDOW runs. The whole window is read in one query and reduced
+with a single groupby. A movement is significant when its z-score against
+that volatility reaches Z_THRESHOLD, and highlights are ranked across all
+sources by |z| rather than listed in source order.
+
+A key with fewer than MIN_SAMPLES observed shifts uses a volatility of one
+place, which is the old fixed "moved by 2 or more" rule.
+"""
+import numpy as np
+import pandas as pd
+
+from compare import PREVIOUS
+from report_model import Highlights, Mover
+
+
+WINDOW = 30
+MIN_SAMPLES = 10
+# 排名极稳定的榜单也至少要变动 2 位才算显著
+MIN_RANK_SIGMA = 0.75
+Z_THRESHOLD = 2.0
+# 分数没有"无历史时"的默认尺度，只在波动已知时判断，且阈值更严格
+SCORE_Z_THRESHOLD = 3.0
+
+
+def numeric_scores(scores):
+    """Scores as floats; anything that is not a plain number (e.g. "$0.5", "10m") becomes NaN."""
+    text = pd.Series(scores, dtype=object).astype(str).str.replace(",", "", regex=False).str.rstrip("%")
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype=np.float64)
+
+
+class HighlightEngine:
+    def __init__(self, store, window=WINDOW):
+        self.store = store
+        self.window = window
+        self._volatility = None
+        self._last_scores = None
+
+    def _load(self):
+        rows = self.store.recent_entries(self.window)
+        history = pd.DataFrame(rows, columns=["key", "run_at", "model_id", "rank", "score"])
+        if history.empty:
+            self._volatility = pd.DataFrame(columns=["rank_sigma", "rank_n", "score_sigma", "score_n"])
+            self._last_scores = pd.Series(dtype=np.float64)
+            return
+
+        # 同一快照中重复出现的模型以最后一条（排名靠后）为准，与 compare 一致
+        history = history.sort_values(["key", "run_at", "rank"]).drop_duplicates(
+            ["key", "run_at", "model_id"], keep="last"
+        )
+        history["score"] = numeric_scores(history["score"])
+        history["run"] = history.groupby("key")["run_at"].rank(method="dense")
+        history = history.sort_values(["key", "model_id", "run"])
+
+        # 只比较同一模型在该榜相邻两次运行之间的变化
+        by_model = history.groupby(["key", "model_id"], sort=False)
+        consecutive = (history["run"] - by_model["run"].shift()) == 1
+        rank_shift = (by_model["rank"].shift() - history["rank"]).where(consecutive)
+        score_change = (history["score"] - by_model["score"].shift()).where(consecutive)
+        # 均方根：平方后按 key 求均值（NaN 不计入）再开方
+        by_key = pd.DataFrame({
+            "key": history["key"],
+            "rank_sq": rank_shift ** 2,
+            "score_sq": score_change ** 2,
+        }).groupby("key")
+        means, counts = by_key.mean(), by_key.count()
+        self._volatility = pd.DataFrame({
+            "rank_sigma": np.sqrt(means["rank_sq"]),
+            "rank_n": counts["rank_sq"],
+            "score_sigma": np.sqrt(means["score_sq"]),
+            "score_n": counts["score_sq"],
+        })
+
+        last_run = history.groupby("key")["run"].transform("max")
+        latest = history[history["run"] == last_run]
+        self._last_scores = latest.set_index(["key", "model_id"])["score"]
+
+    @property
+    def volatility(self):
+        """DataFrame indexed by key: rank_sigma, rank_n, score_sigma, score_n over the window."""
+        if self._volatility is None:
+            self._load()
+        return self._volatility
+
+    def _sigmas(self, keys):
+        volatility = self.volatility
+        known = volatility["rank_n"] >= MIN_SAMPLES
+        rank_sigma = keys.map(volatility["rank_sigma"].where(known))
+        score_known = (volatility["score_n"] >= MIN_SAMPLES) & (volatility["score_sigma"] > 0)
+        score_sigma = keys.map(volatility["score_sigma"].where(score_known))
+        return rank_sigma.astype(np.float64), score_sigma.astype(np.float64)
+
+    def detect(self, frame, labels, weekly_baseline=None, weekly_min_shift=3):
+        """Highlights of a BatchComparison frame; `labels` maps each key to its display label."""
+        if frame.empty:
+            return Highlights(weekly_min_shift=weekly_min_shift, z_threshold=Z_THRESHOLD)
+
+        rank_sigma, score_sigma = self._sigmas(frame["key"])
+        z = frame[f"shift_{PREVIOUS}"] / rank_sigma.clip(lower=MIN_RANK_SIGMA).fillna(1.0)
+        last_scores = self._last_scores.reindex(pd.MultiIndex.from_frame(frame[["key", "model_id"]])).to_numpy()
+        score_change = numeric_scores(frame["score"]) - last_scores
+        # 先在整表上加列再筛选；波动未知（历史不足）时不展示 z 值
+        frame = frame.assign(
+            _source=frame["key"].map(labels),
+            _z=z,
+            _shown=z.where(rank_sigma.notna()),
+            _score_delta=[f"{change:+g}" for change in score_change],
+            _score_z=score_change / score_sigma,
+        )
+
+        new_models = frame.loc[frame[f"new_{PREVIOUS}"]].sort_values("rank", kind="stable")
+        ups = frame.loc[frame["_z"] >= Z_THRESHOLD].sort_values("_z", ascending=False, kind="stable")
+        downs = frame.loc[frame["_z"] <= -Z_THRESHOLD].sort_values("_z", kind="stable")
+        scores = frame.loc[frame["_score_z"].abs() >= SCORE_Z_THRESHOLD]
+        scores = scores.iloc[(-scores["_score_z"].abs()).argsort(kind="stable")]
+
+        def movers(rows, delta_column, z_column="_shown"):
+            return [
+                Mover(m, label, delta, None if pd.isna(zv) else round(float(zv), 1))
+                for m, label, delta, zv in zip(rows["model_id"], rows["_source"], rows[delta_column], rows[z_column])
+            ]
+
+        # 近 N 日变动仍按固定位数筛选，按变动幅度全局排序
+        weekly = []
+        if weekly_baseline is not None:
+            weekly_shift = frame[f"shift_{weekly_baseline}"]
+            rows = frame.loc[weekly_shift.abs() >= weekly_min_shift].assign(_none=None)
+            rows = rows.iloc[(-weekly_shift[rows.index].abs()).argsort(kind="stable")]
+            weekly = movers(rows, f"delta_{weekly_baseline}", "_none")
+
+        return Highlights(
+            new_models=[Mover(m, label) for m, label in zip(new_models["model_id"], new_models["_source"])],
+            big_ups=movers(ups, f"delta_{PREVIOUS}"),
+            big_downs=movers(downs, f"delta_{PREVIOUS}"),
+            weekly=weekly,
+            score_moves=movers(scores, "_score_delta", "_score_z"),
+            weekly_min_shift=weekly_min_shift,
+            z_threshold=Z_THRESHOLD,
+        )
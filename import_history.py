@@ -0,0 +1,241 @@
+"""
+Import past backups and reports into the ranking history store.
+
+    python import_history.py [--backups data/backups] [--reports reports]
+                             [--workers 4] [--db data/history.db] [--dry-run]
+
+Sources, oldest first:
+- legacy `history_*.json` backups;
+- packed backups in the backup manifest;
+- `reports/report_*.md` tables, which hold the top 10 only.
+
+Files are parsed in a process pool. Snapshots identical to the previous one
+stored for the same key are skipped. A report section is only used when no
+full snapshot exists for that key on that day. Imported files are recorded
+in the store, so re-running only picks up new or modified files.
+
+The database itself is not committed: rebuild_history() recreates it from
+these files (plus the legacy data/history.json) when it is missing, which
+main.py does at the start of every run on a fresh checkout.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapers.registry import enabled_sources
+from utils.fetch_cache import payload_hash
+from utils.history_backup import BACKUP_DIR, LEGACY_PATTERN, HistoryBackup
+from utils.history_store import HISTORY_DB, LEGACY_HISTORY_FILE, HistoryStore, import_legacy_file, scraped_run_at
+from utils.report_parser import parse_report, report_run_at
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+REPORTS_DIR = "reports"
+# 快照来源：完整备份，或报告表格（仅前 10 名，同一天已有完整快照时不导入）
+FULL = "backup"
+PARTIAL = "report"
+
+
+def _timestamp_iso(timestamp):
+    # 20260821_033251 -> 2026-08-21T03:32:51
+    return f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}T{timestamp[9:11]}:{timestamp[11:13]}:{timestamp[13:15]}"
+
+
+def _history_snapshots(history, timestamp):
+    fallback = _timestamp_iso(timestamp)
+    return [
+        (key, scraped_run_at(items, fallback), items)
+        for key, items in history.items()
+        if isinstance(items, list) and items
+    ]
+
+
+def _parse_file(job):
+    """(name, origin, [(key, run_at, items)]) for one backup or report."""
+    kind, name, location = job
+    if kind == "legacy":
+        with open(location, "r", encoding="utf-8-sig") as f:
+            history = json.load(f)
+        timestamp = LEGACY_PATTERN.search(os.path.basename(location)).group(1)
+        return name, FULL, _history_snapshots(history, timestamp)
+    if kind == "packed":
+        history = HistoryBackup(location).restore(name.split(":", 1)[1]) or {}
+        return name, FULL, _history_snapshots(history, name.split(":", 1)[1])
+
+    with open(location, "r", encoding="utf-8") as f:
+        snapshots = parse_report(f.read(), enabled_sources())
+    run_at = report_run_at(location)
+    return name, PARTIAL, [(key, run_at, items) for key, items in snapshots.items()]
+
+
+def _file_fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def discover(backups_dir=BACKUP_DIR, reports_dir=REPORTS_DIR):
+    """{name: (job, fingerprint)} for every importable file."""
+    found = {}
+    for path in sorted(glob.glob(os.path.join(backups_dir, "history_*.json"))):
+        if LEGACY_PATTERN.search(os.path.basename(path)):
+            found[path] = (("legacy", path, path), _file_fingerprint(path))
+
+    for entry in HistoryBackup(backups_dir).manifest():
+        name = f"packed:{entry['timestamp']}"
+        # 增量清单只追加，同一时间戳的条目内容不会再变
+        found[name] = (("packed", name, backups_dir), payload_hash(entry))
+
+    for path in sorted(glob.glob(os.path.join(reports_dir, "report_*.md"))):
+        if report_run_at(path):
+            found[path] = (("report", path, path), _file_fingerprint(path))
+    return found
+
+
+class _KeyTimeline:
+    """Stored and pending snapshots of one key, for de-duplication."""
+
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+        self.runs = {run_at: None for run_at in store.runs(key)}
+        self.full_days = {run_at[:10] for run_at in self.runs}
+
+    def _hash(self, run_at):
+        if self.runs[run_at] is None:
+            self.runs[run_at] = payload_hash(self.store.run_snapshot(self.key, run_at))
+        return self.runs[run_at]
+
+    def accept(self, run_at, items, origin):
+        if origin == PARTIAL and run_at[:10] in self.full_days:
+            return False
+        # 每个 key 每次运行只保留一个快照（先到者优先），重复导入不会来回覆盖
+        if run_at in self.runs:
+            return False
+        digest = payload_hash(items)
+        previous = max((r for r in self.runs if r <= run_at), default=None)
+        if previous is not None and self._hash(previous) == digest:
+            return False
+        # 同一天内已有相同内容（如管道写入时间与抓取时间略有差异）
+        if any(r[:10] == run_at[:10] and self._hash(r) == digest for r in self.runs):
+            return False
+        self.runs[run_at] = digest
+        if origin == FULL:
+            self.full_days.add(run_at[:10])
+        return True
+
+
+def import_history(store, backups_dir=BACKUP_DIR, reports_dir=REPORTS_DIR, workers=None, dry_run=False):
+    found = discover(backups_dir, reports_dir)
+    imported = store.imported_fingerprints()
+    pending = {name: item for name, item in found.items() if imported.get(name) != item[1]}
+    jobs = [job for job, _ in pending.values()]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = list(executor.map(_parse_file, jobs, chunksize=8))
+
+    candidates = [
+        (run_at, 0 if origin == FULL else 1, key, items, origin)
+        for _, origin, snapshots in parsed
+        for key, run_at, items in snapshots
+    ]
+    # 按时间顺序处理，同一时刻完整备份优先于报告
+    candidates.sort(key=lambda c: c[:3])
+
+    timelines, runs = {}, {}
+    skipped = 0
+    for run_at, _, key, items, origin in candidates:
+        if key not in timelines:
+            timelines[key] = _KeyTimeline(store, key)
+        timeline = timelines[key]
+        if timeline.accept(run_at, items, origin):
+            runs.setdefault(run_at, {})[key] = items
+        else:
+            skipped += 1
+
+    stored = sum(len(updates) for updates in runs.values())
+    if not dry_run:
+        for run_at, updates in sorted(runs.items()):
+            store.append(updates, run_at)
+        store.mark_imported({name: fingerprint for name, (_, fingerprint) in pending.items()})
+
+    return {
+        "files_found": len(found),
+        "files_parsed": len(jobs),
+        "snapshots_parsed": len(candidates),
+        "snapshots_stored": stored,
+        "duplicates_skipped": skipped,
+        "runs": len(runs),
+    }
+
+
+def rebuild_history(
+    db_file=HISTORY_DB, history_file=LEGACY_HISTORY_FILE, backups_dir=BACKUP_DIR, reports_dir=REPORTS_DIR, workers=None,
+):
+    """
+    Build `db_file` when it does not exist: the legacy history.json first,
+    then the backups and reports. Returns import_history()'s stats, or None
+    if the database already exists.
+    """
+    if os.path.exists(db_file):
+        return None
+    # 先写入临时文件，重建中断时不会留下不完整的库
+    tmp_file = f"{db_file}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    store = HistoryStore(tmp_file)
+    try:
+        if os.path.exists(history_file):
+            import_legacy_file(store, history_file)
+        stats = import_history(store, backups_dir, reports_dir, workers)
+    finally:
+        store.close()
+    os.replace(tmp_file, db_file)
+    return stats
+
+
+def peak_rss_mb():
+    # Linux 上 ru_maxrss 单位为 KB；子进程取其中最大者
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import past backups and reports into the history store.")
+    parser.add_argument("--backups", default=BACKUP_DIR)
+    parser.add_argument("--reports", default=REPORTS_DIR)
+    parser.add_argument("--db", default=HISTORY_DB)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="parse and de-duplicate without writing")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    start = time.perf_counter()
+    stats = import_history(store, args.backups, args.reports, args.workers, args.dry_run)
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    rate = stats["files_parsed"] / elapsed if elapsed else 0.0
+    print(
+        f"Parsed {stats['files_parsed']}/{stats['files_found']} files in {elapsed:.2f}s ({rate:.1f} files/s): "
+        f"{stats['snapshots_stored']} snapshots stored across {stats['runs']} runs, "
+        f"{stats['duplicates_skipped']} duplicates skipped."
+    )
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"Peak RSS: {rss[0]:.1f} MB (importer), {rss[1]:.1f} MB (largest worker).")
+    if args.dry_run:
+        print("Dry run: nothing was written.")
+
+
+if __name__ == "__main__":
+    main()
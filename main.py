@@ -1,162 +1,179 @@
 import asyncio
-import json
 import os
 from datetime import datetime
 
-from compare import DeltaEngine
-from scrapers.artalanaly_scraper import scrape_artalanaly
-from scrapers.hf_leaderboard_scraper import scrape_hf_leaderboard
-from scrapers.lmsys_scraper import scrape_lmsys_hf
-from scrapers.openrouter_scraper import scrape_openrouter
-
-
-SOURCES = [
-    ("openrouter", "OpenRouter", "data/openrouter_current.json"),
-    ("lmsys", "LMSYS/Arena", "data/lmsys_current.json"),
-    ("artalanaly", "Artificial Analysis", "data/artalanaly_current.json"),
-    ("hf_leaderboard", "Hugging Face Leaderboard", "data/hf_leaderboard_current.json"),
-]
-STATUS_FILE = "data/source_status.json"
-
-
-def _load_json(file_path):
-    with open(file_path, "r", encoding="utf-8-sig") as f:
-        return json.load(f)
-
-
-def _clear_current_files():
-    for _, _, file_path in SOURCES:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-
-def _write_source_status(statuses):
-    os.makedirs("data", exist_ok=True)
-    with open(STATUS_FILE, "w", encoding="utf-8") as f:
-        json.dump(statuses, f, indent=4, ensure_ascii=False)
-
-
-async def _run_scrapers():
-    scraper_tasks = {
-        "openrouter": scrape_openrouter(),
-        "lmsys": scrape_lmsys_hf(),
-        "artalanaly": scrape_artalanaly(),
-        "hf_leaderboard": asyncio.to_thread(scrape_hf_leaderboard),
-    }
-    file_paths = {source_name: file_path for source_name, _, file_path in SOURCES}
-
-    results = await asyncio.gather(*scraper_tasks.values(), return_exceptions=True)
-    statuses = {}
-
-    for source_name, result in zip(scraper_tasks.keys(), results):
-        error = None
-        if isinstance(result, Exception):
-            success = False
-            error = repr(result)
-        else:
-            success = bool(result)
-
-        statuses[source_name] = {
-            "success": success,
-            "file": file_paths[source_name],
-            "has_current": os.path.exists(file_paths[source_name]),
-            "error": error,
+from scrapers.browser_pool import BrowserPool
+from scrapers.registry import enabled_sources
+from utils.capture_archive import CaptureArchive
+from utils.fetch_cache import UNCHANGED, FetchCache
+from utils.run_context import RunContext
+from utils.scheduler import ScraperScheduler
+
+
+# 调度参数：并发上限与重试次数；每个来源的总时限与对冲时机由其 SourceSpec 给出
+SCRAPER_CONCURRENCY = 4
+SCRAPER_RETRIES = 2
+
+
+def _scraper_job(spec, pool, cache, archive, context):
+    # 每次尝试都需要新的协程，因此传入工厂函数
+    return lambda: spec.fetch(pool, cache=cache, archive=archive, run_context=context)
+
+
+async def _run_scrapers(context, cache):
+    # 所有基于浏览器的抓取共用一个 Chromium 进程（首次使用时才启动），每个来源各自一个 BrowserContext
+    sources = context.sources
+    pool = BrowserPool()
+    archive = CaptureArchive()
+    specs = {spec.name: spec for spec in sources}
+
+    scheduler = ScraperScheduler(
+        concurrency=SCRAPER_CONCURRENCY,
+        deadlines={spec.name: spec.deadline for spec in sources},
+        retries=SCRAPER_RETRIES,
+        hedge_after={spec.name: spec.hedge_after for spec in sources if spec.hedge_after is not None},
+    )
+
+    try:
+        scraper_jobs = {spec.name: _scraper_job(spec, pool, cache, archive, context) for spec in sources}
+        outcomes = await scheduler.run(scraper_jobs)
+    finally:
+        await pool.close()
+
+    for source_name, outcome in outcomes.items():
+        result = outcome["result"]
+        context.statuses[source_name] = {
+            "success": bool(result),
+            "unchanged": result == UNCHANGED,
+            "file": specs[source_name].output_file,
+            "has_current": bool(result) and context.has_payload(source_name),
+            "error": outcome["error"],
+            "attempts": outcome["attempts"],
+            "latency": outcome["latency"],
+            "attempt_log": outcome["attempt_log"],
+            "metrics": pool.stats.get(source_name, {}),
             "timestamp": datetime.now().isoformat(),
         }
 
-    return statuses
-
-
-def _collect_history_updates(sources, statuses):
-    updates = {}
-
-    for source_name, _, file_path in sources:
-        if not statuses.get(source_name, {}).get("success"):
-            continue
-        if not os.path.exists(file_path):
-            continue
-
-        curr_data = _load_json(file_path)
-        if isinstance(curr_data, dict):
-            for cat, data in curr_data.items():
-                updates[f"{source_name}_{cat}"] = data
-        else:
-            updates[source_name] = curr_data
-
-    return updates
+    return context.statuses
 
 
 async def run_pipeline():
     print("=== LLM Trend Observer Pipeline Start ===")
     os.makedirs("data", exist_ok=True)
 
+    # 0. 先补发上次运行未送达的通知，再开始新的抓取
+    from utils.notifier import HubNotifier
+    from utils.outbox import Outbox
+
+    # 通知失败不能阻塞抓取：任何异常只打印警告
+    notifier = outbox = None
+    try:
+        notifier = HubNotifier()
+        outbox = Outbox()
+        if outbox.pending():
+            print("\n[0/4] Draining notification outbox...")
+            delivered, pending = await outbox.drain(notifier)
+            print(f"Outbox: {delivered} delivered, {pending} still pending.")
+    except Exception as e:
+        print(f"Warning: could not drain the notification outbox: {e!r}")
+
+    # 历史库不入 git：全新检出（如 CI）时由已提交的备份与报告重建
+    try:
+        from import_history import rebuild_history
+
+        stats = rebuild_history()
+        if stats is not None:
+            print(f"History store rebuilt: {stats['snapshots_stored']} snapshots across {stats['runs']} runs.")
+    except Exception as e:
+        print(f"Warning: could not rebuild the history store: {e!r}")
+
     # 1. Scraping
     print("\n[1/4] Running Scrapers...")
-    _clear_current_files()
-    statuses = await _run_scrapers()
-    _write_source_status(statuses)
-
-    for source_name, display_name, _ in SOURCES:
-        status = statuses[source_name]
-        if status["success"]:
+    sources = enabled_sources()
+    print(f"Enabled sources: {', '.join(spec.name for spec in sources)}")
+    # 各阶段之间通过内存中的运行上下文传递数据，*_current.json 等文件在运行结束时统一写出
+    context = RunContext(sources)
+    cache = FetchCache()
+    statuses = await _run_scrapers(context, cache)
+
+    for spec in sources:
+        display_name = spec.display_name
+        status = statuses[spec.name]
+        if status["unchanged"]:
+            print(f"Unchanged: {display_name} has not changed since the last run.")
+        elif status["success"]:
             print(f"Success: {display_name} scraping completed.")
         else:
             print(f"Warning: {display_name} scraping failed.")
             if status["error"]:
                 print(f"  Error: {status['error']}")
 
-    # 2. Comparison
+    # 2. Comparison（一次批量对比，控制台输出与报告共用结果）
     print("\n[2/4] Generating Delta Reports...")
-    engine = DeltaEngine()
+    from report_generator import ReportGenerator
 
-    for source_name, _, file_path in SOURCES:
-        if os.path.exists(file_path):
-            curr_data = _load_json(file_path)
+    generator = ReportGenerator(context=context)
+    comparison = generator.prepare()
 
+    for spec in sources:
+        source_name = spec.name
+        curr_data = context.payload(spec)
+        if statuses[source_name]["unchanged"]:
+            print(f"\nSkipping {source_name}: unchanged since last run.")
+        elif curr_data is not None:
             if isinstance(curr_data, dict):
                 print(f"\n[2/4] Processing Multi-Category source: {source_name}")
-                for cat, data in curr_data.items():
-                    full_key = f"{source_name}_{cat}"
-                    report = engine.compare(full_key, data)
-
+                for full_key in spec.history_keys(curr_data):
                     print(f"\n--- {full_key.upper()} Delta Report ---")
-                    for r in report[:5]:
+                    for r in comparison.report(full_key)[:5]:
                         print(f"Rank {r['rank']}: {r['model_id']} ({r['delta']})")
             else:
-                report = engine.compare(source_name, curr_data)
-
                 print(f"\n--- {source_name.upper()} Delta Report ---")
-                for r in report[:10]:
+                for r in comparison.report(source_name)[:10]:
                     print(f"Rank {r['rank']}: {r['model_id']} ({r['delta']})")
         else:
-            print(f"Skipping {source_name}: Data file not found.")
+            print(f"Skipping {source_name}: No data this run.")
 
     # 3. Report Generation
     print("\n[3/4] Generating Markdown Report...")
-    from report_generator import ReportGenerator
-
-    generator = ReportGenerator()
     report_path = generator.generate()
     print(f"Technician Report created at: {report_path}")
 
     print("\n[3.5/4] Updating History...")
-    updates = _collect_history_updates(SOURCES, statuses)
-    engine.update_many(updates)
+    updates = context.history_updates()
+    run_at = context.engine.update_many(updates)
     print(f"History updated for {len(updates)} source/category entries.")
+    if run_at:
+        from dashboard import update_dashboard
+
+        rendered = update_dashboard(updates, run_at)
+        print(f"Dashboard: {rendered} pages re-rendered.")
+
+    # 运行结果落盘：抓取文件、数据源状态与抓取缓存（缓存最后写，保证与文件一致）
+    context.persist()
+    cache.save()
 
     # 4. Notification
     print("\n[4/4] Notification System...")
-    if os.path.exists(report_path):
-        from utils.notifier import HubNotifier
+    if report_path:
+        from utils.notify_payload import PayloadBuilder, report_link
 
-        notifier = HubNotifier()
-        with open(report_path, "r", encoding="utf-8") as f:
-            report_content = f.read()
+        # 直接使用已渲染好的报告各部分，按各渠道的大小上限分段或改发摘要
+        payloads = PayloadBuilder(generator.report, generator.parts, link=report_link(report_path))
 
         report_title = f"🔭 大模型今日趋势 {datetime.now().strftime('%m-%d')}"
-        success = notifier.send_all(report_content, report_title)
-        if success:
-            print("Notification triggered successfully.")
+        # 先写入 outbox 再发送；未送达的条目由下次运行或 `python notify.py --drain` 补发
+        try:
+            notifier = notifier or HubNotifier()
+            outbox = outbox or Outbox()
+            entries = outbox.enqueue_report(notifier, payloads, report_title, report=report_path)
+            delivered, pending = await outbox.drain(notifier)
+        except Exception as e:
+            print(f"Warning: notification failed: {e!r}")
+            entries, delivered, pending = [], 0, 0
+        if entries and delivered:
+            print(f"Notification triggered successfully ({delivered} delivered, {pending} pending).")
         else:
             print("Notification failed or skipped (Check credentials).")
     else:
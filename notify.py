@@ -0,0 +1,41 @@
+"""
+Deliver pending notifications without scraping.
+
+    python notify.py --drain                 # send pending outbox entries
+    python notify.py --drain --retry-failed  # also retry entries that gave up
+    python notify.py                         # list the outbox
+
+Only the notification channels are used; no browser or scraper is started.
+"""
+import argparse
+import asyncio
+
+from utils.notifier import HubNotifier
+from utils.outbox import MAX_ATTEMPTS, OUTBOX_FILE, Outbox
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification outbox.")
+    parser.add_argument("--outbox", default=OUTBOX_FILE)
+    parser.add_argument("--drain", action="store_true", help="deliver pending notifications")
+    parser.add_argument(
+        "--retry-failed", action="store_true", help=f"with --drain, also retry entries that failed {MAX_ATTEMPTS} times"
+    )
+    args = parser.parse_args()
+
+    outbox = Outbox(args.outbox)
+    if args.drain:
+        delivered, pending = asyncio.run(outbox.drain(HubNotifier(), include_failed=args.retry_failed))
+        print(f"Delivered {delivered} notification(s); {pending} still pending.")
+        return
+
+    for entry in outbox.entries:
+        print(
+            f"{entry['id']:<36} {entry['status']:<8} {entry['sent']}/{entry['messages']} sent, "
+            f"{entry['attempts']} attempt(s)  {entry['last_error'] or ''}"
+        )
+    print(f"{len(outbox.pending())} pending of {len(outbox.entries)}.")
+
+
+if __name__ == "__main__":
+    main()
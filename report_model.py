@@ -0,0 +1,107 @@
+"""
+Typed intermediate representation of one trend report.
+
+ReportGenerator.build() fills a Report once per run; the renderers in
+report_renderers.py turn the same Report into Markdown, HTML, JSON and a
+plain-text digest. Row objects use __slots__ and carry the source's raw
+item, looked up once per section through a {model_id: item} index.
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Optional
+
+
+# 数据源状态：state -> (图标, 说明)
+STATUS_TEXT = {
+    "unchanged": ("♻️", "数据与上次一致，沿用上次结果"),
+    "ok": ("✅", "本次抓取成功"),
+    "fallback": ("⚠️", "本次抓取缺失，报告沿用历史数据"),
+    "failed": ("❌", "本次抓取失败，暂无可用数据"),
+    "missing": ("⚠️", "本次抓取未产出数据文件"),
+}
+# 表格数据不代表当次运行的状态；建立索引或从报告回放历史时跳过这些来源
+STALE_STATES = ("fallback", "failed", "missing")
+
+
+@dataclass(slots=True)
+class Row:
+    idx: int
+    rank: int
+    model_id: str
+    score: object
+    delta: str
+    deltas: dict
+    raw: dict
+    canonical_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Section:
+    """One source (or source category) table."""
+
+    key: str
+    source: str
+    category: Optional[str]
+    title: str
+    subtitle: tuple
+    columns: tuple
+    rows: list
+
+
+@dataclass(slots=True)
+class SourceStatus:
+    source: str
+    label: str
+    state: str
+
+    @property
+    def icon(self):
+        return STATUS_TEXT[self.state][0]
+
+    @property
+    def message(self):
+        return STATUS_TEXT[self.state][1]
+
+
+@dataclass(slots=True)
+class Mover:
+    model_id: str
+    label: str
+    delta: Optional[str] = None
+    # 相对该榜近期波动的 z 值；历史不足时为 None
+    z: Optional[float] = None
+
+
+@dataclass(slots=True)
+class Highlights:
+    new_models: list = field(default_factory=list)
+    big_ups: list = field(default_factory=list)
+    big_downs: list = field(default_factory=list)
+    weekly: list = field(default_factory=list)
+    score_moves: list = field(default_factory=list)
+    weekly_min_shift: int = 3
+    z_threshold: float = 2.0
+    limit: int = 8
+
+    def __bool__(self):
+        return bool(self.new_models or self.big_ups or self.big_downs or self.weekly or self.score_moves)
+
+
+@dataclass(slots=True)
+class Report:
+    generated_at: datetime
+    links: list
+    # None 表示不输出数据源状态区（单独生成报告且没有状态记录时）
+    statuses: Optional[list]
+    highlights: Highlights
+    sections: list
+
+    @property
+    def title(self):
+        return f"大模型今日趋势-{self.generated_at.strftime('%m-%d')}"
+
+    def to_dict(self):
+        data = asdict(self)
+        data["generated_at"] = self.generated_at.isoformat(timespec="seconds")
+        data["title"] = self.title
+        return data
@@ -0,0 +1,259 @@
+"""
+Renderers turning one report_model.Report into each output format.
+
+Every renderer has an `extension` and `render(report) -> str`; RENDERERS
+maps the format name to its class. MarkdownRenderer also exposes the
+report as named parts and reuses unchanged tables from a RenderCache.
+"""
+import html
+import json
+import re
+
+from report_model import STALE_STATES
+from utils.render_cache import section_key
+
+
+FOOTER = "*Report generated by LLM Trend Observer System*"
+INLINE_CODE = re.compile(r"`([^`]*)`")
+BOLD = re.compile(r"\*\*([^*]*)\*\*")
+ITALIC = re.compile(r"\*([^*]+)\*")
+
+
+class _RawFields(dict):
+    # 列模板中引用的原始字段缺失时显示 "-"
+    def __missing__(self, key):
+        return "-"
+
+
+def format_delta(delta):
+    if delta == "New":
+        return "🆕 **New**"
+    elif "↑" in delta:
+        return f"🟢 {delta}"
+    elif "↓" in delta:
+        return f"🔴 {delta}"
+    else:
+        return "⚪ -"
+
+
+def mover_groups(highlights):
+    """[(title, movers, delta formatter)] of the ranked highlight lists, in display order."""
+    return [
+        (f"📈 排名显著上升 (z≥{highlights.z_threshold:g})", highlights.big_ups, format_delta),
+        (f"📉 排名显著下跌 (z≤-{highlights.z_threshold:g})", highlights.big_downs, format_delta),
+        (f"📆 近 7 日排名大幅变动 (≥{highlights.weekly_min_shift} 位)", highlights.weekly, format_delta),
+        ("📊 分数显著变化", highlights.score_moves, str),
+    ]
+
+
+def _mover_detail(mover, formatter):
+    detail = formatter(mover.delta)
+    return detail if mover.z is None else f"{detail}, z={mover.z:+.1f}"
+
+
+def _cells(section, row, escape=None):
+    # 按来源的列模板格式化一行；escape 用于 HTML 转义各字段
+    escape = escape or (lambda value: value)
+    fields = {
+        "idx": row.idx,
+        "rank": escape(row.rank),
+        "model_id": escape(row.model_id),
+        "score": escape(row.score),
+        "delta": format_delta(row.delta),
+        "raw": _RawFields({key: escape(value) for key, value in row.raw.items()}),
+    }
+    return [template.format(**fields) for _, template in section.columns]
+
+
+class MarkdownRenderer:
+    extension = "md"
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def _header(self, report):
+        links = " | ".join(f"[{text}]({url})" for text, url in report.links)
+        return f"""# 🤖 {report.title}
+> 📅 **生成时间**: `{report.generated_at.strftime("%Y-%m-%d %H:%M:%S")}`
+> 📊 **数据源**: {links}
+
+---
+
+"""
+
+    def _status(self, report):
+        if report.statuses is None:
+            return ""
+        lines = ["## 🧭 数据源状态", ""]
+        lines.extend(f"- {status.icon} {status.label}: {status.message}" for status in report.statuses)
+        lines.extend(["", "---", ""])
+        return "\n".join(lines)
+
+    def _highlights(self, report):
+        highlights = report.highlights
+        if not highlights:
+            return "## 🔍 今日显著变动\n本期排名相对稳定，未检测到显著异常变动。\n\n---\n\n"
+
+        limit = highlights.limit
+        lines = ["## 🔍 今日显著变动\n\n"]
+        if highlights.new_models:
+            lines.append("### 🆕 新上榜模型\n")
+            lines.extend(f"- `{m.model_id}` — *{m.label}*\n" for m in highlights.new_models[:limit])
+        for title, movers, formatter in mover_groups(highlights):
+            if movers:
+                lines.append(f"\n### {title}\n")
+                lines.extend(f"- `{m.model_id}` ({_mover_detail(m, formatter)}) — *{m.label}*\n" for m in movers[:limit])
+        lines.append("\n---\n\n")
+        return "".join(lines)
+
+    def _build_section(self, section):
+        headers = [header for header, _ in section.columns]
+        lines = [f"## {section.title}\n"]
+        lines.extend(f"{line}\n" for line in section.subtitle)
+        lines.append("\n| " + " | ".join(headers) + " |\n")
+        lines.append("| " + " | ".join(":---" for _ in headers) + " |\n")
+        lines.extend("| " + " | ".join(_cells(section, row)) + " | \n" for row in section.rows)
+        return "".join(lines)
+
+    def section(self, section):
+        """One table, reused from the render cache when its inputs are unchanged."""
+        if self.cache is None:
+            return self._build_section(section)
+        rows = [(row.idx, row.rank, row.model_id, row.score, row.delta, row.raw) for row in section.rows]
+        key = section_key(section.title, list(section.subtitle), list(section.columns), rows)
+        return self.cache.render(key, lambda: self._build_section(section))
+
+    def parts(self, report):
+        """[(name, Markdown)] of the whole report in order; joining them gives the report."""
+        # 显著变动放在最前面
+        parts = [
+            ("header", self._header(report)),
+            ("status", self._status(report)),
+            ("highlights", self._highlights(report)),
+        ]
+        # 各来源章节：第一个来源紧接摘要，之后每个来源以分隔线开头
+        previous_source = None
+        for section in report.sections:
+            section_md = self.section(section)
+            if previous_source is None:
+                parts.append((section.key, section_md))
+            elif section.source != previous_source:
+                parts.append((section.key, f"\n---\n\n{section_md}"))
+            else:
+                parts.append((section.key, f"\n{section_md}"))
+            previous_source = section.source
+        parts.append(("footer", f"\n---\n{FOOTER}"))
+        return parts
+
+    def render(self, report):
+        return "".join(md for _, md in self.parts(report))
+
+
+def _escape(value):
+    return html.escape(str(value))
+
+
+class HTMLRenderer:
+    extension = "html"
+
+    def _inline(self, text):
+        # 列模板中的 Markdown 行内标记
+        text = BOLD.sub(r"<strong>\1</strong>", INLINE_CODE.sub(r"<code>\1</code>", text))
+        return ITALIC.sub(r"<em>\1</em>", text)
+
+    def _movers(self, title, movers, limit):
+        if not movers:
+            return ""
+        items = "".join(
+            f"<li><code>{html.escape(m.model_id)}</code>"
+            + (f" ({html.escape(_mover_detail(m, str))})" if m.delta else "")
+            + f" — <em>{html.escape(m.label)}</em></li>"
+            for m in movers[:limit]
+        )
+        return f"<h3>{html.escape(title)}</h3><ul>{items}</ul>"
+
+    def _section(self, section):
+        head = "".join(f"<th>{html.escape(header)}</th>" for header, _ in section.columns)
+        body = "".join(
+            "<tr>" + "".join(f"<td>{self._inline(cell)}</td>" for cell in _cells(section, row, escape=_escape)) + "</tr>"
+            for row in section.rows
+        )
+        subtitle = "".join(f"<p>{self._inline(html.escape(line))}</p>" for line in section.subtitle)
+        return (
+            f'<section id="{html.escape(section.key)}"><h2>{html.escape(section.title)}</h2>{subtitle}'
+            f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table></section>"
+        )
+
+    def render(self, report):
+        links = " | ".join(f'<a href="{html.escape(url)}">{html.escape(text)}</a>' for text, url in report.links)
+        parts = [
+            '<!DOCTYPE html>\n<html lang="zh-CN"><head><meta charset="utf-8">',
+            f"<title>{html.escape(report.title)}</title>",
+            "<style>body{font-family:sans-serif;max-width:960px;margin:auto;padding:1em}"
+            "table{border-collapse:collapse;width:100%}td,th{border:1px solid #ddd;padding:4px 8px;text-align:left}"
+            "code{background:#f4f4f4;padding:0 3px}</style></head><body>",
+            f"<h1>🤖 {html.escape(report.title)}</h1>",
+            f"<p>📅 生成时间: <code>{report.generated_at.strftime('%Y-%m-%d %H:%M:%S')}</code><br>📊 数据源: {links}</p>",
+        ]
+        if report.statuses is not None:
+            items = "".join(
+                f"<li>{status.icon} {html.escape(status.label)}: {status.message}</li>" for status in report.statuses
+            )
+            parts.append(f"<h2>🧭 数据源状态</h2><ul>{items}</ul>")
+
+        highlights = report.highlights
+        parts.append("<h2>🔍 今日显著变动</h2>")
+        if highlights:
+            limit = highlights.limit
+            parts.append(self._movers("🆕 新上榜模型", highlights.new_models, limit))
+            parts.extend(self._movers(title, movers, limit) for title, movers, _ in mover_groups(highlights))
+        else:
+            parts.append("<p>本期排名相对稳定，未检测到显著异常变动。</p>")
+
+        parts.extend(self._section(section) for section in report.sections)
+        parts.append(f"<hr><p><em>{FOOTER.strip('*')}</em></p></body></html>\n")
+        return "".join(parts)
+
+
+class JSONRenderer:
+    extension = "json"
+
+    def render(self, report):
+        return json.dumps(report.to_dict(), indent=1, ensure_ascii=False, default=str)
+
+
+class DigestRenderer:
+    """Short plain-text summary: source problems, highlights and each table's top entries."""
+
+    extension = "txt"
+
+    def __init__(self, top=3):
+        self.top = top
+
+    def render(self, report):
+        lines = [report.title, ""]
+        problems = [s for s in report.statuses or [] if s.state in STALE_STATES]
+        lines.extend(f"{s.icon} {s.label}: {s.message}" for s in problems)
+
+        highlights = report.highlights
+        if highlights.new_models:
+            lines.append("新上榜: " + ", ".join(m.model_id for m in highlights.new_models[:highlights.limit]))
+        for title, movers in (("上升", highlights.big_ups), ("下跌", highlights.big_downs), ("分数", highlights.score_moves)):
+            if movers:
+                lines.append(f"{title}: " + ", ".join(f"{m.model_id} {m.delta}" for m in movers[:highlights.limit]))
+        if not highlights:
+            lines.append("本期排名相对稳定。")
+
+        for section in report.sections:
+            top = ", ".join(
+                f"{row.idx}. {row.model_id}" + (f" ({row.delta})" if row.delta not in ("-", None) else "")
+                for row in section.rows[:self.top]
+            )
+            lines.append(f"[{section.title}] {top}")
+        return "\n".join(lines) + "\n"
+
+
+RENDERERS = {
+    renderer.extension: renderer
+    for renderer in (MarkdownRenderer, HTMLRenderer, JSONRenderer, DigestRenderer)
+}
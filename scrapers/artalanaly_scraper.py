@@ -1,176 +1,275 @@
 import asyncio
-import json
-import os
-from playwright.async_api import async_playwright
 from datetime import datetime
 
-async def scrape_artalanaly():
+from scrapers.browser_pool import DEFAULT_USER_AGENT, borrow_context, record_stat
+from scrapers.network_capture import ResponseCapture, iter_record_lists, pick
+from scrapers.readiness import stable_count, wait_until_ready
+from scrapers.registry import SectionStyle, SourceSpec
+from scrapers.resource_filter import ResourceFilter
+from scrapers.table_extract import extract_page_matrix
+from utils.capture_archive import archive_capture
+from utils.fetch_cache import UNCHANGED, save_current
+
+OUTPUT_FILE = "data/artalanaly_current.json"
+CATEGORY_LABELS = {
+    "Intelligence": "智力/质量指数",
+    "Speed": "吞吐速度",
+    "Price": "价格",
+}
+
+# 就绪条件：表格行数 >= READY_MIN_ROWS 且连续两次轮询不变
+READY_MIN_ROWS = 10
+READY_BUDGET = 30.0
+
+# 排行榜数据随 Next.js RSC/JSON 请求下发
+CAPTURE_URL_PATTERNS = ("artificialanalysis.ai",)
+MODEL_KEYS = ("model_name", "name", "model", "short_name")
+PROVIDER_KEYS = ("host_label", "host", "provider", "api_provider")
+INTELLIGENCE_KEYS = ("artificial_analysis_intelligence_index", "intelligence_index", "quality_index")
+SPEED_KEYS = ("median_output_tokens_per_second", "output_speed", "tokens_per_second")
+PRICE_KEYS = ("price_1m_blended_3_to_1", "blended_price", "price")
+
+# embed 页面只依赖自有域名的脚本与数据，除默认拦截项外无需放行
+RESOURCE_ALLOWLIST = ()
+
+
+def _parse_val(val):
+    v = val.strip().replace("$", "").replace("%", "").replace("/M", "").replace(",", "")
+    if "k" in v.lower():
+        v = float(v.lower().replace("k", "")) * 1000
+    elif "m" in v.lower():
+        v = float(v.lower().replace("m", "")) * 1000000
+    try:
+        return float(v)
+    except:
+        return None
+
+
+def _parse_table_rows(rows_cells):
+    all_data = []
+    for cells in rows_cells:
+        if not cells or len(cells) < 7: continue
+
+        # Check if it's a header-like row (skip rows like Row 0 and Row 1 from dump)
+        if "Model" in cells[1] or "API" in cells[0]:
+            continue
+
+        provider = cells[0].strip()
+        model_name = cells[1].strip()
+        # Construct ID: Model (Provider)
+        full_id = f"{model_name} ({provider})"
+
+        all_data.append({
+            "model_id": full_id,
+            "model_base": model_name,
+            "intelligence_raw": cells[4].strip(),
+            "intelligence": _parse_val(cells[4]),
+            "price_raw": cells[5].strip(),
+            "price": _parse_val(cells[5]),
+            "speed_raw": cells[6].strip(),
+            "speed": _parse_val(cells[6]),
+            "timestamp": datetime.now().isoformat()
+        })
+    return all_data
+
+
+def _label(value):
+    if isinstance(value, dict):
+        value = pick(value, "name", "label", "short_name")
+    return value.strip() if isinstance(value, str) else None
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _format_price(value):
+    if value is None:
+        return "-"
+    # 与页面一致：常规价格保留两位小数，极低价格保留有效数字 ($0.0042)
+    return f"${value:.2f}" if value >= 0.1 else f"${value:.2g}"
+
+
+def _map_models_payload(payload):
+    """
+    Map captured model/host records to the same rows _parse_table_rows builds
+    from the DOM, with *_raw strings formatted like the rendered table.
+    """
+    for records in iter_record_lists(payload):
+        all_data = []
+        for record in records:
+            model_name = _label(pick(record, *MODEL_KEYS))
+            provider = _label(pick(record, *PROVIDER_KEYS))
+            intel_val = _number(pick(record, *INTELLIGENCE_KEYS))
+            speed_val = _number(pick(record, *SPEED_KEYS))
+            price_val = _number(pick(record, *PRICE_KEYS))
+            if not model_name or not provider or all(v is None for v in (intel_val, speed_val, price_val)):
+                continue
+            all_data.append({
+                "model_id": f"{model_name} ({provider})",
+                "model_base": model_name,
+                "intelligence_raw": f"{round(intel_val)}" if intel_val is not None else "-",
+                "intelligence": intel_val,
+                "price_raw": _format_price(price_val),
+                "price": price_val,
+                "speed_raw": f"{round(speed_val):,}" if speed_val is not None else "-",
+                "speed": speed_val,
+                "timestamp": datetime.now().isoformat()
+            })
+        if len(all_data) >= READY_MIN_ROWS:
+            return all_data
+    return None
+
+
+def _top_unique(all_data, field, reverse, keep=lambda value: True):
+    items = sorted(
+        [d for d in all_data if d[field] is not None and keep(d[field])],
+        key=lambda x: x[field],
+        reverse=reverse
+    )
+    ranked = []
+    seen = set()
+    for item in items:
+        if item["model_base"] not in seen:
+            ranked.append({
+                "rank": len(ranked) + 1,
+                "model_id": item["model_id"],
+                "score": item[f"{field}_raw"]
+            })
+            seen.add(item["model_base"])
+        if len(ranked) >= 10: break
+    return ranked
+
+
+def _rank_categories(all_data):
+    # --- Deduplicate and Sort ---
+    return {
+        # 1. Intelligence (Descending)
+        "Intelligence": _top_unique(all_data, "intelligence", reverse=True),
+        # 2. Speed (Descending)
+        "Speed": _top_unique(all_data, "speed", reverse=True),
+        # 3. Price (Ascending, ignore $0.00)
+        "Price": _top_unique(all_data, "price", reverse=False, keep=lambda value: value > 0),
+    }
+
+
+def _detect_columns(headers):
+    col_map = {}
+    for i, h in enumerate(headers):
+        h_clean = h.lower()
+        if "model" in h_clean: col_map["model"] = i
+        if "quality" in h_clean or "intelligence" in h_clean or "index" in h_clean:
+            col_map["intelligence"] = i
+        if "tokens/sec" in h_clean or "speed" in h_clean or "throughput" in h_clean:
+            col_map["speed"] = i
+        if "price" in h_clean or "cost" in h_clean:
+            col_map["price"] = i
+    return col_map
+
+
+def _parse_page_matrix(matrix):
+    # The embedded page typically has a table with columns like:
+    # Model, Quality Index, Speed/Throughput, Price
+
+    # Try to identify columns
+    print(f"Found headers: {matrix['headers']}")
+    print(f"Detected column mapping: {_detect_columns(matrix['headers'])}")
+
+    print(f"Found {len(matrix['rows'])} rows total.")
+    return _parse_table_rows(matrix["rows"])
+
+
+# 原始抓取 (kind -> 解析函数)，供存档回放/重新解析使用
+CAPTURE_PARSERS = {
+    "page_matrix": _parse_page_matrix,
+    "models_payload": _map_models_payload,
+}
+
+
+def parse_capture(kind, raw):
+    return _rank_categories(CAPTURE_PARSERS[kind](raw) or [])
+
+
+async def scrape_artalanaly(pool=None, cache=None, archive=None, run_context=None):
     print("Starting Artificial Analysis Scrape (Embed Leaderboard)...")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-        )
+    resource_filter = ResourceFilter(allow=RESOURCE_ALLOWLIST)
+    async with borrow_context(
+        pool, resource_filter=resource_filter, user_agent=DEFAULT_USER_AGENT
+    ) as context:
         page = await context.new_page()
-        
+        capture = ResponseCapture(page, CAPTURE_URL_PATTERNS)
+
         try:
             url = "https://artificialanalysis.ai/embed/llm-performance-leaderboard"
             print(f"Navigating to {url}...")
-            await page.goto(url, wait_until="networkidle", timeout=60000)
-            
-            # Artificial Analysis usually loads a large table. 
-            # We need to wait for it.
-            await asyncio.sleep(5)
-            
-            # The embedded page typically has a table with columns like:
-            # Model, Quality Index, Speed/Throughput, Price
-            
-            results = {
-                "Intelligence": [],
-                "Speed": [],
-                "Price": []
-            }
-            
-            # Try to identify columns
-            headers = await page.locator("th").all_inner_texts()
-            print(f"Found headers: {headers}")
-            
-            col_map = {}
-            for i, h in enumerate(headers):
-                h_clean = h.lower()
-                if "model" in h_clean: col_map["model"] = i
-                if "quality" in h_clean or "intelligence" in h_clean or "index" in h_clean: 
-                    col_map["intelligence"] = i
-                if "tokens/sec" in h_clean or "speed" in h_clean or "throughput" in h_clean:
-                    col_map["speed"] = i
-                if "price" in h_clean or "cost" in h_clean:
-                    col_map["price"] = i
-            
-            print(f"Detected column mapping: {col_map}")
-            
-            # Diagnostic: Save HTML and Screenshot (Disabled to avoid redundant files)
-            # await page.screenshot(path="artalanaly_debug.png")
-            # content = await page.content()
-            # with open("artalanaly_debug.html", "w", encoding="utf-8") as f:
-            #     f.write(content)
-            # print("Debug screenshot and HTML saved.")
-
-            rows = await page.locator("tr").all()
-            all_data = []
-            
-            print(f"Found {len(rows)} rows total.")
-            for i, row in enumerate(rows):
-                cells = await row.locator("td, th").all_inner_texts()
-                if not cells or len(cells) < 7: continue
-                
-                # Check if it's a header-like row (skip rows like Row 0 and Row 1 from dump)
-                if "Model" in cells[1] or "API" in cells[0]:
-                    continue
-
-                provider = cells[0].strip()
-                model_name = cells[1].strip()
-                # Construct ID: Model (Provider)
-                full_id = f"{model_name} ({provider})"
-                
-                def parse_val(val):
-                    v = val.strip().replace("$", "").replace("%", "").replace("/M", "").replace(",", "")
-                    if "k" in v.lower():
-                        v = float(v.lower().replace("k", "")) * 1000
-                    elif "m" in v.lower():
-                        v = float(v.lower().replace("m", "")) * 1000000
-                    try:
-                        return float(v)
-                    except:
-                        return None
-
-                intel_val = parse_val(cells[4])
-                price_val = parse_val(cells[5])
-                speed_val = parse_val(cells[6])
-
-                all_data.append({
-                    "model_id": full_id,
-                    "model_base": model_name,
-                    "intelligence_raw": cells[4].strip(),
-                    "intelligence": intel_val,
-                    "price_raw": cells[5].strip(),
-                    "price": price_val,
-                    "speed_raw": cells[6].strip(),
-                    "speed": speed_val,
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            if not all_data:
-                print("No data extracted from table rows.")
-                return False
+            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+
+            # Artificial Analysis usually loads a large table.
+            # We need to wait for it: either the structured payload arrives,
+            # or the row count stops changing.
+            table_settled = stable_count(lambda: page.locator("tr").count(), polls=2, minimum=READY_MIN_ROWS)
 
-            # --- Deduplicate and Sort ---
-            
-            # 1. Intelligence (Descending)
-            intel_list = sorted(
-                [d for d in all_data if d["intelligence"] is not None],
-                key=lambda x: x["intelligence"],
-                reverse=True
-            )
-            seen = set()
-            for item in intel_list:
-                if item["model_base"] not in seen:
-                    results["Intelligence"].append({
-                        "rank": len(results["Intelligence"]) + 1,
-                        "model_id": item["model_id"],
-                        "score": item["intelligence_raw"]
-                    })
-                    seen.add(item["model_base"])
-                if len(results["Intelligence"]) >= 10: break
-
-            # 2. Speed (Descending)
-            speed_list = sorted(
-                [d for d in all_data if d["speed"] is not None],
-                key=lambda x: x["speed"],
-                reverse=True
-            )
-            seen = set()
-            for item in speed_list:
-                if item["model_base"] not in seen:
-                    results["Speed"].append({
-                        "rank": len(results["Speed"]) + 1,
-                        "model_id": item["model_id"],
-                        "score": item["speed_raw"]
-                    })
-                    seen.add(item["model_base"])
-                if len(results["Speed"]) >= 10: break
-
-            # 3. Price (Ascending, ignore $0.00)
-            price_list = sorted(
-                [d for d in all_data if d["price"] is not None and d["price"] > 0],
-                key=lambda x: x["price"]
-            )
-            seen = set()
-            for item in price_list:
-                if item["model_base"] not in seen:
-                    results["Price"].append({
-                        "rank": len(results["Price"]) + 1,
-                        "model_id": item["model_id"],
-                        "score": item["price_raw"]
-                    })
-                    seen.add(item["model_base"])
-                if len(results["Price"]) >= 10: break
+            async def data_ready():
+                if capture.extract(_map_models_payload):
+                    return "models_payload", capture.matched_payload
+                if await table_settled():
+                    return "page_matrix", None
+                return None
+
+            ready, settle_time, outcome = await wait_until_ready(data_ready, budget=READY_BUDGET)
+            kind, raw = outcome or ("page_matrix", None)
+            if raw is None:
+                raw = await extract_page_matrix(page)
+            capture_mode = "network" if kind == "models_payload" else "dom"
+            record_stat(pool, "artalanaly", ready=ready, settle_time=settle_time, capture_mode=capture_mode)
+            archive_capture(archive, "artalanaly", kind, raw)
+
+            results = parse_capture(kind, raw)
 
             if any(results.values()):
-                os.makedirs("data", exist_ok=True)
-                with open("data/artalanaly_current.json", "w", encoding="utf-8") as f:
-                    json.dump(results, f, indent=4, ensure_ascii=False)
-                print("Success: Artificial Analysis data saved with correct indexing.")
-                return True
+                result = save_current("artalanaly", OUTPUT_FILE, results, cache, run_context)
+                if result == UNCHANGED:
+                    print("Artificial Analysis data unchanged since last run.")
+                else:
+                    print("Success: Artificial Analysis data saved with correct indexing.")
+                return result
             else:
                 print("Warning: No data extracted from Artificial Analysis.")
                 await page.screenshot(path="artalanaly_error.png")
                 return False
-                
+
         except Exception as e:
             print(f"Error during ArtalAnaly scrape: {e}")
             return False
         finally:
-            await browser.close()
+            record_stat(pool, "artalanaly", **resource_filter.summary())
+
+SOURCE = SourceSpec(
+    name="artalanaly",
+    label="Artificial Analysis",
+    display_name="Artificial Analysis",
+    output_file=OUTPUT_FILE,
+    fetch=scrape_artalanaly,
+    parse_capture=parse_capture,
+    link=("Artificial Analysis", "https://artificialanalysis.ai/"),
+    multi_category=True,
+    category_order=tuple(CATEGORY_LABELS),
+    deadline=180,
+    hedge_after=90,
+    section=SectionStyle(
+        title="💎 Artificial Analysis {category_label}",
+        subtitle=("*基于独立基准测试与性能追踪*",),
+        columns=(
+            ("排名", "{rank}"),
+            ("模型名称 (托管商)", "{model_id}"),
+            ("数值", "`{score}`"),
+            ("变动", "{delta}"),
+        ),
+        highlight_label="AA {category_label}",
+        category_labels=CATEGORY_LABELS,
+    ),
+)
+
 
 if __name__ == "__main__":
     asyncio.run(scrape_artalanaly())
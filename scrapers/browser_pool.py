@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/119.0.0.0 Safari/537.36"
+)
+
+
+class BrowserPool:
+    """
+    One Chromium process owned by the pipeline and shared by every
+    browser-based scraper. Each source borrows its own BrowserContext,
+    so cookies/cache stay isolated while the browser cold start is paid once.
+    """
+
+    def __init__(self, headless=True, max_contexts=4):
+        self.headless = headless
+        self.max_contexts = max_contexts
+        self._playwright = None
+        self._browser = None
+        self._start_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_contexts)
+        # 每个来源的抓取指标（就绪耗时等），由 main 合并进 source_status.json
+        self.stats = {}
+
+    def record(self, source_name, **values):
+        self.stats.setdefault(source_name, {}).update(values)
+
+    async def start(self):
+        async with self._start_lock:
+            if self._browser is None:
+                # 只有启用了浏览器来源时才需要加载 Playwright
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        return self
+
+    @asynccontextmanager
+    async def context(self, resource_filter=None, **kwargs):
+        await self.start()
+        async with self._slots:
+            context = await self._browser.new_context(**kwargs)
+            try:
+                if resource_filter is not None:
+                    await resource_filter.install(context)
+                yield context
+            finally:
+                await context.close()
+
+    async def close(self):
+        async with self._start_lock:
+            if self._browser is not None:
+                await self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+@asynccontextmanager
+async def borrow_context(pool=None, **kwargs):
+    """
+    Yield a BrowserContext from `pool`, or from a private single-use pool
+    when a scraper is run standalone. Accepts the same keyword arguments as
+    BrowserPool.context (including `resource_filter`).
+    """
+    if pool is not None:
+        async with pool.context(**kwargs) as context:
+            yield context
+        return
+
+    async with BrowserPool(max_contexts=1) as own_pool:
+        async with own_pool.context(**kwargs) as context:
+            yield context
+
+
+def record_stat(pool, source_name, **values):
+    print(f"[{source_name}] " + ", ".join(f"{k}={v}" for k, v in values.items()))
+    if pool is not None:
+        pool.record(source_name, **values)
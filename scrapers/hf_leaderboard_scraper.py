@@ -1,64 +1,267 @@
-import requests
-import json
+import heapq
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def scrape_hf_leaderboard():
+import requests
+from requests.adapters import HTTPAdapter
+
+from scrapers.registry import SectionStyle, SourceSpec
+from utils.capture_archive import archive_capture
+from utils.fetch_cache import UNCHANGED, save_current
+from utils.scheduler import run_cancellable
+
+OUTPUT_FILE = "data/hf_leaderboard_current.json"
+DATASET = "open-llm-leaderboard/contents"
+DATASETS_SERVER = "https://datasets-server.huggingface.co"
+MODEL_COLUMNS = ("fullname", "Model")
+SCORE_COLUMN = "Average ⬆️"
+TOP_K = 10
+# datasets-server 的 /rows 接口单页最多返回 100 行
+PAGE_SIZE = 100
+FETCH_WORKERS = 8
+
+
+def _session(pool_size=FETCH_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _candidate(model_id, average_score):
+    if not model_id or average_score is None:
+        return None
+    try:
+        score = round(float(average_score), 2)
+    except (TypeError, ValueError):
+        return None
+    if score != score:  # NaN
+        return None
+    return {
+        "model_id": model_id,
+        "score": score,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def _top_k(candidates, k=TOP_K):
+    # heapq.nlargest 等价于 sorted(..., reverse=True)[:k]（同分保持原顺序），但无需整表排序
+    top = heapq.nlargest(k, (c for c in candidates if c), key=lambda x: x["score"])
+    for i, item in enumerate(top):
+        item["rank"] = i + 1
+    return top
+
+
+def _parquet_urls(session, api_base=DATASETS_SERVER):
+    response = session.get(f"{api_base}/parquet", params={"dataset": DATASET}, timeout=30)
+    response.raise_for_status()
+    files = response.json().get("parquet_files", [])
+    return [
+        f["url"] for f in files
+        if f.get("config", "default") == "default" and f.get("split", "train") == "train"
+    ]
+
+
+def _is_url(source):
+    return isinstance(source, str) and source.startswith(("http://", "https://"))
+
+
+def _download_parquet(session, url, cache=None, conditional=False):
+    """Download one Parquet file; returns the response, or None on 304 Not Modified."""
+    headers = cache.validators("hf_leaderboard", url) if cache is not None and conditional else {}
+    response = session.get(url, headers=headers, timeout=60)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    return response
+
+
+def _load_parquet_sources(session, sources, cache=None):
     """
-    Scrape the top 10 models from Hugging Face Open LLM Leaderboard v2
-    using the HF Datasets API (datasets-server).
+    Resolve Parquet sources to readable files, using conditional GETs when a
+    previous result exists. Returns (files, {url: response}), or None when
+    every file is unchanged. The responses' validators are cached only once
+    the result parsed from them is saved (see save_current).
+    """
+    conditional = cache is not None and os.path.exists(OUTPUT_FILE)
+    loaded = [
+        _download_parquet(session, source, cache, conditional) if _is_url(source) else source
+        for source in sources
+    ]
+    if conditional and all(item is None for item in loaded):
+        return None
+    # 部分文件 304、部分有更新时，需要完整数据重新计算 top K
+    loaded = [
+        _download_parquet(session, source, cache) if item is None else item
+        for source, item in zip(sources, loaded)
+    ]
+    responses = {source: item for source, item in zip(sources, loaded) if _is_url(source)}
+    files = [io.BytesIO(item.content) if _is_url(source) else item for source, item in zip(sources, loaded)]
+    return files, responses
+
+
+def _read_parquet_rows(source):
+    """
+    Read only the model-name and score columns from a Parquet export and
+    yield (model_id, score) pairs. `source` is a local path or a file-like
+    object.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    available = set(parquet_file.schema_arrow.names)
+    model_columns = [c for c in MODEL_COLUMNS if c in available]
+    if not model_columns or SCORE_COLUMN not in available:
+        raise ValueError(f"Parquet export is missing expected columns: {sorted(available)[:10]}")
+
+    table = parquet_file.read(columns=model_columns + [SCORE_COLUMN])
+    names = [table.column(c).to_pylist() for c in model_columns]
+    scores = table.column(SCORE_COLUMN).to_pylist()
+
+    for i, score in enumerate(scores):
+        model_id = next((col[i] for col in names if col[i]), None)
+        yield model_id, score
+
+
+def _rows_page(session, api_base, offset, length=PAGE_SIZE):
+    response = session.get(
+        f"{api_base}/rows",
+        params={"dataset": DATASET, "config": "default", "split": "train", "offset": offset, "length": length},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _row_pairs(rows):
+    for item in rows:
+        row = item.get("row", {})
+        yield row.get("fullname") or row.get("Model"), row.get(SCORE_COLUMN)
+
+
+def _fetch_rows_concurrently(session, api_base=DATASETS_SERVER, workers=FETCH_WORKERS):
+    # 第一页同时拿到总行数，其余分页并发拉取（共用连接池）
+    first = _rows_page(session, api_base, 0)
+    total = first.get("num_rows_total") or len(first.get("rows", []))
+    offsets = range(PAGE_SIZE, total, PAGE_SIZE)
+
+    pages = [first]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages.extend(executor.map(lambda offset: _rows_page(session, api_base, offset), offsets))
+
+    pairs = []
+    for page in pages:
+        pairs.extend(_row_pairs(page.get("rows", [])))
+    return pairs, total
+
+
+def parse_capture(kind, raw, top_k=TOP_K):
+    # 原始抓取为投影后的 (model_id, score) 列表
+    if kind != "projected_rows":
+        raise KeyError(kind)
+    return _top_k((_candidate(model_id, score) for model_id, score in raw), top_k)
+
+
+def scrape_hf_leaderboard(
+    parquet_source=None, api_base=DATASETS_SERVER, top_k=TOP_K, cache=None, archive=None, run_context=None,
+    cancel_token=None,
+):
+    """
+    Scrape the top models from Hugging Face Open LLM Leaderboard v2 over the
+    whole `open-llm-leaderboard/contents` dataset.
+
+    Prefers the dataset's Parquet export (only the name/score columns are
+    read); falls back to the paginated rows API fetched concurrently.
+    `parquet_source` (local path or URL) and `api_base` can point at local
+    stand-ins. With a FetchCache, unchanged Parquet files (HTTP 304) or an
+    identical top K short-circuit to UNCHANGED. A cancelled `cancel_token`
+    keeps the result, and the validators of its download, from being saved.
     """
     print("Starting Hugging Face Open LLM Leaderboard Scrape (via API)...")
-    
-    # HF Datasets API endpoint for 'open-llm-leaderboard/contents'
-    # This dataset contains the actual leaderboard rankings.
-    url = "https://datasets-server.huggingface.co/rows?dataset=open-llm-leaderboard/contents&config=default&split=train&offset=0&limit=500"
-    
+
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        rows = data.get("rows", [])
-        if not rows:
-            print("No data found in HF Leaderboard dataset.")
-            return False
-            
-        leaderboard = []
-        for item in rows:
-            row = item.get("row", {})
-            model_id = row.get("fullname") or row.get("Model")
-            average_score = row.get("Average ⬆️")
-            
-            if model_id and average_score is not None:
-                leaderboard.append({
-                    "model_id": model_id,
-                    "score": round(float(average_score), 2),
-                    "timestamp": datetime.now().isoformat()
-                })
-        
-        # Sort by score descending and take top 10
-        leaderboard.sort(key=lambda x: x["score"], reverse=True)
-        top_10 = leaderboard[:10]
-        
-        # Add rank
-        for i, item in enumerate(top_10):
-            item["rank"] = i + 1
-            
-        if top_10:
-            os.makedirs("data", exist_ok=True)
-            output_file = "data/hf_leaderboard_current.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(top_10, f, indent=4, ensure_ascii=False)
-            print(f"HF Leaderboard Scrape successful. Data saved to {output_file}")
-            return True
+        session = _session()
+        pairs, validators = [], None
+
+        try:
+            sources = [parquet_source] if parquet_source else _parquet_urls(session, api_base)
+            if not sources:
+                raise ValueError("no Parquet export listed")
+            loaded = _load_parquet_sources(session, sources, cache)
+            if loaded is None:
+                if cancel_token is not None and cancel_token.cancelled:
+                    print("hf_leaderboard: attempt was cancelled; result discarded.")
+                    return False
+                print("HF Leaderboard: Parquet export not modified since last run.")
+                return UNCHANGED
+            files, responses = loaded
+            parquet_pairs = []
+            for parquet_file in files:
+                parquet_pairs.extend(_read_parquet_rows(parquet_file))
+            pairs, validators = parquet_pairs, responses
+            print(f"HF Leaderboard: read {len(pairs)} models from Parquet export.")
+        except Exception as e:
+            print(f"Parquet ingestion unavailable ({e}). Falling back to paginated rows API...")
+
+        if not pairs:
+            pairs, total = _fetch_rows_concurrently(session, api_base)
+            print(f"HF Leaderboard: fetched {len(pairs)}/{total} models from rows API.")
+
+        archive_capture(archive, "hf_leaderboard", "projected_rows", [list(pair) for pair in pairs])
+        top = parse_capture("projected_rows", pairs, top_k)
+
+        if top:
+            result = save_current(
+                "hf_leaderboard", OUTPUT_FILE, top, cache, run_context, cancel_token, validators=validators
+            )
+            if result == UNCHANGED:
+                print("HF Leaderboard top models unchanged since last run.")
+            else:
+                print(f"HF Leaderboard Scrape successful. Data saved to {OUTPUT_FILE}")
+            return result
         else:
             print("Failed to extract any valid models from HF Leaderboard.")
             return False
-            
+
     except Exception as e:
         print(f"Error during HF Leaderboard scrape: {e}")
         return False
 
+
+async def fetch_hf_leaderboard(pool=None, cache=None, archive=None, run_context=None):
+    # 纯 HTTP 来源，不占用浏览器；放到线程中执行以免阻塞其他来源。
+    # 超时或对冲落败被取消后线程仍会跑完，由 cancel_token 阻止其写入结果
+    return await run_cancellable(scrape_hf_leaderboard, cache=cache, archive=archive, run_context=run_context)
+
+
+SOURCE = SourceSpec(
+    name="hf_leaderboard",
+    label="HF Open LLM",
+    display_name="Hugging Face Leaderboard",
+    output_file=OUTPUT_FILE,
+    fetch=fetch_hf_leaderboard,
+    parse_capture=parse_capture,
+    link=("HF Open LLM", "https://huggingface.co/spaces/open-llm-leaderboard/open_llm_leaderboard"),
+    deadline=180,
+    section=SectionStyle(
+        title="🤗 Hugging Face Open LLM 排行榜",
+        subtitle=(
+            "*基于开源模型综合评估指标 (Average Score) 统计*",
+            "> 💡 **数据说明**: 本章节数据来自 HF 官方 `open-llm-leaderboard/contents` 数据集后端，包含所有已评估模型。相比于网页端 \"Archived\" 的快照，API 数据更全面且包含了一些未在前端置顶的模型。",
+        ),
+        columns=(
+            ("排名", "{rank}"),
+            ("模型名称", "**{model_id}**"),
+            ("平均分", "{score}"),
+            ("变动", "{delta}"),
+        ),
+        highlight_label="HF Open LLM",
+    ),
+)
+
+
 if __name__ == "__main__":
     scrape_hf_leaderboard()
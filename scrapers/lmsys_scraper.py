@@ -1,12 +1,18 @@
 import asyncio
-import json
-import os
 from datetime import datetime
 
-from playwright.async_api import async_playwright
+from scrapers.browser_pool import DEFAULT_USER_AGENT, borrow_context, record_stat
+from scrapers.network_capture import ResponseCapture, pick, walk_dicts
+from scrapers.readiness import wait_until_ready
+from scrapers.registry import SectionStyle, SourceSpec
+from scrapers.resource_filter import ResourceFilter
+from scrapers.table_extract import extract_table_matrices
+from utils.capture_archive import archive_capture
+from utils.fetch_cache import save_current
 
 
 ARENA_URL = "https://arena.ai/leaderboard"
+OUTPUT_FILE = "data/lmsys_current.json"
 
 OVERVIEW_CATEGORIES = [
     "Agent",
@@ -23,6 +29,36 @@ OVERVIEW_CATEGORIES = [
     "Video Edit",
 ]
 
+# 报告中各赛道的中文名，顺序即报告中的赛道顺序
+CATEGORY_LABELS = {
+    "Agent": "智能体",
+    "Text": "文本能力",
+    "Code": "编程能力",
+    "WebDev": "网页开发",
+    "Vision": "多模态/视觉",
+    "Document": "文档理解",
+    "Text-to-Image": "文生图",
+    "Image Edit": "图像编辑",
+    "Image-to-WebDev": "图生网页",
+    "Search": "搜索增强",
+    "Text-to-Video": "文生视频",
+    "Image-to-Video": "图生视频",
+    "Video Edit": "视频编辑",
+}
+
+# 就绪条件：Overview 中至少这么多个赛道已填充，且连续两次轮询结果一致
+READY_MIN_CATEGORIES = 6
+READY_BUDGET = 45.0
+
+# Overview 数据随 RSC/JSON 请求下发
+CAPTURE_URL_PATTERNS = ("arena.ai", "lmarena.ai")
+CATEGORY_KEYS = ("name", "title", "category", "arena", "leaderboard")
+ENTRY_MODEL_KEYS = ("modelDisplayName", "model_display_name", "model_name", "model", "name")
+ENTRY_SCORE_KEYS = ("rating", "score", "elo", "arena_score")
+
+# Cloudflare 人机校验脚本必须放行，否则页面停在验证页
+RESOURCE_ALLOWLIST = ("challenges.cloudflare.com",)
+
 
 def _is_rank(value):
     return value.strip().isdigit()
@@ -100,23 +136,90 @@ def _extract_overview_blocks(body_text):
     return categories_data
 
 
-async def _extract_text_matrix_tables(page):
+def _match_category(name):
+    if not isinstance(name, str):
+        return None
+    lowered = name.strip().lower()
+    for category in OVERVIEW_CATEGORIES:
+        if lowered == category.lower():
+            return category
+    return None
+
+
+def _format_interval(entry):
+    interval = pick(entry, "ci", "interval", "confidence_interval")
+    if isinstance(interval, str):
+        return interval
+    if isinstance(interval, (int, float)):
+        return f"±{round(interval)}"
+    upper = pick(entry, "rating_upper", "upper")
+    lower = pick(entry, "rating_lower", "lower")
+    score = pick(entry, *ENTRY_SCORE_KEYS)
+    if all(isinstance(v, (int, float)) for v in (upper, lower, score)):
+        return f"+{round(upper - score)}/-{round(score - lower)}"
+    return "-"
+
+
+def _map_entries(entries):
+    leaderboard = []
+    for idx, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            return []
+        model_id = pick(entry, *ENTRY_MODEL_KEYS)
+        score = pick(entry, *ENTRY_SCORE_KEYS)
+        if not isinstance(model_id, str) or score is None:
+            return []
+        rank = pick(entry, "rank", "position")
+        leaderboard.append(
+            {
+                "rank": int(rank) if str(rank).isdigit() else idx,
+                "model_id": model_id,
+                "score": str(round(score)) if isinstance(score, (int, float)) else str(score),
+                "votes": _format_interval(entry),
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
+    return sorted(leaderboard, key=lambda item: item["rank"])[:10]
+
+
+def _map_overview_payload(payload):
+    """
+    Map captured Overview payloads to the same {category: [records]} shape as
+    _extract_overview_blocks: find dicts naming a known category that carry a
+    list of scored model entries.
+    """
+    categories_data = {}
+    for node in walk_dicts(payload):
+        category_name = _match_category(pick(node, *CATEGORY_KEYS))
+        if not category_name or category_name in categories_data:
+            continue
+        for value in node.values():
+            if isinstance(value, list) and value:
+                leaderboard = _map_entries(value)
+                if leaderboard:
+                    categories_data[category_name] = leaderboard
+                    break
+
+    if len(categories_data) < READY_MIN_CATEGORIES:
+        return None
+    return categories_data
+
+
+def _parse_text_matrix_tables(tables):
     categories_data = {}
-    tables = await page.locator("table").all()
-    print(f"Found {len(tables)} tables.")
 
     for table in tables:
-        headers = [h.strip() for h in await table.locator("th").all_inner_texts()]
+        headers = [h.strip() for h in table["headers"]]
         if len(headers) < 2 or "Model" not in headers[0]:
             continue
 
-        rows = await table.locator("tr").all()
+        # 每行单元格只清洗一次，所有列共用
+        rows = [[c.strip() for c in cells] for cells in table["rows"][1:]]
         for col_idx, header in enumerate(headers[1:], start=1):
             category_name = "Text" if header == "Overall" else f"Text {header}"
             leaderboard = []
 
-            for row in rows[1:]:
-                cells = [c.strip() for c in await row.locator("td").all_inner_texts()]
+            for cells in rows:
                 if len(cells) <= col_idx or not cells[0] or not _is_rank(cells[col_idx]):
                     continue
 
@@ -138,27 +241,61 @@ async def _extract_text_matrix_tables(page):
     return categories_data
 
 
-async def scrape_lmsys_hf():
+# 原始抓取 (kind -> 解析函数)，供存档回放/重新解析使用
+CAPTURE_PARSERS = {
+    "inner_text": _extract_overview_blocks,
+    "overview_payload": _map_overview_payload,
+    "table_matrix": _parse_text_matrix_tables,
+}
+
+
+def parse_capture(kind, raw):
+    return CAPTURE_PARSERS[kind](raw) or {}
+
+
+async def scrape_lmsys_hf(pool=None, cache=None, archive=None, run_context=None):
     print("Starting LMSYS/Arena Scrape...")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/119.0.0.0 Safari/537.36"
-            )
-        )
+    resource_filter = ResourceFilter(allow=RESOURCE_ALLOWLIST)
+    async with borrow_context(
+        pool, resource_filter=resource_filter, user_agent=DEFAULT_USER_AGENT
+    ) as context:
         page = await context.new_page()
 
         try:
             print(f"Navigating to {ARENA_URL}...")
-            await page.goto(ARENA_URL, wait_until="networkidle", timeout=120000)
-            await page.wait_for_selector("text=Leaderboard Overview", timeout=60000)
-            await asyncio.sleep(5)
+            capture = ResponseCapture(page, CAPTURE_URL_PATTERNS)
+            await page.goto(ARENA_URL, wait_until="domcontentloaded", timeout=120000)
+
+            seen_shapes = []
+
+            # 优先使用网络响应中的结构化数据，DOM 解析作为兜底
+            async def overview_filled():
+                captured = capture.extract(_map_overview_payload)
+                if captured:
+                    return "overview_payload", capture.matched_payload, captured
+                body_text = await page.locator("body").inner_text()
+                blocks = _extract_overview_blocks(body_text)
+                shape = {cat: len(items) for cat, items in blocks.items()}
+                settled = (
+                    len(blocks) >= READY_MIN_CATEGORIES
+                    and bool(seen_shapes)
+                    and seen_shapes[-1] == shape
+                )
+                seen_shapes.append(shape)
+                return ("inner_text", body_text, blocks) if settled else None
 
-            body_text = await page.locator("body").inner_text()
-            categories_data = _extract_overview_blocks(body_text)
+            ready, settle_time, outcome = await wait_until_ready(
+                overview_filled, budget=READY_BUDGET
+            )
+            if outcome:
+                kind, raw, categories_data = outcome
+            else:
+                await page.wait_for_selector("text=Leaderboard Overview", timeout=60000)
+                kind, raw = "inner_text", await page.locator("body").inner_text()
+                categories_data = _extract_overview_blocks(raw)
+            capture_mode = "network" if kind == "overview_payload" else "dom"
+            record_stat(pool, "lmsys", ready=ready, settle_time=settle_time, capture_mode=capture_mode)
+            archive_capture(archive, "lmsys", kind, raw)
 
             if categories_data:
                 print(
@@ -167,13 +304,13 @@ async def scrape_lmsys_hf():
                 )
             else:
                 print("Overview extraction failed. Falling back to table matrix parser...")
-                categories_data = await _extract_text_matrix_tables(page)
+                tables = await extract_table_matrices(page, "table", "td")
+                print(f"Found {len(tables)} tables.")
+                archive_capture(archive, "lmsys", "table_matrix", tables)
+                categories_data = _parse_text_matrix_tables(tables)
 
             if categories_data:
-                os.makedirs("data", exist_ok=True)
-                with open("data/lmsys_current.json", "w", encoding="utf-8") as f:
-                    json.dump(categories_data, f, indent=4, ensure_ascii=False)
-                return True
+                return save_current("lmsys", OUTPUT_FILE, categories_data, cache, run_context)
 
             await page.screenshot(path="lmsys_error_screenshot.png")
             content = await page.content()
@@ -186,4 +323,37 @@ async def scrape_lmsys_hf():
             print(f"Error during LMSYS/Arena scrape: {e}")
             return False
         finally:
-            await browser.close()
+            record_stat(pool, "lmsys", **resource_filter.summary())
+
+
+SOURCE = SourceSpec(
+    name="lmsys",
+    label="LMSYS/Arena",
+    display_name="LMSYS/Arena",
+    output_file=OUTPUT_FILE,
+    fetch=scrape_lmsys_hf,
+    parse_capture=parse_capture,
+    link=("LMSYS Arena", "https://lmarena.ai/leaderboard"),
+    multi_category=True,
+    category_order=tuple(CATEGORY_LABELS),
+    deadline=300,
+    hedge_after=150,
+    section=SectionStyle(
+        title="🏆 LMSYS {category} ({category_label})",
+        subtitle=("*基于众测竞技场 Elo 分数统计*",),
+        columns=(
+            ("排名", "{rank}"),
+            ("模型名称", "**{model_id}**"),
+            ("分数", "{score}"),
+            ("区间/误差", "{raw[votes]}"),
+            ("变动", "{delta}"),
+        ),
+        highlight_label="LMSYS {category}",
+        category_labels=CATEGORY_LABELS,
+        default_category_label="综合",
+    ),
+)
+
+
+if __name__ == "__main__":
+    asyncio.run(scrape_lmsys_hf())
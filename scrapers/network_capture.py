@@ -0,0 +1,131 @@
+import json
+import re
+
+
+RSC_LINE = re.compile(r"^([0-9a-zA-Z]+):([A-Z]{0,2})(.*)$")
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+def parse_payload(text, content_type=""):
+    """
+    Decode a captured response body. JSON bodies are returned as-is; Next.js
+    RSC (text/x-component) streams are returned as the list of JSON chunks
+    found on their `<id>:<json>` lines. Anything else yields None.
+    """
+    content_type = (content_type or "").lower()
+    stripped = text.lstrip()
+
+    if "json" in content_type or stripped[:1] in ("{", "["):
+        try:
+            return json.loads(text)
+        except ValueError:
+            if "json" in content_type:
+                return None
+
+    if "x-component" not in content_type and not RSC_LINE.match(stripped[:64]):
+        return None
+
+    chunks = []
+    for line in text.splitlines():
+        m = RSC_LINE.match(line)
+        if not m:
+            continue
+        body = m.group(3)
+        if body[:1] not in ("{", "["):
+            continue
+        try:
+            chunks.append(json.loads(body))
+        except ValueError:
+            continue
+    return chunks or None
+
+
+def walk_dicts(obj):
+    """Yield every dict nested anywhere inside a decoded payload."""
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def iter_record_lists(obj):
+    """Yield every non-empty list of dicts nested inside a decoded payload."""
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            if node and all(isinstance(item, dict) for item in node):
+                yield node
+            stack.extend(reversed(node))
+
+
+def pick(record, *keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+class ResponseCapture:
+    """
+    Collect structured payloads from a page's XHR/fetch responses via
+    page.on("response"), so scrapers can build records as soon as the data
+    arrives instead of waiting for the DOM to render it.
+    """
+
+    def __init__(self, page, url_patterns):
+        self.url_patterns = tuple(url_patterns)
+        self.payloads = []
+        self._cursor = 0
+        self._found = None
+        # 产出记录的原始 payload，供原始抓取存档使用
+        self.matched_payload = None
+        page.on("response", self._on_response)
+
+    def _wanted(self, response):
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return False
+        if response.status != 200:
+            return False
+        return any(pattern in response.url for pattern in self.url_patterns)
+
+    async def _on_response(self, response):
+        if not self._wanted(response):
+            return
+        try:
+            headers = await response.all_headers()
+            if int(headers.get("content-length") or 0) > MAX_BODY_BYTES:
+                return
+            text = await response.text()
+        except Exception:
+            # 页面关闭或响应体已被丢弃
+            return
+
+        payload = parse_payload(text, headers.get("content-type", ""))
+        if payload is not None:
+            self.payloads.append((response.url, payload))
+
+    def extract(self, mapper):
+        """
+        Run `mapper(payload)` over payloads captured since the last call and
+        return the first non-empty result (remembered for later calls).
+        """
+        while self._found is None and self._cursor < len(self.payloads):
+            url, payload = self.payloads[self._cursor]
+            self._cursor += 1
+            try:
+                records = mapper(payload)
+            except Exception as e:
+                print(f"Warning: could not map payload from {url}: {e}")
+                continue
+            if records:
+                self._found = records
+                self.matched_payload = payload
+        return self._found
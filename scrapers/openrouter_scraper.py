@@ -1,66 +1,221 @@
-import json
-import os
 import re
-from playwright.async_api import async_playwright
 from datetime import datetime
 import asyncio
 
-async def scrape_openrouter():
+from scrapers.browser_pool import borrow_context, record_stat
+from scrapers.network_capture import ResponseCapture, iter_record_lists, pick
+from scrapers.readiness import wait_until_ready
+from scrapers.registry import SectionStyle, SourceSpec
+from scrapers.resource_filter import ResourceFilter
+from utils.capture_archive import archive_capture
+from utils.fetch_cache import UNCHANGED, save_current
+
+# Based on body_debug.txt info:
+# Pattern: (\d+)\.\n([^\n]+)\nby\n([^\n]+)\n([^\n]+ tokens)\n([^\n]+%)
+# We use a pattern that captures the rank, model, provider, tokens, and growth
+RANK_PATTERN = re.compile(r'(\d+)\.\s*\n?([^\n]+)\s*\n?by\s*\n?([^\n]+)\s*\n?([^\n]+ tokens)\s*\n?([^\n]+%)')
+
+# 就绪条件：排名正则至少匹配到这么多行；超出预算则用已渲染的部分继续
+READY_MIN_ROWS = 20
+READY_BUDGET = 30.0
+MAX_MODELS = 30
+OUTPUT_FILE = "data/openrouter_current.json"
+
+# 排行榜数据来自 /api/ 下的 JSON 接口或 Next.js RSC 请求 (?_rsc=)
+CAPTURE_URL_PATTERNS = ("openrouter.ai/api/", "_rsc=")
+SLUG_KEYS = ("model_permaslug", "permaslug", "model_slug", "slug", "model")
+NAME_KEYS = ("short_name", "name", "model_name")
+
+# 页面全部为自有域名资源，除默认拦截项外无需放行
+RESOURCE_ALLOWLIST = ()
+
+
+def _parse_rank_text(body_text):
+    models = []
+    seen = set()
+
+    for m in RANK_PATTERN.finditer(body_text):
+        rank = int(m.group(1))
+        model_name = m.group(2).strip()
+        provider = m.group(3).strip()
+        tokens = m.group(4).strip()
+        growth = m.group(5).strip()
+
+        model_id = f"{provider}/{model_name}".lower().replace(" ", "-")
+
+        if model_id not in seen:
+            models.append({
+                "rank": rank,
+                "model_id": model_id,
+                "display_name": model_name,
+                "provider": provider,
+                "tokens": tokens,
+                "growth": growth,
+                "timestamp": datetime.now().isoformat()
+            })
+            seen.add(model_id)
+        if len(models) >= MAX_MODELS: break
+
+    return models
+
+
+def _format_tokens(count):
+    for divisor, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if count >= divisor:
+            return f"{count / divisor:.3g}{suffix} tokens"
+    return f"{int(count)} tokens"
+
+
+def _format_growth(change):
+    if change is None:
+        return "-"
+    # 接口可能返回比例 (0.27) 或百分数 (27)
+    percent = change * 100 if abs(change) < 1 else change
+    return f"{round(percent)}%"
+
+
+def _row_tokens(row):
+    total = pick(row, "total_tokens", "tokens")
+    if total is None:
+        prompt = row.get("total_prompt_tokens")
+        completion = row.get("total_completion_tokens")
+        if isinstance(prompt, (int, float)) and isinstance(completion, (int, float)):
+            total = prompt + completion
+    return total if isinstance(total, (int, float)) else None
+
+
+def _map_rankings_payload(payload):
+    """
+    Map a captured rankings payload to the same records as _parse_rank_text.
+    Rows may be per-day, so tokens are summed per model slug before ranking.
+    """
+    for rows in iter_record_lists(payload):
+        totals = {}
+        growth = {}
+        names = {}
+        for row in rows:
+            slug = pick(row, *SLUG_KEYS)
+            tokens = _row_tokens(row)
+            if not isinstance(slug, str) or "/" not in slug or tokens is None:
+                continue
+            totals[slug] = totals.get(slug, 0) + tokens
+            names.setdefault(slug, pick(row, *NAME_KEYS))
+            change = pick(row, "growth", "change", "percent_change")
+            if isinstance(change, (int, float)):
+                growth[slug] = change
+
+        if len(totals) < READY_MIN_ROWS:
+            continue
+
+        models = []
+        seen = set()
+        ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+        for slug, tokens in ranked:
+            provider = slug.split("/", 1)[0]
+            model_name = names.get(slug) or slug.split("/", 1)[1]
+            if ":" in model_name:
+                # e.g. "DeepSeek: DeepSeek V4 Flash" -> 与页面展示名保持一致
+                model_name = model_name.split(":", 1)[1].strip()
+            model_id = f"{provider}/{model_name}".lower().replace(" ", "-")
+            if model_id in seen:
+                continue
+            seen.add(model_id)
+            models.append({
+                "rank": len(models) + 1,
+                "model_id": model_id,
+                "display_name": model_name,
+                "provider": provider,
+                "tokens": _format_tokens(tokens),
+                "growth": _format_growth(growth.get(slug)),
+                "timestamp": datetime.now().isoformat()
+            })
+            if len(models) >= MAX_MODELS: break
+        return models
+
+    return None
+
+
+# 原始抓取 (kind -> 解析函数)，供存档回放/重新解析使用
+CAPTURE_PARSERS = {
+    "inner_text": _parse_rank_text,
+    "rankings_payload": _map_rankings_payload,
+}
+
+
+def parse_capture(kind, raw):
+    return CAPTURE_PARSERS[kind](raw) or []
+
+
+async def scrape_openrouter(pool=None, cache=None, archive=None, run_context=None):
     print("Starting OpenRouter Scrape via Structured Text (This Week)...")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+    resource_filter = ResourceFilter(allow=RESOURCE_ALLOWLIST)
+    async with borrow_context(
+        pool, resource_filter=resource_filter, viewport={"width": 1280, "height": 3000}
+    ) as context:
+        page = await context.new_page()
+        capture = ResponseCapture(page, CAPTURE_URL_PATTERNS)
         try:
-            await page.set_viewport_size({"width": 1280, "height": 3000})
-            await page.goto("https://openrouter.ai/rankings", wait_until="networkidle", timeout=60000)
-            await asyncio.sleep(15)
-            
-            body_text = await page.evaluate("document.body.innerText")
-            
-            models = []
-            seen = set()
-            
-            # Based on body_debug.txt info:
-            # Pattern: (\d+)\.\n([^\n]+)\nby\n([^\n]+)\n([^\n]+ tokens)\n([^\n]+%)
-            # We use a pattern that captures the rank, model, provider, tokens, and growth
-            matches = re.finditer(r'(\d+)\.\s*\n?([^\n]+)\s*\n?by\s*\n?([^\n]+)\s*\n?([^\n]+ tokens)\s*\n?([^\n]+%)', body_text)
-            
-            for m in matches:
-                rank = int(m.group(1))
-                model_name = m.group(2).strip()
-                provider = m.group(3).strip()
-                tokens = m.group(4).strip()
-                growth = m.group(5).strip()
-                
-                model_id = f"{provider}/{model_name}".lower().replace(" ", "-")
-                
-                if model_id not in seen:
-                    models.append({
-                        "rank": rank,
-                        "model_id": model_id,
-                        "display_name": model_name,
-                        "provider": provider,
-                        "tokens": tokens,
-                        "growth": growth,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    seen.add(model_id)
-                if len(models) >= 30: break
-            
+            await page.goto("https://openrouter.ai/rankings", wait_until="domcontentloaded", timeout=60000)
+
+            # 优先使用网络响应中的结构化数据，DOM 正则作为兜底
+            async def rows_ready():
+                if capture.extract(_map_rankings_payload):
+                    return "rankings_payload", capture.matched_payload
+                text = await page.evaluate("document.body.innerText")
+                if len(RANK_PATTERN.findall(text)) >= READY_MIN_ROWS:
+                    return "inner_text", text
+                return None
+
+            ready, settle_time, outcome = await wait_until_ready(rows_ready, budget=READY_BUDGET)
+            kind, raw = outcome or ("inner_text", await page.evaluate("document.body.innerText"))
+            capture_mode = "network" if kind == "rankings_payload" else "dom"
+            record_stat(pool, "openrouter", ready=ready, settle_time=settle_time, capture_mode=capture_mode)
+
+            archive_capture(archive, "openrouter", kind, raw)
+            models = parse_capture(kind, raw)
+
             if models:
-                os.makedirs("data", exist_ok=True)
-                with open("data/openrouter_current.json", "w", encoding="utf-8") as f:
-                    json.dump(models, f, indent=4, ensure_ascii=False)
-                print(f"Success! Extracted {len(models)} structured model rankings.")
-                return True
+                result = save_current("openrouter", OUTPUT_FILE, models, cache, run_context)
+                if result == UNCHANGED:
+                    print("OpenRouter rankings unchanged since last run.")
+                else:
+                    print(f"Success! Extracted {len(models)} structured model rankings.")
+                return result
             else:
                 print("No structured models found. Falling back to simple regex...")
                 return False
-                
+
         except Exception as e:
             print(f"OpenRouter Structured Scrape Failed: {e}")
             return False
         finally:
-            await browser.close()
+            record_stat(pool, "openrouter", **resource_filter.summary())
+
+SOURCE = SourceSpec(
+    name="openrouter",
+    label="OpenRouter",
+    display_name="OpenRouter",
+    output_file=OUTPUT_FILE,
+    fetch=scrape_openrouter,
+    parse_capture=parse_capture,
+    link=("OpenRouter", "https://openrouter.ai/rankings"),
+    deadline=180,
+    hedge_after=90,
+    section=SectionStyle(
+        title="🚀 OpenRouter 排行榜",
+        subtitle=("*基于 OpenRouter 平台真实部署与调用量统计*",),
+        # OpenRouter 排名可能跳号（网站原始数据），用 {idx} 重新编号确保连续
+        columns=(
+            ("排名", "{idx}"),
+            ("模型 ID", "`{model_id}`"),
+            ("使用量 (Tokens)", "{raw[tokens]}"),
+            ("增长率", "{raw[growth]}"),
+            ("变动", "{delta}"),
+        ),
+        highlight_label="OpenRouter",
+    ),
+)
 
 
+if __name__ == "__main__":
+    asyncio.run(scrape_openrouter())
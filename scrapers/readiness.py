@@ -0,0 +1,44 @@
+import asyncio
+
+
+async def wait_until_ready(probe, budget=30.0, interval=0.5):
+    """
+    Poll the async `probe()` until it returns a truthy value or `budget`
+    seconds have elapsed. Returns (ready, settle_seconds, last_value) so the
+    caller can use whatever the probe already extracted.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    value = None
+
+    while True:
+        try:
+            value = await probe()
+        except Exception:
+            # 页面仍在导航/重渲染时 evaluate 可能抛错，视为尚未就绪
+            value = None
+
+        elapsed = loop.time() - start
+        if value:
+            return True, round(elapsed, 2), value
+        if elapsed >= budget:
+            return False, round(elapsed, 2), value
+        await asyncio.sleep(interval)
+
+
+def stable_count(count_probe, polls=2, minimum=1):
+    """
+    Wrap a probe returning a count (e.g. table rows) so it only reports ready
+    once the count is >= `minimum` and unchanged for `polls` consecutive polls.
+    """
+    seen = []
+
+    async def probe():
+        count = await count_probe()
+        seen.append(count)
+        recent = seen[-polls:]
+        if count >= minimum and len(recent) == polls and len(set(recent)) == 1:
+            return count
+        return None
+
+    return probe
@@ -0,0 +1,139 @@
+"""
+Source plugin registry.
+
+Every scraper module exposes a module-level ``SOURCE = SourceSpec(...)``
+describing how to fetch it, the shape of its data and how the report renders
+it. Built-in sources are listed in ``SOURCE_MODULES``; third-party packages
+can register more under the ``llm_trend_observer.sources`` entry-point group
+(the entry point loads the ``SourceSpec`` itself). Modules are imported only
+when their source is enabled, so a run limited to a few sources never loads
+the others (or Playwright, for HTTP-only sources).
+
+Enabled sources default to everything registered; ``LLM_TREND_SOURCES``
+(comma-separated names) restricts and orders them.
+"""
+import importlib
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from importlib.metadata import entry_points
+from typing import Callable, Optional
+
+
+ENTRY_POINT_GROUP = "llm_trend_observer.sources"
+SOURCES_ENV = "LLM_TREND_SOURCES"
+
+# 内置来源，顺序即报告中各章节的顺序
+SOURCE_MODULES = {
+    "openrouter": "scrapers.openrouter_scraper",
+    "lmsys": "scrapers.lmsys_scraper",
+    "artalanaly": "scrapers.artalanaly_scraper",
+    "hf_leaderboard": "scrapers.hf_leaderboard_scraper",
+}
+
+
+@dataclass(frozen=True)
+class SectionStyle:
+    """
+    How one report section (one per category for multi-category sources) is
+    rendered. ``title`` and ``highlight_label`` are format strings over
+    ``category`` and ``category_label``; each column template is formatted
+    with ``idx``, ``rank``, ``model_id``, ``score``, ``delta`` (styled) and
+    ``raw`` (the scraped item, missing fields render as "-").
+    """
+
+    title: str
+    subtitle: tuple
+    columns: tuple
+    highlight_label: str
+    category_labels: dict = field(default_factory=dict)
+    # 未在 category_labels 中的赛道显示名；None 表示直接用赛道名
+    default_category_label: Optional[str] = None
+    max_rows: int = 10
+
+    def category_label(self, category):
+        if category is None:
+            return ""
+        default = category if self.default_category_label is None else self.default_category_label
+        return self.category_labels.get(category, default)
+
+    def format_title(self, category):
+        return self.title.format(category=category, category_label=self.category_label(category))
+
+    def format_highlight_label(self, category):
+        return self.highlight_label.format(category=category, category_label=self.category_label(category))
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """
+    One leaderboard source. ``fetch(pool, cache=None, archive=None,
+    run_context=None)`` is a coroutine function returning True, UNCHANGED or
+    False; it hands its payload to the RunContext (or writes
+    ``output_file`` when run on its own). Multi-category sources produce
+    ``{category: [items]}``, the others a flat list of items.
+    """
+
+    name: str
+    label: str
+    display_name: str
+    output_file: str
+    fetch: Callable
+    parse_capture: Callable
+    section: SectionStyle
+    link: tuple
+    multi_category: bool = False
+    # 多赛道来源回退到历史数据时按此顺序取赛道（不含其他赛道）
+    category_order: tuple = ()
+    deadline: float = 240.0
+    hedge_after: Optional[float] = None
+
+    def history_keys(self, data):
+        """History keys for a payload of this source: name or name_category."""
+        if isinstance(data, dict):
+            return {f"{self.name}_{cat}": items for cat, items in data.items()}
+        return {self.name: data}
+
+
+def _entry_points():
+    try:
+        return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+    except Exception as e:
+        print(f"Warning: could not read {ENTRY_POINT_GROUP} entry points: {e}")
+        return {}
+
+
+def available_sources():
+    """Names of all registered sources, built-ins first."""
+    names = list(SOURCE_MODULES)
+    names.extend(name for name in sorted(_entry_points()) if name not in SOURCE_MODULES)
+    return names
+
+
+@lru_cache(maxsize=None)
+def load_source(name):
+    if name in SOURCE_MODULES:
+        return importlib.import_module(SOURCE_MODULES[name]).SOURCE
+
+    entry_point = _entry_points().get(name)
+    if entry_point is None:
+        raise KeyError(f"unknown source: {name}")
+    return entry_point.load()
+
+
+def enabled_source_names(names=None):
+    if names is None:
+        configured = os.environ.get(SOURCES_ENV, "")
+        names = [n.strip() for n in configured.split(",") if n.strip()] or available_sources()
+    return list(names)
+
+
+def enabled_sources(names=None):
+    """SourceSpecs of the enabled sources, importing only those modules."""
+    specs = []
+    for name in enabled_source_names(names):
+        try:
+            specs.append(load_source(name))
+        except Exception as e:
+            print(f"Warning: source {name} could not be loaded and is skipped: {e}")
+    return specs
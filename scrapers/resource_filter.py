@@ -0,0 +1,98 @@
+import os
+from urllib.parse import urlparse
+
+
+# 抓取只需要 HTML/JS/XHR，图片、音视频、字体从不参与解析
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "segment.io",
+    "segment.com",
+    "posthog.com",
+    "hotjar.com",
+    "sentry.io",
+    "intercom.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "clarity.ms",
+    "facebook.net",
+    "plausible.io",
+    "vercel-insights.com",
+    "cloudflareinsights.com",
+    "browser-intake-datadoghq.com",
+)
+
+# 被拦截请求没有响应体可计量，按资源类型的典型传输大小估算节省的流量
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "script": 60_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+
+def _host_matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourceFilter:
+    """
+    Request-routing layer for a BrowserContext: aborts non-essential resource
+    types and tracker domains, lets anything in `allow` (URL substrings)
+    through, and counts what it blocked for the scrape metrics.
+    """
+
+    def __init__(
+        self,
+        blocked_types=BLOCKED_RESOURCE_TYPES,
+        blocked_domains=TRACKER_DOMAINS,
+        allow=(),
+        enabled=None,
+    ):
+        if enabled is None:
+            # SCRAPER_BLOCK_RESOURCES=0 可整体关闭拦截，便于排查页面渲染问题
+            enabled = os.getenv("SCRAPER_BLOCK_RESOURCES", "1") != "0"
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allow = tuple(allow)
+        self.enabled = enabled
+        self.requests_blocked = 0
+        self.bytes_saved_est = 0
+        self.blocked_by_type = {}
+
+    def should_block(self, url, resource_type):
+        if not self.enabled or any(pattern in url for pattern in self.allow):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        host = urlparse(url).hostname or ""
+        return _host_matches(host, self.blocked_domains)
+
+    async def _handle(self, route):
+        request = route.request
+        if not self.should_block(request.url, request.resource_type):
+            await route.fallback()
+            return
+
+        self.requests_blocked += 1
+        self.bytes_saved_est += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+        await route.abort("blockedbyclient")
+
+    async def install(self, context):
+        if self.enabled:
+            await context.route("**/*", self._handle)
+
+    def summary(self):
+        return {
+            "requests_blocked": self.requests_blocked,
+            "bytes_saved_est": self.bytes_saved_est,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
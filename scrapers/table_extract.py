@@ -0,0 +1,25 @@
+# 一次 page.evaluate 取回整张表（表头 + 所有单元格文本），
+# 取代逐行 locator(...).all_inner_texts() 的多次 IPC 往返
+TABLE_MATRIX_JS = """
+([tableSelector, cellSelector]) =>
+    Array.from(document.querySelectorAll(tableSelector), (table) => ({
+        headers: Array.from(table.querySelectorAll("th"), (th) => th.innerText),
+        rows: Array.from(table.querySelectorAll("tr"), (tr) =>
+            Array.from(tr.querySelectorAll(cellSelector), (cell) => cell.innerText)
+        ),
+    }))
+"""
+
+
+async def extract_table_matrices(page, table_selector="table", cell_selector="td, th"):
+    """
+    Return [{"headers": [...], "rows": [[cell, ...], ...]}, ...] for every
+    element matching `table_selector`, in a single round trip. Pass ":root"
+    to treat the whole page as one table (all th / all tr).
+    """
+    return await page.evaluate(TABLE_MATRIX_JS, [table_selector, cell_selector])
+
+
+async def extract_page_matrix(page, cell_selector="td, th"):
+    matrices = await extract_table_matrices(page, ":root", cell_selector)
+    return matrices[0] if matrices else {"headers": [], "rows": []}
@@ -0,0 +1,39 @@
+from compare import DeltaEngine
+
+
+def _items(*model_ids):
+    return [{"rank": rank, "model_id": model_id} for rank, model_id in enumerate(model_ids, 1)]
+
+
+def _engine(tmp_path):
+    return DeltaEngine(
+        history_file=str(tmp_path / "history.json"), db_file=str(tmp_path / "history.db"),
+        backup_dir=str(tmp_path / "backups"),
+    )
+
+
+def test_duplicate_baseline_rows_use_the_last_one(tmp_path):
+    engine = _engine(tmp_path)
+    # 抓取结果中同一模型出现两次（例如不同 variant 归一化到同一 ID）
+    engine.update_many({"lmsys": _items("a", "b", "a")}, "2026-08-01T08:00:00")
+
+    assert [r["delta"] for r in engine.compare("lmsys", _items("a", "b"))] == ["↑2", "-"]
+    assert engine.rank_index("lmsys", "first_seen") == {"a": 3, "b": 2}
+
+
+def test_batch_matches_per_key_compare(tmp_path):
+    engine = _engine(tmp_path)
+    engine.update_many({"lmsys": _items("a", "b", "c"), "hf": _items("x", "y")}, "2026-08-01T08:00:00")
+    current = {"lmsys": _items("c", "a", "d"), "hf": _items("y", "x"), "new": _items("n")}
+
+    batch = engine.compare_batch(current, ("previous", "first_seen"))
+
+    assert batch.reports() == {
+        key: engine.compare(key, items, ("previous", "first_seen")) for key, items in current.items()
+    }
+    lmsys = batch.frame[batch.frame["key"] == "lmsys"]
+    assert lmsys["shift_previous"].fillna(0).tolist() == [2, -1, 0]
+    assert lmsys["new_previous"].tolist() == [False, False, True]
+    assert sorted(map(tuple, batch.dropped[["key", "baseline", "model_id"]].to_numpy())) == [
+        ("lmsys", "first_seen", "b"), ("lmsys", "previous", "b"),
+    ]
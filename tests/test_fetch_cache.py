@@ -0,0 +1,124 @@
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import scrapers.hf_leaderboard_scraper as hf
+from utils.fetch_cache import UNCHANGED, FetchCache, save_current
+from utils.scheduler import CancelToken
+
+URL = "https://example.test/contents/0000.parquet"
+
+
+def _parquet_bytes(rows):
+    table = pa.table({"fullname": [name for name, _ in rows], hf.SCORE_COLUMN: [score for _, score in rows]})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    return buffer.getvalue()
+
+
+class _Response:
+    def __init__(self, status_code, content=b"", etag=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"ETag": etag} if etag else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class _Session:
+    """Serves URL with ETag `etag` and answers If-None-Match with 304; everything else fails."""
+
+    def __init__(self, content, etag):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        if url != URL:
+            return _Response(503)
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return _Response(304)
+        return _Response(200, self.content, self.etag)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path
+
+
+def _scrape(monkeypatch, session, cache, cancel_token=None):
+    monkeypatch.setattr(hf, "_session", lambda: session)
+    return hf.scrape_hf_leaderboard(parquet_source=URL, cache=cache, cancel_token=cancel_token)
+
+
+def test_save_current_skips_identical_payload_ignoring_timestamps(workdir):
+    cache = FetchCache("data/cache.json")
+    payload = [{"rank": 1, "model_id": "a", "timestamp": "2026-10-18T08:00:00"}]
+    assert save_current("src", "data/src.json", payload, cache) is True
+
+    payload[0]["timestamp"] = "2026-10-19T08:00:00"
+    assert save_current("src", "data/src.json", payload, cache) == UNCHANGED
+    payload[0]["model_id"] = "b"
+    assert save_current("src", "data/src.json", payload, cache) is True
+    assert json.loads((workdir / "data/src.json").read_text(encoding="utf-8"))[0]["model_id"] == "b"
+
+
+def test_cancelled_save_keeps_nothing(workdir):
+    cache = FetchCache("data/cache.json")
+    token = CancelToken()
+    token.cancel()
+
+    assert save_current("src", "data/src.json", [{"model_id": "a"}], cache, cancel_token=token) is False
+    assert not (workdir / "data/src.json").exists()
+    assert cache.entries == {}
+
+
+def test_validators_are_cached_only_with_the_saved_result(workdir, monkeypatch):
+    cache = FetchCache("data/cache.json")
+    session = _Session(b"not a parquet file", etag='"v1"')
+
+    # 下载成功但解析失败：不能记下 ETag，否则下次会收到 304 而沿用旧结果
+    assert _scrape(monkeypatch, session, cache) is False
+    assert cache.validators("hf_leaderboard", URL) == {}
+
+    session.content = _parquet_bytes([("org/a", 70.0), ("org/b", 71.0)])
+    assert _scrape(monkeypatch, session, cache) is True
+    assert cache.validators("hf_leaderboard", URL) == {"If-None-Match": '"v1"'}
+    assert json.loads((workdir / hf.OUTPUT_FILE).read_text(encoding="utf-8"))[0]["model_id"] == "org/b"
+
+    assert _scrape(monkeypatch, session, cache) == UNCHANGED
+    assert session.requests[-1] == (URL, {"If-None-Match": '"v1"'})
+
+
+def test_cancelled_attempt_keeps_the_previous_validators(workdir, monkeypatch):
+    cache = FetchCache("data/cache.json")
+    session = _Session(_parquet_bytes([("org/a", 70.0)]), etag='"v1"')
+    assert _scrape(monkeypatch, session, cache) is True
+
+    session.content, session.etag = _parquet_bytes([("org/c", 72.0)]), '"v2"'
+    token = CancelToken()
+    token.cancel()
+    assert _scrape(monkeypatch, session, cache, token) is False
+    assert cache.validators("hf_leaderboard", URL) == {"If-None-Match": '"v1"'}
+
+    # 重试时仍会下载新数据，而不是被 304 短路为 UNCHANGED
+    assert _scrape(monkeypatch, session, cache) is True
+    assert json.loads((workdir / hf.OUTPUT_FILE).read_text(encoding="utf-8"))[0]["model_id"] == "org/c"
+
+
+def test_not_modified_after_cancel_is_not_reported_unchanged(workdir, monkeypatch):
+    cache = FetchCache("data/cache.json")
+    session = _Session(_parquet_bytes([("org/a", 70.0)]), etag='"v1"')
+    assert _scrape(monkeypatch, session, cache) is True
+
+    token = CancelToken()
+    token.cancel()
+    assert _scrape(monkeypatch, session, cache, token) is False
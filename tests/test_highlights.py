@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from compare import DeltaEngine
+from highlights import HighlightEngine
+
+
+LABELS = {"lmsys": "LMSYS", "hf": "HF"}
+
+
+def _items(*model_ids, scores=None):
+    return [
+        {"rank": rank, "model_id": model_id, "score": (scores or {}).get(model_id, "-")}
+        for rank, model_id in enumerate(model_ids, 1)
+    ]
+
+
+def _engine(tmp_path, runs, as_of=None):
+    engine = DeltaEngine(
+        history_file=str(tmp_path / "history.json"), db_file=str(tmp_path / "history.db"),
+        backup_dir=str(tmp_path / "backups"), as_of=as_of,
+    )
+    for day, updates in enumerate(runs, 1):
+        engine.update_many(updates, f"2026-08-{day:02d}T08:00:00")
+    return engine
+
+
+def _detect(engine, current, baselines=("previous",), **kwargs):
+    batch = engine.compare_batch(current, baselines)
+    return HighlightEngine(engine.store).detect(batch.frame, LABELS, **kwargs)
+
+
+def test_short_history_falls_back_to_two_places(tmp_path):
+    engine = _engine(tmp_path, [{"lmsys": _items("a", "b", "c", "d")}])
+
+    highlights = _detect(engine, {"lmsys": _items("c", "a", "b", "e")})
+
+    assert [(m.model_id, m.label, m.delta, m.z) for m in highlights.big_ups] == [("c", "LMSYS", "↑2", None)]
+    assert highlights.big_downs == []
+    assert [m.model_id for m in highlights.new_models] == ["e"]
+
+
+def test_moves_are_judged_against_each_keys_volatility(tmp_path):
+    models = ("a", "b", "c", "d", "e", "f")
+    # hf 每次运行整体翻转，lmsys 一直不变
+    runs = [{"lmsys": _items(*models), "hf": _items(*(models if day % 2 else models[::-1]))} for day in range(4)]
+    engine = _engine(tmp_path, runs)
+    moved = ("c", "a", "b", "d", "e", "f")
+
+    highlights = _detect(engine, {"lmsys": _items(*moved), "hf": _items(*moved)})
+
+    # 稳定榜单的波动按 MIN_RANK_SIGMA 计：2 / 0.75
+    assert [(m.model_id, m.label, m.z) for m in highlights.big_ups] == [("c", "LMSYS", 2.7)]
+    assert highlights.big_downs == []
+
+
+def test_score_moves_need_known_volatility(tmp_path):
+    runs = [
+        {"lmsys": _items("a", "b", scores={"a": 1300 + day % 2, "b": 1250}), "hf": _items("x", scores={"x": "71.5%"})}
+        for day in range(12)
+    ]
+    engine = _engine(tmp_path, runs)
+
+    highlights = _detect(engine, {
+        "lmsys": _items("a", "b", scores={"a": "1,310", "b": 1250.5}),
+        "hf": _items("x", scores={"x": "75%"}),
+    })
+
+    # hf 的分数从未变化（波动为 0），不判断
+    assert [(m.model_id, m.label, m.delta) for m in highlights.score_moves] == [("a", "LMSYS", "+9")]
+    assert highlights.score_moves[0].z >= 3
+
+
+def test_weekly_moves_are_sorted_by_size(tmp_path):
+    runs = [{"lmsys": _items("a", "b", "c", "d", "e", "f")}, {"lmsys": _items("a", "b", "c", "d", "e", "f")}]
+    engine = _engine(tmp_path, runs, as_of=datetime(2026, 8, 9, 12))
+
+    highlights = _detect(
+        engine, {"lmsys": _items("f", "e", "a", "b", "c", "d")}, ("previous", "7d"),
+        weekly_baseline="7d", weekly_min_shift=3,
+    )
+
+    assert [(m.model_id, m.delta, m.z) for m in highlights.weekly] == [("f", "↑5", None), ("e", "↑3", None)]
@@ -0,0 +1,56 @@
+import json
+
+from compare import DeltaEngine
+from import_history import rebuild_history
+from utils.history_backup import HistoryBackup
+
+
+def _items(stamp, *model_ids):
+    return [{"rank": rank, "model_id": model_id, "timestamp": stamp} for rank, model_id in enumerate(model_ids, 1)]
+
+
+def test_unchanged_state_only_changes_stamps(tmp_path):
+    backup = HistoryBackup(str(tmp_path))
+    backup.save({"lmsys": _items("2026-08-01T08:00:00", "a", "b")}, "20260801_080000")
+    backup.save({"lmsys": _items("2026-08-02T08:00:00", "a", "b")}, "20260802_080000")
+
+    objects = list((tmp_path / "objects").rglob("*.json.gz"))
+    assert len(objects) == 1
+    assert backup.restore("2026-08-01") == {"lmsys": _items("2026-08-01T08:00:00", "a", "b")}
+    assert backup.restore() == {"lmsys": _items("2026-08-02T08:00:00", "a", "b")}
+
+
+def test_identical_state_adds_no_manifest_entry(tmp_path):
+    backup = HistoryBackup(str(tmp_path))
+    history = {"lmsys": _items("2026-08-01T08:00:00", "a", "b")}
+
+    assert backup.save(history, "20260801_080000") == "20260801_080000"
+    assert backup.save(json.loads(json.dumps(history)), "20260801_090000") == "20260801_080000"
+    assert backup.timestamps() == ["20260801_080000"]
+
+
+def test_history_store_is_rebuilt_from_backups(tmp_path):
+    engine = DeltaEngine(
+        history_file=str(tmp_path / "none.json"), db_file=str(tmp_path / "history.db"),
+        backup_dir=str(tmp_path / "backups"),
+    )
+    for day, models in (("01", ("a", "b")), ("02", ("b", "a")), ("03", ("c", "b"))):
+        stamp = f"2026-08-{day}T08:00:00"
+        engine.update_many({"lmsys": _items(stamp, *models)}, stamp)
+    engine.store.close()
+
+    rebuilt_db = tmp_path / "rebuilt.db"
+    stats = rebuild_history(
+        str(rebuilt_db), str(tmp_path / "none.json"), str(tmp_path / "backups"), str(tmp_path / "reports"), workers=1
+    )
+    assert stats["runs"] == 3
+    assert rebuild_history(str(rebuilt_db)) is None
+
+    rebuilt = DeltaEngine(
+        history_file=str(tmp_path / "none.json"), db_file=str(rebuilt_db), backup_dir=str(tmp_path / "rebuilt_backups"),
+    )
+    # 最近一次运行也在备份中，重建后的基线与原库一致
+    assert rebuilt.store.snapshot("lmsys") == _items("2026-08-03T08:00:00", "c", "b")
+    assert [rebuilt.store.snapshot("lmsys", f"2026-08-0{day}") for day in (1, 2)] == [
+        engine.store.snapshot("lmsys", f"2026-08-0{day}") for day in (1, 2)
+    ]
@@ -0,0 +1,81 @@
+from compare import DeltaEngine
+from utils.history_store import HistoryStore, scraped_run_at
+
+
+def _items(*model_ids):
+    return [{"rank": rank, "model_id": model_id} for rank, model_id in enumerate(model_ids, 1)]
+
+
+def _store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.append({"lmsys": _items("a", "b")}, "2026-08-01T08:00:00")
+    store.append({"lmsys": _items("b", "a")}, "2026-08-02T08:00:00")
+    store.append({"lmsys": _items("c", "b"), "openrouter": _items("x")}, "2026-08-03T08:00:00")
+    return store
+
+
+def test_snapshot_is_point_in_time(tmp_path):
+    store = _store(tmp_path)
+
+    assert store.snapshot("lmsys") == _items("c", "b")
+    assert store.snapshot("lmsys", "2026-08-02") == _items("b", "a")
+    assert store.snapshot("lmsys", "2026-08-02T07:59:59") == _items("a", "b")
+    assert store.snapshot("lmsys", "2026-07-31") is None
+    assert store.snapshots_at("2026-08-02") == {"lmsys": _items("b", "a")}
+
+
+def test_append_same_run_is_idempotent(tmp_path):
+    store = _store(tmp_path)
+    store.append({"lmsys": _items("d")}, "2026-08-03T08:00:00")
+
+    assert store.runs("lmsys") == ["2026-08-01T08:00:00", "2026-08-02T08:00:00", "2026-08-03T08:00:00"]
+    assert store.snapshot("lmsys") == _items("d")
+
+
+def test_first_seen_and_recent_entries(tmp_path):
+    store = _store(tmp_path)
+
+    assert store.first_seen_ranks("lmsys") == {"a": 1, "b": 2, "c": 1}
+    recent = store.recent_entries(2)
+    assert sorted((key, run_at[:10], model_id) for key, run_at, model_id, _, _ in recent) == [
+        ("lmsys", "2026-08-02", "a"),
+        ("lmsys", "2026-08-02", "b"),
+        ("lmsys", "2026-08-03", "b"),
+        ("lmsys", "2026-08-03", "c"),
+        ("openrouter", "2026-08-03", "x"),
+    ]
+
+
+def test_replace_day_takes_the_place_of_the_live_run(tmp_path):
+    store = _store(tmp_path)
+    # 当天的第二次运行（例如手动重跑）也应一并被替换
+    store.append({"lmsys": _items("z")}, "2026-08-02T20:00:00")
+
+    # 回放时的抓取时间早于实时运行写入历史的时间
+    used = store.replace_day({"lmsys": _items("a", "c"), "hf": _items("m")}, "2026-08-02T07:55:00")
+
+    assert used == {"lmsys": "2026-08-02T20:00:00", "hf": "2026-08-02T07:55:00"}
+    assert store.snapshot("lmsys", "2026-08-02") == _items("a", "c")
+    assert store.runs("lmsys") == ["2026-08-01T08:00:00", "2026-08-02T20:00:00", "2026-08-03T08:00:00"]
+    assert len(store.recent_entries(30)) == 2 + 2 + 2 + 1 + 1
+
+
+def test_engine_replace_day_changes_the_baseline(tmp_path):
+    engine = DeltaEngine(
+        history_file=str(tmp_path / "history.json"), db_file=str(tmp_path / "history.db"),
+        backup_dir=str(tmp_path / "backups"),
+    )
+    engine.update_many({"lmsys": _items("a", "b")}, "2026-08-01T08:00:00")
+    engine.update_many({"lmsys": _items("a", "b")}, "2026-08-02T09:00:00")
+
+    engine.update_many({"lmsys": _items("b", "a")}, "2026-08-02T08:59:00", replace_day=True)
+
+    assert engine.store.runs("lmsys") == ["2026-08-01T08:00:00", "2026-08-02T09:00:00"]
+    assert [r["delta"] for r in engine.compare("lmsys", _items("b", "a"))] == ["-", "-"]
+
+
+def test_scraped_run_at_prefers_item_timestamps():
+    items = [{"timestamp": "2026-08-01T08:00:00.123"}, {"timestamp": "2026-08-01T08:00:05.456"}, {}]
+
+    assert scraped_run_at(items, "2026-08-09T00:00:00") == "2026-08-01T08:00:05"
+    assert scraped_run_at([{"model_id": "a"}], "2026-08-09T00:00:00") == "2026-08-09T00:00:00"
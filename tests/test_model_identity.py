@@ -0,0 +1,63 @@
+import pytest
+
+from utils.model_identity import ModelIdentity, normalize
+
+
+@pytest.fixture
+def identity(tmp_path):
+    return ModelIdentity(str(tmp_path / "aliases.json"))
+
+
+@pytest.mark.parametrize("name", [
+    "anthropic/claude-opus-4.6",
+    "claude-opus-4-6-thinking",
+    "Claude Opus 4.6 (Adaptive) (Anthropic)",
+])
+def test_normalize_strips_org_parentheticals_and_variants(name):
+    assert normalize(name) == "claude-opus-4-6"
+
+
+def test_normalize_keeps_date_stamps():
+    assert normalize("deepseek/deepseek-v4-flash-0731") == "deepseek-v4-flash-0731"
+    assert normalize("claude-3-5-sonnet-20241022 (thinking)") == "claude-3-5-sonnet-20241022"
+
+
+def test_resolve_joins_spellings_across_sources(identity):
+    canonical = identity.resolve("anthropic/claude-opus-4.6")
+
+    assert identity.resolve("Claude Opus 4.6 (Adaptive) (Anthropic)") == canonical
+    assert identity.resolve("Qwen/Qwen2.5-72B-Instruct") == identity.resolve("qwen-2.5-72b-instruct")
+
+
+def test_resolve_keeps_distinguishing_tokens_apart(identity):
+    assert identity.resolve("qwen/qwen3-235b") != identity.resolve("qwen/qwen3-coder-235b")
+    assert identity.resolve("openai/o3") != identity.resolve("openai/o3-mini")
+
+
+@pytest.mark.parametrize("order", [
+    ["deepseek/deepseek-v4-flash-0731", "deepseek/deepseek-v4-flash-0423"],
+    ["deepseek/deepseek-v4-flash-0423", "deepseek/deepseek-v4-flash-0731"],
+    ["deepseek-v4-flash", "deepseek/deepseek-v4-flash-0731", "deepseek/deepseek-v4-flash-0423"],
+    ["deepseek/deepseek-v4-flash-0731", "deepseek-v4-flash", "deepseek/deepseek-v4-flash-0423"],
+])
+def test_dated_checkpoints_stay_distinct(identity, order):
+    # 同一 OpenRouter 榜单中同时出现的两个 checkpoint
+    resolved = {name: identity.resolve(name) for name in order}
+
+    assert resolved["deepseek/deepseek-v4-flash-0731"] != resolved["deepseek/deepseek-v4-flash-0423"]
+
+
+def test_single_dated_variant_joins_an_undated_source(identity):
+    dated = identity.resolve("deepseek/deepseek-v4-flash-0731")
+
+    assert identity.resolve("DeepSeek V4 Flash") == dated
+
+
+def test_aliases_persist_and_pinned_names_win(identity, tmp_path):
+    identity.resolve("anthropic/claude-opus-4.6")
+    identity.set_alias("claude-opus-5-max", "claude-opus-5")
+    identity.save()
+
+    reloaded = ModelIdentity(identity.alias_file)
+    assert reloaded.resolve("claude-opus-5-max") == "claude-opus-5"
+    assert reloaded.resolve("Claude Opus 4.6 (Anthropic)") == "claude-opus-4-6"
@@ -0,0 +1,117 @@
+import pytest
+import requests
+
+import utils.notifier as notifier_module
+from utils.notifier import HubNotifier, Notifier, ServerChanNotifier, WXPusherNotifier
+
+
+class _Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class _Session:
+    """Replies from `replies` in order (an exception is raised), repeating the last one."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.posts = []
+
+    def post(self, timeout, **request):
+        self.posts.append(request)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(notifier_module.random, "uniform", lambda low, high: 0)
+
+
+@pytest.fixture
+def serverchan(monkeypatch):
+    monkeypatch.setenv("SERVERCHAN_SENDKEY", "key")
+    monkeypatch.setenv("SERVERCHAN_API_URL", "http://127.0.0.1/{sendkey}.send")
+    return ServerChanNotifier()
+
+
+def test_incomplete_channel_cannot_be_instantiated():
+    class Incomplete(Notifier):
+        name = "incomplete"
+
+        def configured(self):
+            return True
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_retries_server_errors_then_succeeds(serverchan):
+    serverchan.session = _Session(_Response(503), requests.ConnectionError("reset"), _Response(200, {"code": 0}))
+
+    outcome = serverchan.deliver("content", "title")
+
+    assert outcome["result"] is True
+    assert outcome["attempts"] == 3
+
+
+def test_gives_up_after_retries(serverchan):
+    serverchan.session = _Session(_Response(503))
+
+    outcome = serverchan.deliver("content", "title")
+
+    assert outcome["result"] is False
+    assert outcome["attempts"] == notifier_module.RETRIES + 1
+    assert outcome["error"] == "HTTP 503"
+
+
+def test_invalid_url_is_not_retried(serverchan):
+    serverchan.session = _Session(requests.exceptions.MissingSchema("no scheme"))
+
+    outcome = serverchan.deliver("content", "title")
+
+    assert outcome["result"] is False
+    assert outcome["attempts"] == 1
+    assert "MissingSchema" in outcome["error"]
+
+
+@pytest.mark.parametrize("body", [["not", "a", "dict"], {"code": 1, "data": "quota exceeded"}, None])
+def test_malformed_reply_is_rejected(serverchan, body):
+    serverchan.session = _Session(_Response(200, body))
+
+    outcome = serverchan.deliver("content", "title")
+
+    assert outcome["result"] is False
+    assert outcome["error"].startswith("rejected")
+
+
+def test_wxpusher_resumes_after_delivered_batches(monkeypatch):
+    monkeypatch.setenv("WXPUSHER_APP_TOKEN", "token")
+    monkeypatch.setenv("WXPUSHER_UIDS", "u1,u2,u3")
+    monkeypatch.setattr(WXPusherNotifier, "batch_size", 1)
+    hub = HubNotifier(["wxpusher"])
+    channel = hub.notifiers[0]
+    channel.session = _Session(_Response(200, {"code": 1000}), _Response(200, {"code": 1001}))
+
+    failed = hub.send_messages(channel, [("m1", "a"), ("m2", "b")])
+    assert (failed["result"], failed["sent"], failed["done"]) == (False, 0, 1)
+
+    channel.session = _Session(_Response(200, {"code": 1000}))
+    resumed = hub.send_messages(channel, [("m1", "a"), ("m2", "b")], failed["done"])
+
+    assert resumed["result"] is True
+    assert [post["json"]["uids"] for post in channel.session.posts] == [["u2"], ["u3"], ["u1"], ["u2"], ["u3"]]
+
+
+def test_each_channel_has_its_own_session(monkeypatch, serverchan):
+    monkeypatch.setenv("WXPUSHER_APP_TOKEN", "token")
+    monkeypatch.setenv("WXPUSHER_UIDS", "u1")
+    hub = HubNotifier()
+
+    assert len({id(n.session) for n in hub.notifiers}) == len(hub.notifiers) == 2
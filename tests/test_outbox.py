@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from utils.notifier import HubNotifier
+from utils.outbox import Outbox
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class _Session:
+    def __init__(self, body):
+        self.body = body
+        self.posts = 0
+
+    def post(self, timeout, **request):
+        self.posts += 1
+        return _Response(self.body)
+
+
+class _RaisingHub:
+    def __init__(self, notifiers):
+        self.notifiers = notifiers
+
+    def send_messages(self, notifier, messages, done=0):
+        raise RuntimeError("channel exploded")
+
+
+def _serverchan_hub(monkeypatch, body):
+    monkeypatch.setenv("SERVERCHAN_SENDKEY", "key")
+    monkeypatch.setenv("SERVERCHAN_API_URL", "http://127.0.0.1/{sendkey}.send")
+    hub = HubNotifier(["serverchan"])
+    hub.notifiers[0].session = _Session(body)
+    return hub
+
+
+def _outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.json"), str(tmp_path / "payloads"))
+    outbox.add("serverchan", [("title", "content")], created_at="2026-10-18T08:00:00")
+    return outbox
+
+
+def _saved(tmp_path):
+    with open(tmp_path / "outbox.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_malformed_reply_is_recorded_as_failure(tmp_path, monkeypatch):
+    outbox = _outbox(tmp_path)
+    for body in (["not", "an", "object"], {"code": 1, "data": "quota exceeded"}):
+        hub = _serverchan_hub(monkeypatch, body)
+        assert asyncio.run(outbox.drain(hub)) == (0, 1)
+
+    [entry] = _saved(tmp_path)
+    assert entry["attempts"] == 2
+    assert entry["status"] == "pending"
+    assert "quota exceeded" in entry["last_error"]
+
+
+def test_raised_exception_is_recorded_and_saved(tmp_path, monkeypatch):
+    outbox = _outbox(tmp_path)
+    notifiers = _serverchan_hub(monkeypatch, {"code": 0}).notifiers
+
+    assert asyncio.run(outbox.drain(_RaisingHub(notifiers))) == (0, 1)
+
+    [entry] = _saved(tmp_path)
+    assert entry["attempts"] == 1
+    assert entry["sent"] == 0
+    assert "channel exploded" in entry["last_error"]
+
+
+def test_drain_delivers_and_removes_payload(tmp_path, monkeypatch):
+    outbox = _outbox(tmp_path)
+    payload = outbox.entries[0]["payload"]
+    hub = _serverchan_hub(monkeypatch, {"code": 0})
+
+    assert asyncio.run(outbox.drain(hub)) == (1, 0)
+    assert _saved(tmp_path) == []
+    assert not (tmp_path / "payloads" / payload.rsplit("/", 1)[-1]).exists()
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from report_model import STALE_STATES, Report, Row, Section, SourceStatus
+from report_renderers import MarkdownRenderer
+from scrapers.registry import load_source
+from utils.report_index import ReportIndex
+
+
+def _openrouter_report(state=None):
+    spec = load_source("openrouter")
+    # OpenRouter 的排名列显示行号，抓取到的排名与行号不同
+    rows = [
+        Row(idx=idx, rank=rank, model_id=model_id, score="-", delta=delta, deltas={}, raw={"tokens": "1B", "growth": "+1%"})
+        for idx, (rank, model_id, delta) in enumerate(
+            [(3, "vendor/alpha", "↑2"), (5, "vendor/beta", "New"), (9, "vendor/gamma", "-")], 1
+        )
+    ]
+    section = Section(
+        key=spec.name,
+        source=spec.name,
+        category=None,
+        title=spec.section.format_title(None),
+        subtitle=spec.section.subtitle,
+        columns=spec.section.columns,
+        rows=rows,
+    )
+    statuses = None if state is None else [SourceStatus(spec.name, spec.label, state)]
+    return spec, Report(datetime(2026, 8, 22, 3, 23, 52), [spec.link], statuses, None, [section])
+
+
+def _index_both_ways(tmp_path, spec, report):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    path = reports_dir / "report_20260822_032352.md"
+    path.write_text(MarkdownRenderer().render(report), encoding="utf-8")
+
+    direct = ReportIndex(str(tmp_path / "direct.db"))
+    direct.add_report(report, str(path))
+    parsed = ReportIndex(str(tmp_path / "parsed.db"))
+    assert parsed.update([spec], str(reports_dir)) == 1
+
+    query = "SELECT report, run_at, key, model_id, rank, delta FROM mentions ORDER BY key, rank"
+    return direct.conn.execute(query).fetchall(), parsed.conn.execute(query).fetchall()
+
+
+@pytest.mark.parametrize("state", [None, "ok", "unchanged"])
+def test_report_indexed_directly_and_from_markdown_match(tmp_path, state):
+    direct_rows, parsed_rows = _index_both_ways(tmp_path, *_openrouter_report(state))
+
+    assert direct_rows == parsed_rows
+    assert [row[4] for row in direct_rows] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("state", STALE_STATES)
+def test_stale_sources_are_skipped_both_ways(tmp_path, state):
+    direct_rows, parsed_rows = _index_both_ways(tmp_path, *_openrouter_report(state))
+
+    assert direct_rows == parsed_rows == []
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+
+from report_model import Highlights, Mover, Report, Row, Section, SourceStatus
+from report_renderers import RENDERERS, DigestRenderer, HTMLRenderer, JSONRenderer, MarkdownRenderer
+from utils.render_cache import RenderCache
+from utils.report_parser import stale_labels
+
+
+COLUMNS = (("排名", "{idx}"), ("模型", "`{model_id}`"), ("分数", "{score}"), ("厂商", "{raw[org]}"), ("变动", "{delta}"))
+
+
+def _rows(*model_ids):
+    return [
+        Row(idx, idx, model_id, 1300 - idx, delta, {"previous": delta}, {"org": "acme"} if idx == 1 else {})
+        for idx, (model_id, delta) in enumerate(model_ids, 1)
+    ]
+
+
+def _report(highlights=None):
+    return Report(
+        generated_at=datetime(2026, 8, 3, 8, 30),
+        links=[("LMSYS", "https://lmarena.ai")],
+        statuses=[SourceStatus("lmsys", "LMSYS", "ok"), SourceStatus("hf", "HF", "fallback")],
+        highlights=highlights or Highlights(),
+        sections=[
+            Section("lmsys_text", "lmsys", "text", "LMSYS Text", ("> 文本榜",), COLUMNS,
+                    _rows(("a", "↑2"), ("<b>", "New"), ("c", "-"))),
+            Section("lmsys_vision", "lmsys", "vision", "LMSYS Vision", (), COLUMNS, _rows(("v", "↓1"))),
+            Section("hf", "hf", None, "HF", (), COLUMNS, _rows(("x", "-"))),
+        ],
+    )
+
+
+def test_markdown_parts_join_to_the_report():
+    report = _report()
+    renderer = MarkdownRenderer()
+
+    markdown = renderer.render(report)
+
+    assert markdown == "".join(md for _, md in renderer.parts(report))
+    assert [name for name, _ in renderer.parts(report)] == [
+        "header", "status", "highlights", "lmsys_text", "lmsys_vision", "hf", "footer",
+    ]
+    assert markdown.startswith("# 🤖 大模型今日趋势-08-03\n")
+    assert "| 1 | `a` | 1299 | acme | 🟢 ↑2 | \n" in markdown
+    # 缺失的原始字段显示为 "-"
+    assert "| 2 | `<b>` | 1298 | - | 🆕 **New** | \n" in markdown
+    # 同一来源的分类之间不加分隔线，新来源前加
+    assert "\n## LMSYS Vision" in markdown and "\n---\n\n## HF" in markdown
+    assert "未检测到显著异常变动" in markdown
+    assert stale_labels(markdown) == {"HF"}
+
+
+def test_markdown_sections_are_reused_from_the_cache(tmp_path):
+    cache_file = str(tmp_path / "render_cache.json")
+    cache = RenderCache(cache_file)
+    first = MarkdownRenderer(cache).render(_report())
+    cache.save()
+
+    report = _report()
+    report.sections[0].rows[0].raw["org"] = "other"
+    reloaded = RenderCache(cache_file)
+
+    assert MarkdownRenderer(reloaded).render(_report()) == first
+    assert (reloaded.hits, reloaded.misses) == (3, 0)
+    assert "| other |" in MarkdownRenderer(reloaded).render(report)
+    assert (reloaded.hits, reloaded.misses) == (3, 1)
+
+
+def test_highlights_are_listed_with_z_scores():
+    highlights = Highlights(
+        new_models=[Mover("b", "LMSYS Text")],
+        big_ups=[Mover("a", "LMSYS Text", "↑2", 2.7)],
+        score_moves=[Mover("x", "HF", "+9", 12.7)],
+    )
+
+    markdown = MarkdownRenderer().render(_report(highlights))
+    digest = DigestRenderer(top=2).render(_report(highlights))
+
+    assert "- `a` (🟢 ↑2, z=+2.7) — *LMSYS Text*\n" in markdown
+    assert "- `x` (+9, z=+12.7) — *HF*\n" in markdown
+    assert "### 📉" not in markdown
+    assert digest.splitlines() == [
+        "大模型今日趋势-08-03",
+        "",
+        "⚠️ HF: 本次抓取缺失，报告沿用历史数据",
+        "新上榜: b",
+        "上升: a ↑2",
+        "分数: x +9",
+        "[LMSYS Text] 1. a (↑2), 2. <b> (New)",
+        "[LMSYS Vision] 1. v (↓1)",
+        "[HF] 1. x",
+    ]
+
+
+def test_html_escapes_fields_and_converts_inline_markup():
+    html = HTMLRenderer().render(_report())
+
+    assert "<td><code>&lt;b&gt;</code></td>" in html
+    assert "<td>🆕 <strong>New</strong></td>" in html
+    assert '<section id="lmsys_text"><h2>LMSYS Text</h2><p>&gt; 文本榜</p>' in html
+    assert "<b>" not in html
+
+
+def test_json_carries_the_whole_model():
+    data = json.loads(JSONRenderer().render(_report()))
+
+    assert data["title"] == "大模型今日趋势-08-03"
+    assert data["generated_at"] == "2026-08-03T08:30:00"
+    assert [s["state"] for s in data["statuses"]] == ["ok", "fallback"]
+    assert data["sections"][0]["rows"][1]["model_id"] == "<b>"
+    assert sorted(RENDERERS) == ["html", "json", "md", "txt"]
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from utils.scheduler import CancelToken, ScraperScheduler, run_cancellable
+
+
+def _run(scheduler, jobs):
+    return asyncio.run(scheduler.run(jobs))
+
+
+def _scripted(*steps):
+    """Job whose n-th attempt sleeps steps[n][0] seconds and then returns (or raises) steps[n][1]."""
+    calls = []
+
+    async def attempt():
+        delay, outcome = steps[min(len(calls), len(steps) - 1)]
+        calls.append(delay)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return (lambda: attempt()), calls
+
+
+def test_retries_failures_and_errors_until_success():
+    job, calls = _scripted((0, None), (0, RuntimeError("boom")), (0, "data"))
+    scheduler = ScraperScheduler(retries=2, backoff_base=0.01)
+
+    outcome = _run(scheduler, {"src": job})["src"]
+
+    assert outcome["result"] == "data"
+    assert outcome["error"] is None
+    assert [entry["outcome"] for entry in outcome["attempt_log"]] == ["failed", "error", "ok"]
+    assert len(calls) == 3
+
+
+def test_gives_up_with_last_error():
+    job, calls = _scripted((0, RuntimeError("boom")))
+    scheduler = ScraperScheduler(retries=1, backoff_base=0.01)
+
+    outcome = _run(scheduler, {"src": job})["src"]
+
+    assert outcome["result"] is None
+    assert outcome["error"] == "RuntimeError('boom')"
+    assert outcome["attempts"] == 2
+
+
+def test_deadline_cancels_a_slow_attempt():
+    job, _ = _scripted((5, "late"))
+    scheduler = ScraperScheduler(deadlines={"src": 0.2}, retries=2, backoff_base=0.01)
+
+    start = time.perf_counter()
+    outcome = _run(scheduler, {"src": job})["src"]
+
+    assert time.perf_counter() - start < 1
+    assert outcome["result"] is None
+    assert outcome["error"] == "deadline exceeded"
+    assert [entry["outcome"] for entry in outcome["attempt_log"]] == ["timeout"]
+
+
+def test_hedged_attempt_wins_and_the_first_is_cancelled():
+    job, calls = _scripted((5, "slow"), (0.05, "fast"))
+    scheduler = ScraperScheduler(deadlines={"src": 2}, hedge_after={"src": 0.1})
+
+    outcome = _run(scheduler, {"src": job})["src"]
+
+    assert outcome["result"] == "fast"
+    assert len(calls) == 2
+    assert sorted((entry["hedged"], entry["outcome"]) for entry in outcome["attempt_log"]) == [
+        (False, "cancelled"), (True, "ok"),
+    ]
+
+
+def test_concurrency_is_bounded():
+    active, peak = 0, 0
+
+    async def attempt():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return True
+
+    outcomes = _run(ScraperScheduler(concurrency=2), {f"src{i}": attempt for i in range(5)})
+
+    assert all(outcome["result"] for outcome in outcomes.values())
+    assert peak == 2
+
+
+def test_cancel_token_blocks_side_effects_after_cancel():
+    token, staged = CancelToken(), []
+
+    assert token.run(staged.append, "first") is None
+    token.cancel()
+    assert token.run(staged.append, "second") is None
+    assert staged == ["first"]
+
+
+def test_timed_out_thread_attempt_does_not_stage():
+    staged = []
+
+    def blocking(cancel_token):
+        time.sleep(0.3)
+        cancel_token.run(staged.append, "result")
+        return True
+
+    scheduler = ScraperScheduler(deadlines={"src": 0.1}, retries=0)
+    outcome = _run(scheduler, {"src": lambda: run_cancellable(blocking)})["src"]
+
+    # asyncio.run 等待线程结束后才返回，此时线程已尝试写入结果
+    assert outcome["error"] == "deadline exceeded"
+    assert staged == []
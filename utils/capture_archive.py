@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+
+ARCHIVE_DIR = "data/captures"
+INDEX_FILE = "index.jsonl"
+
+
+class CaptureArchive:
+    """
+    Compressed, content-addressed archive of raw scraper captures (innerText,
+    table matrices, JSON payloads). Objects live under objects/<sha[:2]>/ as
+    gzip'd JSON, so identical captures across days are stored once; every
+    save appends one line to index.jsonl.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
+
+    def save(self, source_name, kind, payload, captured_at=None):
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(digest)
+        entry = {
+            "captured_at": (captured_at or datetime.now()).isoformat(timespec="seconds"),
+            "source": source_name,
+            "kind": kind,
+            "sha256": digest,
+            "size": len(raw),
+        }
+
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    # mtime=0 让相同内容得到相同的压缩字节
+                    f.write(gzip.compress(raw, mtime=0))
+                os.replace(tmp_path, path)
+            with open(os.path.join(self.root, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return digest
+
+    def entries(self, since=None, until=None, source_name=None):
+        """
+        Index entries with since <= captured_at date <= until (ISO date
+        strings, inclusive), optionally for one source, in capture order.
+        """
+        index_path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return []
+
+        selected = []
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                day = entry["captured_at"][:10]
+                if since and day < since:
+                    continue
+                if until and day > until:
+                    continue
+                if source_name and entry["source"] != source_name:
+                    continue
+                selected.append(entry)
+        return sorted(selected, key=lambda e: e["captured_at"])
+
+    def load(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(gzip.decompress(f.read()).decode("utf-8"))
+
+
+def archive_capture(archive, source_name, kind, payload):
+    # 存档失败不应影响本次抓取
+    if archive is None:
+        return None
+    try:
+        return archive.save(source_name, kind, payload)
+    except Exception as e:
+        print(f"Warning: could not archive {source_name} {kind} capture: {e}")
+        return None
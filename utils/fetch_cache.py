@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+
+CACHE_FILE = "data/fetch_cache.json"
+# 抓取结果未变化时 scraper 返回该值（真值，即视为成功）
+UNCHANGED = "unchanged"
+# 每次抓取都会变化、但不代表榜单内容变化的字段
+VOLATILE_KEYS = ("timestamp",)
+
+
+def _strip_volatile(obj):
+    if isinstance(obj, dict):
+        return {k: _strip_volatile(v) for k, v in obj.items() if k not in VOLATILE_KEYS}
+    if isinstance(obj, list):
+        return [_strip_volatile(v) for v in obj]
+    return obj
+
+
+def payload_hash(payload):
+    canonical = json.dumps(_strip_volatile(payload), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FetchCache:
+    """
+    Per-source fetch cache: ETag/Last-Modified validators for HTTP sources
+    and a content hash of the extracted payload for browser sources. Lets a
+    run recognise a source that has not changed since the last one.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries = self._load()
+
+    def _load(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r", encoding="utf-8-sig") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def _entry(self, source_name):
+        return self.entries.setdefault(source_name, {})
+
+    def validators(self, source_name, url):
+        stored = self.entries.get(source_name, {}).get("validators", {}).get(url, {})
+        headers = {}
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+        return headers
+
+    def store_validators(self, source_name, url, response):
+        validators = self._entry(source_name).setdefault("validators", {})
+        validators[url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def is_unchanged(self, source_name, payload):
+        return self.entries.get(source_name, {}).get("content_hash") == payload_hash(payload)
+
+    def store_payload(self, source_name, payload):
+        entry = self._entry(source_name)
+        entry["content_hash"] = payload_hash(payload)
+        entry["updated_at"] = datetime.now().isoformat()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        with open(self.cache_file, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=4, ensure_ascii=False)
+
+
+def save_current(
+    source_name, file_path, payload, cache=None, run_context=None, cancel_token=None, validators=None,
+):
+    """
+    Write a scraper's `*_current.json`, unless `cache` shows the payload is
+    identical to the one already on disk; returns True or UNCHANGED. With a
+    RunContext the payload is handed over in memory and written at the end
+    of the run instead. `validators` ({url: response}) are the HTTP
+    validators of the downloads the payload was parsed from; they are
+    cached together with it, so a later conditional GET only answers 304
+    once the payload built from that download has been kept. With a
+    CancelToken nothing is saved once the attempt has been cancelled, and
+    False is returned.
+    """
+    if cancel_token is not None:
+        # 调度器已放弃的尝试（超时或对冲落败）不再写入运行上下文与缓存
+        saved = cancel_token.run(save_current, source_name, file_path, payload, cache, run_context, None, validators)
+        if saved is None:
+            print(f"{source_name}: attempt was cancelled; result discarded.")
+            return False
+        return saved
+    if cache is not None:
+        for url, response in (validators or {}).items():
+            cache.store_validators(source_name, url, response)
+    unchanged = cache is not None and os.path.exists(file_path) and cache.is_unchanged(source_name, payload)
+    if run_context is not None:
+        run_context.stage(source_name, payload, changed=not unchanged)
+    if unchanged:
+        return UNCHANGED
+
+    if run_context is None:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=4, ensure_ascii=False)
+    if cache is not None:
+        cache.store_payload(source_name, payload)
+    return True
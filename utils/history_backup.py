@@ -0,0 +1,266 @@
+"""
+Deduplicated, compressed backups of the history state ({key: snapshot}).
+
+    python -m utils.history_backup migrate [--remove-legacy]
+    python -m utils.history_backup list
+    python -m utils.history_backup restore 20260821_033251 [--output data/history.json]
+
+Each key's snapshot is stored once as gzip'd JSON under objects/<sha[:2]>/,
+without the per-item fields that change on every scrape (VOLATILE_KEYS, as
+in utils.fetch_cache); those are kept in the manifest, so a snapshot whose
+rankings did not change shares the previous object. manifest.jsonl gets
+one line per backup listing only the keys whose content or scrape time
+changed (or that disappeared) since the previous one. restore() replays
+the manifest up to a timestamp and rebuilds that day's history.json.
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from utils.fetch_cache import VOLATILE_KEYS
+
+
+BACKUP_DIR = "data/backups"
+MANIFEST_FILE = "manifest.jsonl"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+# 旧版整份拷贝的备份文件：history_YYYYMMDD_HHMMSS.json
+LEGACY_PATTERN = re.compile(r"history_(\d{8}_\d{6})\.json$")
+
+
+def _normalize_timestamp(value):
+    """'20260821_033251', '2026-08-21T03:32:51' or '2026-08-21' -> '20260821_033251'."""
+    digits = re.sub(r"\D", "", value)
+    if len(digits) < 8:
+        raise ValueError(f"not a timestamp: {value!r}")
+    # 只给日期时包含当天的所有备份
+    digits = digits + "235959" if len(digits) == 8 else digits[:14].ljust(14, "0")
+    return f"{digits[:8]}_{digits[8:]}"
+
+
+def _split_volatile(value):
+    """
+    (body, stamps): a snapshot without its items' volatile fields, and those
+    fields by column, {field: value shared by every item, or [value per item]}.
+    """
+    if not isinstance(value, list):
+        return value, None
+    body, stamps = [], {}
+    for position, item in enumerate(value):
+        if not isinstance(item, dict):
+            body.append(item)
+            continue
+        body.append({k: v for k, v in item.items() if k not in VOLATILE_KEYS})
+        for k in VOLATILE_KEYS:
+            if k in item:
+                stamps.setdefault(k, [None] * len(value))[position] = item[k]
+    # 同一快照的条目通常共用一个抓取时间，只存一份
+    for k, values in stamps.items():
+        if all(v is not None for v in values) and len(set(values)) == 1:
+            stamps[k] = values[0]
+    return body, stamps or None
+
+
+def _merge_volatile(body, stamps):
+    if not stamps or not isinstance(body, list):
+        return body
+    merged = []
+    for position, item in enumerate(body):
+        if isinstance(item, dict):
+            item = dict(item)
+            for k, values in stamps.items():
+                v = values[position] if isinstance(values, list) else values
+                if v is not None:
+                    item[k] = v
+        merged.append(item)
+    return merged
+
+
+class HistoryBackup:
+    def __init__(self, root=BACKUP_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def _put(self, value):
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                # mtime=0 让相同内容得到相同的压缩字节
+                f.write(gzip.compress(raw, mtime=0))
+            os.replace(tmp_path, path)
+        return digest
+
+    def _get(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(gzip.decompress(f.read()).decode("utf-8"))
+
+    def manifest(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def timestamps(self):
+        return [entry["timestamp"] for entry in self.manifest()]
+
+    def _replay(self, manifest, until=None):
+        # 按时间顺序回放增量清单，得到 until 时刻各 key 对应的对象、抓取时间字段及 key 顺序
+        digests, stamps, order = {}, {}, []
+        for entry in sorted(manifest, key=lambda e: e["timestamp"]):
+            if until is not None and entry["timestamp"] > until:
+                break
+            for key in entry.get("removed", []):
+                digests.pop(key, None)
+                stamps.pop(key, None)
+            digests.update(entry.get("set", {}))
+            stamps.update(entry.get("stamps", {}))
+            order = entry.get("order", order)
+        order = [key for key in order if key in digests] + [key for key in digests if key not in order]
+        return digests, stamps, order
+
+    def save(self, history, timestamp=None):
+        """
+        Back up one history state; only keys whose content changed since the
+        previous backup are written, and nothing at all when the state equals
+        the previous backup. Returns the timestamp of the backup holding it.
+        """
+        with self._lock:
+            manifest = self.manifest()
+            if timestamp is None:
+                timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+                # 同一秒内的多次备份顺延一秒，时间戳保持唯一（导入与恢复都按时间戳区分备份）
+                latest = max((entry["timestamp"] for entry in manifest), default=None)
+                if latest is not None and timestamp <= latest:
+                    following = datetime.strptime(latest, TIMESTAMP_FORMAT) + timedelta(seconds=1)
+                    timestamp = following.strftime(TIMESTAMP_FORMAT)
+            previous, previous_stamps, previous_order = self._replay(manifest, until=timestamp)
+            # 插在已有备份之前的备份存全量，以免改变其后各增量的基准
+            if any(entry["timestamp"] > timestamp for entry in manifest):
+                previous, previous_stamps, previous_order = {}, {}, []
+            current, stamps = {}, {}
+            for key, value in history.items():
+                body, stamps[key] = _split_volatile(value)
+                current[key] = self._put(body)
+
+            entry = {
+                "timestamp": timestamp,
+                "set": {key: digest for key, digest in current.items() if previous.get(key) != digest},
+                "removed": sorted(set(previous) - set(current)),
+            }
+            changed_stamps = {key: stamp for key, stamp in stamps.items() if previous_stamps.get(key) != stamp}
+            if changed_stamps:
+                entry["stamps"] = changed_stamps
+            # key 顺序变化时才记录，恢复出的 history.json 与原文件顺序一致
+            if list(current) != previous_order:
+                entry["order"] = list(current)
+            # 与上一份备份完全相同时不追加条目
+            if previous and not (entry["set"] or entry["removed"] or "stamps" in entry or "order" in entry):
+                return max(e["timestamp"] for e in manifest if e["timestamp"] <= timestamp)
+
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._manifest_path(), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return timestamp
+
+    def restore(self, timestamp=None):
+        """
+        The history state of the latest backup at or before `timestamp`
+        (None means the latest backup), or None if there is none.
+        """
+        manifest = self.manifest()
+        until = _normalize_timestamp(timestamp) if timestamp else None
+        if not any(until is None or entry["timestamp"] <= until for entry in manifest):
+            return None
+
+        digests, stamps, order = self._replay(manifest, until)
+        return {key: _merge_volatile(self._get(digests[key]), stamps.get(key)) for key in order}
+
+    def restore_to(self, timestamp, output_file):
+        history = self.restore(timestamp)
+        if history is None:
+            raise LookupError(f"no backup at or before {timestamp}")
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=4, ensure_ascii=False)
+        return output_file
+
+    def migrate_legacy(self, remove_legacy=False):
+        """
+        Pack the old full-copy history_*.json backups into the store, oldest
+        first. Already-packed timestamps are skipped; with remove_legacy a
+        file is deleted only after it restores identically.
+        """
+        packed = set(self.timestamps())
+        legacy = []
+        for path in glob.glob(os.path.join(self.root, "history_*.json")):
+            match = LEGACY_PATTERN.search(os.path.basename(path))
+            if match:
+                legacy.append((match.group(1), path))
+
+        migrated, removed = 0, 0
+        for timestamp, path in sorted(legacy):
+            with open(path, "r", encoding="utf-8-sig") as f:
+                history = json.load(f)
+            if timestamp not in packed:
+                self.save(history, timestamp)
+                migrated += 1
+            if remove_legacy:
+                if self.restore(timestamp) != history:
+                    raise RuntimeError(f"restored backup {timestamp} does not match {path}; keeping it")
+                os.remove(path)
+                removed += 1
+        return migrated, removed
+
+
+def backup_history(history, backup=None):
+    # 备份失败不应阻止本次历史写入
+    try:
+        return (backup or HistoryBackup()).save(history)
+    except Exception as e:
+        print(f"Warning: could not back up history: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicated history backups.")
+    parser.add_argument("--root", default=BACKUP_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="pack legacy history_*.json backups")
+    migrate.add_argument("--remove-legacy", action="store_true", help="delete legacy files once verified")
+    commands.add_parser("list", help="list backup timestamps")
+    restore = commands.add_parser("restore", help="rebuild history.json as of a timestamp")
+    restore.add_argument("timestamp", help="YYYYMMDD_HHMMSS, ISO timestamp or YYYY-MM-DD")
+    restore.add_argument("--output", default="data/history_restored.json")
+    args = parser.parse_args()
+
+    backup = HistoryBackup(args.root)
+    if args.command == "migrate":
+        migrated, removed = backup.migrate_legacy(args.remove_legacy)
+        print(f"Packed {migrated} legacy backups; removed {removed} legacy files.")
+    elif args.command == "list":
+        for timestamp in backup.timestamps():
+            print(timestamp)
+    else:
+        path = backup.restore_to(args.timestamp, args.output)
+        print(f"History as of {args.timestamp} restored to {path}")
+
+
+if __name__ == "__main__":
+    main()
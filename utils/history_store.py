@@ -0,0 +1,299 @@
+import json
+import os
+import sqlite3
+from collections.abc import Mapping
+from datetime import datetime
+
+
+HISTORY_DB = "data/history.db"
+# 迁移到 SQLite 之前的历史格式：{key: 最新快照}
+LEGACY_HISTORY_FILE = "data/history.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    key TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    item_count INTEGER NOT NULL,
+    PRIMARY KEY (key, run_at)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    model_id TEXT,
+    rank INTEGER,
+    item TEXT NOT NULL,
+    PRIMARY KEY (key, run_at, position)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_model ON entries (model_id, run_at);
+CREATE TABLE IF NOT EXISTS imported_files (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    imported_at TEXT NOT NULL
+);
+"""
+
+
+def _rank(item):
+    try:
+        return int(item.get("rank"))
+    except (TypeError, ValueError):
+        return None
+
+
+def scraped_run_at(items, fallback):
+    """Run time of a snapshot from its items' `timestamp` (latest scrape time), else `fallback`."""
+    # 备份/迁移时刻晚于数据抓取时刻，优先用条目自带的抓取时间
+    stamps = [item.get("timestamp") for item in items if isinstance(item, dict) and item.get("timestamp")]
+    if stamps:
+        return max(stamps)[:19]
+    return fallback
+
+
+def import_legacy_file(store, history_file=LEGACY_HISTORY_FILE):
+    """Append the snapshots of a legacy history.json to `store`; returns the number of keys."""
+    with open(history_file, "r", encoding="utf-8-sig") as f:
+        legacy = json.load(f)
+    # 快照时间取条目自带的抓取时间；文件修改时间在 CI 中是检出时间，仅作兜底
+    mtime = datetime.fromtimestamp(os.path.getmtime(history_file)).isoformat(timespec="seconds")
+    by_run = {}
+    for key, items in legacy.items():
+        run_at = scraped_run_at(items, mtime) if isinstance(items, list) else mtime
+        by_run.setdefault(run_at, {})[key] = items
+    for run_at, updates in sorted(by_run.items()):
+        store.append(updates, run_at=run_at)
+    return len(legacy)
+
+
+class HistoryStore:
+    """
+    Append-only ranking history in SQLite. Every run adds one snapshot per
+    `source` / `source_category` key; nothing is rewritten, so any past
+    ranking stays queryable. Entries are indexed by (key, run_at) and
+    (model_id, run_at).
+    """
+
+    def __init__(self, db_file=HISTORY_DB):
+        self.db_file = db_file
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM snapshots LIMIT 1").fetchone() is None
+
+    def append(self, updates, run_at=None):
+        """
+        Store one run: {key: [items]}. Re-appending the same (key, run_at)
+        replaces that snapshot, so replays are idempotent.
+        """
+        run_at = run_at or datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            for key, items in updates.items():
+                self._write(key, items, run_at)
+        return run_at
+
+    def replace_day(self, updates, run_at):
+        """
+        Store rebuilt snapshots in place of the runs on `run_at`'s day. A key
+        keeps the time of its latest run that day, so the rebuilt snapshot is
+        the one snapshot() returns for that day; its other runs that day are
+        dropped. Keys without a run that day are stored at `run_at`. Returns
+        {key: run_at used}.
+        """
+        day = run_at[:10]
+        used = {}
+        with self.conn:
+            for key, items in updates.items():
+                same_day = [
+                    row[0] for row in self.conn.execute(
+                        "SELECT run_at FROM snapshots WHERE key = ? AND substr(run_at, 1, 10) = ? ORDER BY run_at",
+                        (key, day),
+                    )
+                ]
+                # 实时运行的 run_at 晚于抓取时间；沿用它，而不是在当天再追加一次运行
+                for stale in same_day[:-1]:
+                    self.conn.execute("DELETE FROM entries WHERE key = ? AND run_at = ?", (key, stale))
+                    self.conn.execute("DELETE FROM snapshots WHERE key = ? AND run_at = ?", (key, stale))
+                used[key] = same_day[-1] if same_day else run_at
+                self._write(key, items, used[key])
+        return used
+
+    def _write(self, key, items, run_at):
+        # 调用方负责事务
+        items = items if isinstance(items, list) else []
+        self.conn.execute("DELETE FROM entries WHERE key = ? AND run_at = ?", (key, run_at))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO snapshots (key, run_at, item_count) VALUES (?, ?, ?)",
+            (key, run_at, len(items)),
+        )
+        self.conn.executemany(
+            "INSERT INTO entries (key, run_at, position, model_id, rank, item) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    key,
+                    run_at,
+                    position,
+                    item.get("model_id") if isinstance(item, dict) else None,
+                    _rank(item) if isinstance(item, dict) else None,
+                    json.dumps(item, ensure_ascii=False, separators=(",", ":")),
+                )
+                for position, item in enumerate(items)
+            ],
+        )
+
+    def keys(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT key FROM snapshots ORDER BY key")]
+
+    def runs(self, key=None):
+        if key is None:
+            query, params = "SELECT DISTINCT run_at FROM snapshots ORDER BY run_at", ()
+        else:
+            query, params = "SELECT run_at FROM snapshots WHERE key = ? ORDER BY run_at", (key,)
+        return [row[0] for row in self.conn.execute(query, params)]
+
+    def run_snapshot(self, key, run_at):
+        rows = self.conn.execute(
+            "SELECT item FROM entries WHERE key = ? AND run_at = ? ORDER BY position", (key, run_at)
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def snapshot(self, key, at=None):
+        """
+        The snapshot of `key` from the latest run at or before `at` (an ISO
+        timestamp or date; None means the latest run), or None.
+        """
+        if at is None:
+            row = self.conn.execute("SELECT MAX(run_at) FROM snapshots WHERE key = ?", (key,)).fetchone()
+        else:
+            # 只给日期时包含当天的所有运行
+            bound = at if "T" in at else f"{at}T23:59:59"
+            row = self.conn.execute(
+                "SELECT MAX(run_at) FROM snapshots WHERE key = ? AND run_at <= ?", (key, bound)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return self.run_snapshot(key, row[0])
+
+    def snapshots_at(self, at=None):
+        """{key: items} as history stood at `at` (None means now)."""
+        result = {}
+        for key in self.keys():
+            items = self.snapshot(key, at)
+            if items is not None:
+                result[key] = items
+        return result
+
+    def first_seen_ranks(self, key):
+        """{model_id: rank} at each model's first appearance under `key`."""
+        rows = self.conn.execute(
+            """
+            SELECT e.model_id, e.rank
+            FROM entries e
+            JOIN (
+                SELECT model_id, MIN(run_at) AS first_run
+                FROM entries
+                WHERE key = ? AND model_id IS NOT NULL
+                GROUP BY model_id
+            ) f ON e.model_id = f.model_id AND e.run_at = f.first_run
+            WHERE e.key = ? AND e.rank IS NOT NULL
+            ORDER BY e.position
+            """,
+            (key, key),
+        )
+        # 同一快照中重复出现的模型以最后一条为准（与 compare 中的 _rank_map 一致）
+        return dict(rows)
+
+    def recent_entries(self, runs):
+        """[(key, run_at, model_id, rank, score)] from the last `runs` runs of every key."""
+        return self.conn.execute(
+            """
+            WITH recent AS (
+                SELECT key, run_at FROM (
+                    SELECT key, run_at, ROW_NUMBER() OVER (PARTITION BY key ORDER BY run_at DESC) AS n
+                    FROM snapshots
+                ) WHERE n <= ?
+            )
+            SELECT e.key, e.run_at, e.model_id, e.rank, json_extract(e.item, '$.score')
+            FROM entries e JOIN recent r ON e.key = r.key AND e.run_at = r.run_at
+            WHERE e.model_id IS NOT NULL AND e.rank IS NOT NULL
+            """,
+            (runs,),
+        ).fetchall()
+
+    def imported_fingerprints(self):
+        return dict(self.conn.execute("SELECT name, fingerprint FROM imported_files"))
+
+    def mark_imported(self, files):
+        """Record imported files as {name: fingerprint} so re-imports skip them."""
+        imported_at = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO imported_files (name, fingerprint, imported_at) VALUES (?, ?, ?)",
+                [(name, fingerprint, imported_at) for name, fingerprint in files.items()],
+            )
+
+    def model_history(self, model_id, key=None, since=None):
+        """[(run_at, key, rank, item)] for one model in run order."""
+        query = "SELECT run_at, key, rank, item FROM entries WHERE model_id = ?"
+        params = [model_id]
+        if key is not None:
+            query += " AND key = ?"
+            params.append(key)
+        if since is not None:
+            query += " AND run_at >= ?"
+            params.append(since)
+        query += " ORDER BY run_at, key"
+        return [
+            (run_at, row_key, rank, json.loads(item))
+            for run_at, row_key, rank, item in self.conn.execute(query, params)
+        ]
+
+
+class LatestHistory(Mapping):
+    """
+    Read-only {key: latest snapshot} view over a HistoryStore, shaped like
+    the old history.json dict. Snapshots are loaded on first access.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._keys = None
+        self._cache = {}
+
+    def __getitem__(self, key):
+        if key not in self._cache:
+            items = self.store.snapshot(key)
+            if items is None:
+                raise KeyError(key)
+            self._cache[key] = items
+        return self._cache[key]
+
+    def __iter__(self):
+        if self._keys is None:
+            self._keys = self.store.keys()
+        return iter(self._keys)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return key in self._cache or key in set(self)
+
+    def refresh(self, keys=None):
+        self._keys = None
+        if keys is None:
+            self._cache.clear()
+        for key in keys or ():
+            self._cache.pop(key, None)
@@ -0,0 +1,273 @@
+"""
+Cross-source model identity: maps each source's model name to one canonical ID.
+
+    python -m utils.model_identity resolve "Claude Opus 4.6 (Anthropic)" anthropic/claude-opus-4.6
+    python -m utils.model_identity alias "claude-opus-5-max" claude-opus-5
+    python -m utils.model_identity stats
+
+The same model is `anthropic/claude-opus-4.6` on OpenRouter,
+`claude-opus-4-6-thinking` on Arena and `Claude Opus 4.6 (Adaptive)
+(Anthropic)` on Artificial Analysis. normalize() reduces all of them to
+`claude-opus-4-6`. Names that still differ are matched fuzzily. Candidates
+come from a trigram index, not from comparing every pair. The index is
+blocked by the name's tokens containing digits (version, size), since a
+match needs those to be identical. A match also must not add a variant
+token such as `pro` or `mini`. A trailing date stamp (`-0731`,
+`-20241022`) marks a distinct checkpoint and stays in the ID; a dated and
+an undated name are joined only while the model has a single dated
+variant, i.e. when one source dates the checkpoint and another does not.
+Every resolution is kept in the alias table (data/model_aliases.json).
+Entries added by hand there (or with `alias`) take precedence.
+"""
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+
+
+ALIAS_FILE = "data/model_aliases.json"
+
+# 括号内多为推理强度、部署方或量化信息，如 "(max)"、"(Google (AI Studio))"、"[web-search]"
+PARENTHETICAL = re.compile(r"\([^()]*\)|\[[^\[\]]*\]")
+SEPARATORS = re.compile(r"[^a-z0-9]+")
+DIGITS = re.compile(r"\d")
+LONG_ALPHA = re.compile(r"[a-z]{3,}")
+# 名称末尾表示同一模型不同调用方式的词：推理强度、搜索、预览、部署方、量化
+TRAILING_VARIANTS = {
+    "thinking", "high", "xhigh", "low", "medium", "minimal", "adaptive", "reasoning", "non",
+    "search", "preview", "latest", "exp", "free", "vertex", "bedrock", "azure",
+    "fp8", "fp4", "bf16", "int4", "int8", "pricing",
+}
+# 日期戳（MMDD、YYMM、YYMMDD、YYYYMMDD）区分同一模型的不同 checkpoint，保留在规范 ID 中
+DATE_STAMP = re.compile(r"^\d{4}$|^\d{6,8}$")
+CONTEXT_SIZE = re.compile(r"^\d+k$")
+# 这些词不同说明是不同的模型（同一系列的不同尺寸/档次），模糊匹配时不能忽略
+DISTINGUISHING = {
+    "pro", "plus", "max", "ultra", "turbo", "flash", "lite", "mini", "nano", "air", "fast",
+    "instruct", "base", "chat", "coder", "code", "vision", "vl", "audio", "image", "video",
+    "small", "large", "opus", "sonnet", "haiku", "omni", "codex",
+}
+
+NGRAM = 3
+MATCH_THRESHOLD = 0.75
+# 每个名称只对共享 n-gram 最多的若干候选计算相似度
+MAX_CANDIDATES = 20
+# 过于常见的 n-gram（如 "-4-"）区分度低，查询时跳过
+MAX_POSTING = 2000
+
+
+def _variant_token(token):
+    return token in TRAILING_VARIANTS or bool(CONTEXT_SIZE.match(token))
+
+
+def _undated(key):
+    """`key` without its trailing date stamp, or None if it has none."""
+    base, _, last = key.rpartition("-")
+    return base if base and DATE_STAMP.match(last) else None
+
+
+def normalize(name):
+    """'Claude Opus 4.6 (Adaptive) (Anthropic)' / 'anthropic/claude-opus-4.6' -> 'claude-opus-4-6'."""
+    if not isinstance(name, str):
+        return ""
+    text = name.strip().lower()
+    # 去掉组织前缀：anthropic/claude-opus-4.6、Qwen/Qwen2.5-72B-Instruct
+    text = text.rsplit("/", 1)[-1]
+    # 由内向外去掉嵌套括号
+    stripped = PARENTHETICAL.sub(" ", text)
+    while stripped != text:
+        text, stripped = stripped, PARENTHETICAL.sub(" ", stripped)
+    tokens = [token for token in SEPARATORS.split(text) if token]
+    while len(tokens) > 1 and _variant_token(tokens[-1]):
+        tokens.pop()
+    return "-".join(tokens)
+
+
+def _ngrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def _skeleton(word):
+    # 保留数字与短字母前后缀（v3、7b、a4b），去掉较长的字母部分（qwen3 -> 3），使 qwen-2.5 与 qwen2.5 同块
+    return LONG_ALPHA.sub("", word)
+
+
+def _block(key):
+    # 带数字的词（版本号、尺寸，如 v3 与 o3、7b 与 8b）必须一致，按其骨架分块
+    return " ".join(sorted({_skeleton(word) for word in key.split("-") if DIGITS.search(word)}))
+
+
+def _compatible(key, other):
+    # 差异词中不能有区分档次的词（"qwen3" 与 "qwen3-coder"）
+    words = set(key.split("-")) ^ set(other.split("-"))
+    return not (words & DISTINGUISHING)
+
+
+class ModelIdentity:
+    """
+    Alias table plus trigram index over the normalized names seen so far.
+    resolve() returns a canonical ID for any raw name and remembers it.
+    """
+
+    def __init__(self, alias_file=ALIAS_FILE):
+        self.alias_file = alias_file
+        self.aliases = self._load()
+        # 规范化名称 -> 规范 ID；(分块, n-gram) -> 规范化名称集合。首次遇到别名表中没有的名称时才构建
+        self.keys = None
+        self.postings = {}
+        # 不带日期的名称 -> 已见过的带日期变体
+        self.dated = {}
+        self.stats = Counter()
+        self._dirty = False
+
+    def _load(self):
+        if os.path.exists(self.alias_file):
+            try:
+                with open(self.alias_file, "r", encoding="utf-8-sig") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.alias_file) or ".", exist_ok=True)
+        with open(self.alias_file, "w", encoding="utf-8") as f:
+            json.dump(self.aliases, f, indent=1, ensure_ascii=False, sort_keys=True)
+        self._dirty = False
+
+    def _ensure_index(self):
+        if self.keys is not None:
+            return
+        self.keys = {}
+        for raw, canonical in self.aliases.items():
+            self._index(normalize(canonical) or canonical, canonical)
+            self._index(normalize(raw), canonical)
+
+    def _index(self, key, canonical):
+        if not key or key in self.keys:
+            return
+        self.keys[key] = canonical
+        base = _undated(key)
+        if base is not None:
+            self.dated.setdefault(base, set()).add(key)
+        block = _block(key)
+        for gram in _ngrams(key):
+            self.postings.setdefault((block, gram), set()).add(key)
+
+    def _fuzzy(self, key):
+        grams = _ngrams(key)
+        block = _block(key)
+        postings = [self.postings[block, gram] for gram in grams if (block, gram) in self.postings]
+        selective = [keys for keys in postings if len(keys) <= MAX_POSTING]
+        # 全是常见 n-gram 时退而取最稀有的几个
+        if not selective:
+            selective = sorted(postings, key=len)[:3]
+
+        shared = Counter()
+        for keys in selective:
+            shared.update(keys)
+
+        best, best_score = None, MATCH_THRESHOLD
+        for other, _ in shared.most_common(MAX_CANDIDATES):
+            other_grams = _ngrams(other)
+            score = 2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+            if score >= best_score and _compatible(key, other):
+                best, best_score = other, score
+        return best
+
+    def _undated_match(self, key):
+        # 只有一个带日期的 checkpoint 时，带日期与不带日期的名称视为同一模型
+        base = _undated(key)
+        if base is not None:
+            return base if base in self.keys and not self.dated.get(base) else None
+        variants = self.dated.get(key, ())
+        return next(iter(variants)) if len(variants) == 1 else None
+
+    def resolve(self, name):
+        """Canonical ID of a raw model name; new names become their own canonical ID."""
+        if name in self.aliases:
+            self.stats["cached"] += 1
+            return self.aliases[name]
+
+        key = normalize(name)
+        if not key:
+            return name
+        self._ensure_index()
+        if key in self.keys:
+            self.stats["normalized"] += 1
+            canonical = self.keys[key]
+        else:
+            match, path = self._undated_match(key), "undated"
+            if match is None:
+                match, path = self._fuzzy(key), "fuzzy"
+            if match is not None:
+                self.stats[path] += 1
+                canonical = self.keys[match]
+            else:
+                self.stats["new"] += 1
+                canonical = key
+            self._index(key, canonical)
+
+        self.aliases[name] = canonical
+        self._dirty = True
+        return canonical
+
+    def set_alias(self, name, canonical):
+        """Pin `name` (and anything normalizing like it) to `canonical`."""
+        self.aliases[name] = canonical
+        key = normalize(name)
+        if key:
+            self._ensure_index()
+            self._index(key, canonical)
+            self.keys[key] = canonical
+        self._dirty = True
+
+    def annotate(self, data):
+        """Add `canonical_id` to every item of a payload (flat list or {category: [items]})."""
+        groups = data.values() if isinstance(data, dict) else [data]
+        for items in groups:
+            for item in items if isinstance(items, list) else []:
+                if isinstance(item, dict) and item.get("model_id"):
+                    item["canonical_id"] = self.resolve(item["model_id"])
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-source model identity.")
+    parser.add_argument("--aliases", default=ALIAS_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    resolve = commands.add_parser("resolve", help="print the canonical ID of each name")
+    resolve.add_argument("names", nargs="+")
+    alias = commands.add_parser("alias", help="pin a name to a canonical ID")
+    alias.add_argument("name")
+    alias.add_argument("canonical")
+    commands.add_parser("stats", help="alias table size")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    identity = ModelIdentity(args.aliases)
+    load_time = time.perf_counter() - start
+
+    if args.command == "resolve":
+        for name in args.names:
+            print(f"{name} -> {identity.resolve(name)}")
+        identity.save()
+    elif args.command == "alias":
+        identity.set_alias(args.name, args.canonical)
+        identity.save()
+        print(f"{args.name} -> {args.canonical}")
+    else:
+        canonical = set(identity.aliases.values())
+        print(
+            f"{len(identity.aliases)} aliases, {len(canonical)} canonical IDs, "
+            f"loaded in {load_time:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
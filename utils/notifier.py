@@ -1,73 +1,288 @@
+import asyncio
 import os
+import random
+import time
+from abc import ABC, abstractmethod
+
 import requests
-import json
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
-class ServerChanNotifier:
-    def __init__(self):
-        self.sendkey = os.getenv("SERVERCHAN_SENDKEY")
-        self.api_url = f"https://sctapi.ftqq.com/{self.sendkey}.send" if self.sendkey else None
+# 单次请求超时、连接池大小，以及 5xx/超时/连接错误的重试次数与退避参数
+TIMEOUT = 10
+POOL_SIZE = 4
+RETRIES = 2
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 10.0
 
-    def send(self, content, title="LLM Trend Observer Report"):
-        if not self.api_url:
+# 已注册的推送渠道：name -> Notifier 子类
+CHANNELS = {}
+
+
+def register_channel(cls):
+    """Class decorator adding a Notifier subclass to CHANNELS under its `name`."""
+    CHANNELS[cls.name] = cls
+    return cls
+
+
+def pooled_session(pool_size=POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RetryableError(Exception):
+    pass
+
+
+class DeliveryError(Exception):
+    pass
+
+
+class Notifier(ABC):
+    """
+    One push channel. Subclasses set `name` and the payload limits used by
+    PayloadBuilder and implement configured(), build_requests() and
+    accepted(); a channel missing one of them cannot be instantiated.
+    deliver() posts each request over the channel's own pooled session
+    with blocking `requests` calls, and retries 5xx, timeouts and connection
+    errors with jittered exponential backoff. A channel is used by one
+    thread at a time (requests.Session is not thread-safe).
+    """
+
+    name = None
+    max_bytes = 32000
+    max_parts = 1
+
+    def __init__(self, session=None, retries=RETRIES):
+        self.session = session or pooled_session()
+        self.retries = retries
+
+    @abstractmethod
+    def configured(self):
+        """True when the channel's credentials are set."""
+
+    @abstractmethod
+    def build_requests(self, content, title):
+        """Keyword arguments of each session.post() needed to send one message."""
+
+    @abstractmethod
+    def accepted(self, result):
+        """True when the channel's reply to one request reports success."""
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+    def _post(self, request):
+        try:
+            response = self.session.post(timeout=TIMEOUT, **request)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}") from e
+        except requests.RequestException as e:
+            # InvalidURL、MissingSchema、TooManyRedirects 等重试也不会成功
+            raise DeliveryError(f"{type(e).__name__}: {e}") from e
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RetryableError(f"HTTP {response.status_code}")
+        try:
+            return response.json()
+        except ValueError:
+            return {"status": response.status_code, "text": response.text[:200]}
+
+    def _accepted(self, result):
+        try:
+            return self.accepted(result)
+        except Exception:
             return False
-        payload = {"title": title, "desp": content}
+
+    def deliver(self, content, title, done=0):
+        """
+        {"result", "error", "attempts", "done", "latency"} of sending one
+        message through this channel; never raises. A message may take
+        several requests (e.g. recipient batches): the first `done` are
+        skipped, and "done" is how many have been delivered so far.
+        """
+        start = time.perf_counter()
+        attempts, error = 0, None
         try:
-            response = requests.post(self.api_url, data=payload, timeout=10)
-            result = response.json()
-            if result.get("code") == 0 or (result.get("data") and result.get("data").get("errno") == 0):
-                print(f"Success: Sent via ServerChan.")
-                return True
-            print(f"Error: ServerChan failed: {result}")
+            requests_to_send = self.build_requests(content, title)
         except Exception as e:
-            print(f"Error: ServerChan exception: {e}")
-        return False
+            requests_to_send, error = [], f"could not build request: {e!r}"
+        for request in requests_to_send[done:]:
+            for attempt in range(1, self.retries + 2):
+                attempts += 1
+                try:
+                    result = self._post(request)
+                except RetryableError as e:
+                    error = str(e)
+                    if attempt <= self.retries:
+                        time.sleep(self._backoff(attempt))
+                    continue
+                except Exception as e:
+                    error = str(e) if isinstance(e, DeliveryError) else repr(e)
+                    break
+                error = None if self._accepted(result) else f"rejected: {result}"
+                break
+            if error:
+                break
+            done += 1
+        return {
+            "result": error is None,
+            "error": error,
+            "attempts": attempts,
+            "done": done,
+            "latency": round(time.perf_counter() - start, 2),
+        }
 
-class WXPusherNotifier:
-    def __init__(self):
+    def send(self, content, title="LLM Trend Observer Report"):
+        outcome = self.deliver(content, title)
+        if outcome["result"]:
+            print(f"Success: Sent via {self.name}.")
+        else:
+            print(f"Error: {self.name} failed: {outcome['error']}")
+        return outcome["result"]
+
+
+@register_channel
+class ServerChanNotifier(Notifier):
+    name = "serverchan"
+    # desp 上限 32KB；免费额度每天只有几条，整份报告放不下时直接发摘要
+    max_bytes = 32000
+    max_parts = 1
+
+    def __init__(self, session=None, retries=RETRIES):
+        super().__init__(session, retries)
+        self.sendkey = os.getenv("SERVERCHAN_SENDKEY")
+        # 接口地址可通过环境变量覆盖（如指向本地替身服务）
+        url = os.getenv("SERVERCHAN_API_URL", "https://sctapi.ftqq.com/{sendkey}.send")
+        self.api_url = url.format(sendkey=self.sendkey) if self.sendkey else None
+
+    def configured(self):
+        return bool(self.api_url)
+
+    def build_requests(self, content, title):
+        return [{"url": self.api_url, "data": {"title": title, "desp": content}}]
+
+    def accepted(self, result):
+        if not isinstance(result, dict):
+            return False
+        data = result.get("data")
+        return result.get("code") == 0 or (isinstance(data, dict) and data.get("errno") == 0)
+
+
+@register_channel
+class WXPusherNotifier(Notifier):
+    name = "wxpusher"
+    # content 上限约 40000 字符，按字节计留出余量
+    max_bytes = 38000
+    max_parts = 4
+    # 每个请求携带的 uid / topicId 数量上限，分批发送，单批失败只重试该批
+    batch_size = 500
+
+    def __init__(self, session=None, retries=RETRIES):
+        super().__init__(session, retries)
         self.app_token = os.getenv("WXPUSHER_APP_TOKEN")
         self.uids = [u for u in os.getenv("WXPUSHER_UIDS", "").split(",") if u]
         self.topic_ids = [t for t in os.getenv("WXPUSHER_TOPIC_IDS", "").split(",") if t]
-        self.api_url = "https://wxpusher.zjiecode.com/api/send/message"
+        self.api_url = os.getenv("WXPUSHER_API_URL", "https://wxpusher.zjiecode.com/api/send/message")
+
+    def configured(self):
+        return bool(self.app_token and (self.uids or self.topic_ids))
+
+    def build_requests(self, content, title):
+        size = self.batch_size
+        batches = [{"uids": self.uids[i:i + size], "topicIds": []} for i in range(0, len(self.uids), size)]
+        batches += [{"uids": [], "topicIds": self.topic_ids[i:i + size]} for i in range(0, len(self.topic_ids), size)]
+        return [
+            {
+                "url": self.api_url,
+                "json": {
+                    "appToken": self.app_token,
+                    "content": content,
+                    "summary": title,
+                    "contentType": 3,
+                    **batch,
+                },
+            }
+            for batch in batches
+        ]
+
+    def accepted(self, result):
+        return isinstance(result, dict) and result.get("code") == 1000
 
-    def send(self, content, summary="LLM Trend Observer Report"):
-        if not self.app_token:
-            return False
-        if not self.uids and not self.topic_ids:
-            return False
-        payload = {
-            "appToken": self.app_token,
-            "content": content,
-            "summary": summary,
-            "contentType": 3,
-            "uids": self.uids,
-            "topicIds": self.topic_ids
-        }
-        try:
-            response = requests.post(self.api_url, json=payload, timeout=10)
-            result = response.json()
-            if result.get("code") == 1000:
-                print(f"Success: Sent via WXPusher.")
-                return True
-            print(f"Error: WXPusher failed: {result}")
-        except Exception as e:
-            print(f"Error: WXPusher exception: {e}")
-        return False
 
 class HubNotifier:
-    def __init__(self):
-        self.notifiers = []
-        if os.getenv("SERVERCHAN_SENDKEY"):
-            self.notifiers.append(ServerChanNotifier())
-        if os.getenv("WXPUSHER_APP_TOKEN"):
-            self.notifiers.append(WXPusherNotifier())
+    """
+    Fans a report out to every configured channel concurrently, each over
+    its own pooled session. The HTTP calls are blocking; the async methods
+    run each channel's sends in a worker thread (asyncio.to_thread), so the
+    channels overlap without blocking the event loop. Messages of one
+    channel go out in order; `outcomes` holds the result, error, attempts
+    and latency of each channel.
+    """
 
-    def send_all(self, content, title="LLM Trend Observer Report"):
-        results = []
-        for n in self.notifiers:
-            results.append(n.send(content, title))
-        return any(results)
+    def __init__(self, channels=None):
+        names = CHANNELS if channels is None else channels
+        candidates = [CHANNELS[name]() for name in names]
+        self.notifiers = [n for n in candidates if n.configured()]
+        self.outcomes = {}
 
+    def send_messages(self, notifier, messages, done=0):
+        """
+        Send [(title, content)] through one notifier in order, stopping at the
+        first failure. `done` requests of the first message were already
+        delivered; "done" in the result counts those of the message that failed.
+        """
+        start = time.perf_counter()
+        attempts, sent = 0, 0
+        outcome = {"result": True, "error": None, "done": 0}
+        for title, content in messages:
+            outcome = notifier.deliver(content, title, done)
+            attempts += outcome["attempts"]
+            if not outcome["result"]:
+                break
+            sent += 1
+            done = 0
+        return {
+            "result": outcome["result"],
+            "error": outcome["error"],
+            "attempts": attempts,
+            "messages": len(messages),
+            "sent": sent,
+            "done": 0 if outcome["result"] else outcome["done"],
+            "latency": round(time.perf_counter() - start, 2),
+        }
+
+    @staticmethod
+    def log_outcome(name, outcome):
+        state = "ok" if outcome["result"] else f"failed ({outcome['error']})"
+        print(
+            f"[{name}] {state}: {outcome['sent']}/{outcome['messages']} message(s), "
+            f"{outcome['attempts']} request(s), {outcome['latency']}s"
+        )
+
+    async def deliver(self, messages_for):
+        """
+        Send messages_for(notifier) -> [(title, content)] on all channels at
+        once, one worker thread per channel; True if any succeeded.
+        """
+        outcomes = await asyncio.gather(*(
+            asyncio.to_thread(self.send_messages, n, messages_for(n)) for n in self.notifiers
+        ))
+        self.outcomes = {n.name: outcome for n, outcome in zip(self.notifiers, outcomes)}
+        for name, outcome in self.outcomes.items():
+            self.log_outcome(name, outcome)
+        return any(outcome["result"] for outcome in outcomes)
 
+    async def send_report_async(self, payloads, title="LLM Trend Observer Report"):
+        """Send a PayloadBuilder's messages, sized per channel; a channel succeeds when all its parts do."""
+        return await self.deliver(lambda n: payloads.messages(title, n.max_bytes, n.max_parts))
+
+    def send_report(self, payloads, title="LLM Trend Observer Report"):
+        return asyncio.run(self.send_report_async(payloads, title))
+
+    def send_all(self, content, title="LLM Trend Observer Report"):
+        return asyncio.run(self.deliver(lambda n: [(title, content)]))
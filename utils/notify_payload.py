@@ -0,0 +1,125 @@
+"""
+Notification payloads that fit each channel's size limit.
+
+PayloadBuilder works from the report model and the Markdown parts that
+ReportGenerator already rendered, never from the file on disk. For a
+channel with a byte budget and a maximum number of messages, messages()
+tries in order:
+
+1. the full report as one message;
+2. the full report split into ordered parts, each within the budget
+   (tables cut at row boundaries repeat their header);
+3. a compact digest: header, source status, highlights and each table's
+   top entries;
+4. a link to the archived report plus a plain-text summary, truncated to
+   the budget.
+"""
+import os
+
+from report_renderers import DigestRenderer
+
+
+DIGEST_TOP = 3
+# 报告链接：优先使用 REPORT_URL，其次在 GitHub Actions 中拼出仓库内的报告地址
+REPORT_URL_ENV = "REPORT_URL"
+
+
+def byte_size(text):
+    return len(text.encode("utf-8"))
+
+
+def truncate_bytes(text, budget, suffix="…"):
+    """`text` cut to at most `budget` UTF-8 bytes, on a character boundary."""
+    if byte_size(text) <= budget:
+        return text
+    keep = max(budget - byte_size(suffix), 0)
+    return text.encode("utf-8")[:keep].decode("utf-8", errors="ignore") + suffix
+
+
+def report_link(report_path):
+    """URL of the archived report, or None outside GitHub Actions without REPORT_URL."""
+    if os.getenv(REPORT_URL_ENV):
+        return os.getenv(REPORT_URL_ENV)
+    repository = os.getenv("GITHUB_REPOSITORY")
+    if not repository or not report_path:
+        return None
+    server = os.getenv("GITHUB_SERVER_URL", "https://github.com")
+    ref = os.getenv("GITHUB_REF_NAME", "main")
+    path = os.path.relpath(report_path).replace(os.sep, "/")
+    return f"{server}/{repository}/blob/{ref}/{path}"
+
+
+def _split_part(md, budget):
+    # 超出预算的单个部分按行切开；表格的续段重复表头两行
+    lines = md.splitlines(keepends=True)
+    table_start = next((i for i, line in enumerate(lines) if line.startswith("|")), None)
+    header = "".join(lines[table_start:table_start + 2]) if table_start is not None else ""
+
+    pieces, current = [], ""
+    for i, line in enumerate(lines):
+        line = truncate_bytes(line, budget - byte_size(header))
+        if current and byte_size(current) + byte_size(line) > budget:
+            pieces.append(current)
+            current = header if table_start is not None and i > table_start + 1 else ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_parts(parts, budget):
+    """Pack [(name, Markdown)] in order into messages of at most `budget` bytes."""
+    chunks, current = [], ""
+    for _, md in parts:
+        pieces = [md] if byte_size(md) <= budget else _split_part(md, budget)
+        for piece in pieces:
+            if current and byte_size(current) + byte_size(piece) > budget:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class PayloadBuilder:
+    def __init__(self, report, parts, link=None, top=DIGEST_TOP):
+        self.report = report
+        self.parts = parts
+        self.link = link
+        self.top = top
+        self.full = "".join(md for _, md in parts)
+
+    def digest(self):
+        """Compact Markdown: header, status and highlights as rendered, plus each table's top entries."""
+        rendered = dict(self.parts)
+        lines = [rendered.get(name, "") for name in ("header", "status", "highlights")]
+        lines.append(f"## 📋 各榜前 {self.top} 名\n\n")
+        for section in self.report.sections:
+            top = ", ".join(f"{row.idx}. `{row.model_id}`" for row in section.rows[:self.top])
+            lines.append(f"- **{section.title}**: {top}\n")
+        if self.link:
+            lines.append(f"\n[📄 查看完整报告]({self.link})\n")
+        return "".join(lines)
+
+    def summary(self, budget):
+        """Link plus the plain-text digest, within `budget` bytes."""
+        head = f"[📄 完整报告]({self.link})\n\n" if self.link else ""
+        # 两个渠道都按 Markdown 渲染，纯文本摘要逐行空行分隔以免被合并成一段
+        text = DigestRenderer(self.top).render(self.report).replace("\n", "\n\n")
+        return head + truncate_bytes(text, budget - byte_size(head))
+
+    def messages(self, title, max_bytes, max_parts=1):
+        """[(title, content)] for one channel, each content at most `max_bytes` bytes."""
+        if byte_size(self.full) <= max_bytes:
+            return [(title, self.full)]
+
+        if max_parts > 1:
+            chunks = chunk_parts(self.parts, max_bytes)
+            if len(chunks) <= max_parts:
+                return [(f"{title} ({i}/{len(chunks)})", chunk) for i, chunk in enumerate(chunks, 1)]
+
+        digest = self.digest()
+        if byte_size(digest) <= max_bytes:
+            return [(title, digest)]
+        return [(title, self.summary(max_bytes))]
@@ -0,0 +1,145 @@
+"""
+Durable notification outbox.
+
+Every notification is first written to data/notify_outbox.json: one entry
+per channel with a reference to its payload file under data/outbox/
+(the ordered [(title, content)] messages built for that channel), the
+number of messages already delivered, how many requests of the next
+message went out (a WXPusher message is sent in recipient batches), the
+attempts so far and the last error. drain() sends pending entries, oldest
+first, resuming after the last delivered batch, so no recipient gets a
+message twice; delivered entries and their payload files are removed. An
+entry that failed MAX_ATTEMPTS drains stays in the file, marked "failed",
+until it is retried by hand (notify.py --drain --retry-failed).
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+
+
+OUTBOX_FILE = "data/notify_outbox.json"
+PAYLOAD_DIR = "data/outbox"
+MAX_ATTEMPTS = 5
+
+
+class Outbox:
+    def __init__(self, outbox_file=OUTBOX_FILE, payload_dir=PAYLOAD_DIR):
+        self.outbox_file = outbox_file
+        self.payload_dir = payload_dir
+        self.entries = self._load()
+
+    def _load(self):
+        if os.path.exists(self.outbox_file):
+            try:
+                with open(self.outbox_file, "r", encoding="utf-8-sig") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read {self.outbox_file}: {e}")
+        return []
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.outbox_file) or ".", exist_ok=True)
+        with open(self.outbox_file, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, ensure_ascii=False)
+
+    def pending(self, include_failed=False):
+        states = ("pending", "failed") if include_failed else ("pending",)
+        return [entry for entry in self.entries if entry["status"] in states]
+
+    def add(self, channel, messages, report=None, created_at=None):
+        """Record one channel's [(title, content)] messages; returns the new entry."""
+        created_at = created_at or datetime.now().isoformat(timespec="seconds")
+        entry_id = f"{created_at.replace('-', '').replace(':', '').replace('T', '_')}_{channel}"
+        payload = os.path.join(self.payload_dir, f"{entry_id}.json").replace(os.sep, "/")
+        os.makedirs(self.payload_dir, exist_ok=True)
+        with open(payload, "w", encoding="utf-8") as f:
+            json.dump([list(message) for message in messages], f, ensure_ascii=False)
+
+        entry = {
+            "id": entry_id,
+            "channel": channel,
+            "report": report,
+            "payload": payload,
+            "created_at": created_at,
+            "messages": len(messages),
+            "sent": 0,
+            "batches": 0,
+            "attempts": 0,
+            "last_error": None,
+            "status": "pending",
+        }
+        self.entries.append(entry)
+        self.save()
+        return entry
+
+    def enqueue_report(self, hub, payloads, title, report=None):
+        """One entry per configured channel, with messages sized by PayloadBuilder."""
+        return [
+            self.add(n.name, payloads.messages(title, n.max_bytes, n.max_parts), report)
+            for n in hub.notifiers
+        ]
+
+    def _messages(self, entry):
+        with open(entry["payload"], "r", encoding="utf-8") as f:
+            return [tuple(message) for message in json.load(f)]
+
+    def _record(self, entry, outcome):
+        entry["attempts"] += 1
+        entry["sent"] += outcome["sent"]
+        entry["batches"] = outcome["done"]
+        if outcome["result"]:
+            entry["status"] = "sent"
+            entry["last_error"] = None
+        else:
+            entry["last_error"] = outcome["error"]
+            entry["status"] = "failed" if entry["attempts"] >= MAX_ATTEMPTS else "pending"
+
+    def _drain_channel(self, hub, notifier, entries):
+        # 同一渠道按创建顺序发送；某条失败时其后的条目留到下次，保持先后顺序
+        for entry in entries:
+            done = entry.get("batches", 0)
+            try:
+                messages = self._messages(entry)[entry["sent"]:]
+            except (OSError, ValueError) as e:
+                outcome = {"result": False, "error": f"payload unreadable: {e}", "sent": 0, "done": done}
+            else:
+                try:
+                    outcome = hub.send_messages(notifier, messages, done)
+                    hub.log_outcome(f"{entry['channel']} {entry['id']}", outcome)
+                except Exception as e:
+                    # 单条出错只记入该条目，不影响其他渠道，也不丢失已记录的进度
+                    print(f"Warning: {entry['channel']} {entry['id']} failed: {e!r}")
+                    outcome = {"result": False, "error": repr(e), "sent": 0, "done": done}
+            self._record(entry, outcome)
+            if not outcome["result"]:
+                break
+
+    async def drain(self, hub, include_failed=False):
+        """Deliver pending entries through `hub`; returns (delivered, still pending)."""
+        notifiers = {n.name: n for n in hub.notifiers}
+        by_channel = {}
+        for entry in self.pending(include_failed):
+            if entry["channel"] not in notifiers:
+                print(f"Warning: channel {entry['channel']} is not configured; keeping {entry['id']} pending.")
+                continue
+            by_channel.setdefault(entry["channel"], []).append(entry)
+
+        try:
+            # 各渠道并发，渠道内串行
+            results = await asyncio.gather(*(
+                asyncio.to_thread(self._drain_channel, hub, notifiers[channel], entries)
+                for channel, entries in by_channel.items()
+            ), return_exceptions=True)
+            for channel, result in zip(by_channel, results):
+                if isinstance(result, Exception):
+                    print(f"Warning: draining {channel} failed: {result!r}")
+        finally:
+            # 无论发送是否出错，都保存已记录的尝试次数与进度
+            delivered = [entry for entry in self.entries if entry["status"] == "sent"]
+            self.entries = [entry for entry in self.entries if entry["status"] != "sent"]
+            self.save()
+        for entry in delivered:
+            if os.path.exists(entry["payload"]):
+                os.remove(entry["payload"])
+        return len(delivered), len(self.pending())
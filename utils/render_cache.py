@@ -0,0 +1,55 @@
+import json
+import os
+
+from utils.fetch_cache import payload_hash
+
+
+RENDER_CACHE_FILE = "data/render_cache.json"
+
+
+def section_key(*inputs):
+    """Hash of everything a section's Markdown depends on; volatile fields such as timestamps are ignored."""
+    return payload_hash(list(inputs))
+
+
+class RenderCache:
+    """
+    Rendered report sections keyed by the hash of their inputs, kept across
+    runs. save() keeps only the sections used by the latest report, so the
+    file stays the size of one report.
+    """
+
+    def __init__(self, cache_file=RENDER_CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries = self._load()
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r", encoding="utf-8-sig") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def render(self, key, build):
+        """Cached Markdown for `key`, calling build() only on a miss."""
+        if key in self.used:
+            return self.used[key]
+        if key in self.entries:
+            self.hits += 1
+            md = self.entries[key]
+        else:
+            self.misses += 1
+            md = build()
+        self.used[key] = md
+        return md
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        with open(self.cache_file, "w", encoding="utf-8") as f:
+            json.dump(self.used, f, ensure_ascii=False)
+        self.entries = dict(self.used)
@@ -0,0 +1,237 @@
+"""
+Inverted index over the reports archive: model -> every table it appeared in.
+
+    python -m utils.report_index update
+    python -m utils.report_index first "Claude Opus 4.6" [--key artalanaly_Speed]
+    python -m utils.report_index history claude-opus-4-6 --key lmsys_WebDev [--since 2026-08-01]
+    python -m utils.report_index days kimi-k3 --key lmsys_WebDev
+
+Each mention is (model, source/category key, report run time, rank, delta).
+It is stored in SQLite and indexed by model ID, by canonical model ID
+(utils.model_identity) and by key, so a query does not depend on how many
+reports exist. update() only parses reports that are new or modified since
+the last update; ReportGenerator.generate() indexes each new report
+directly from its report model. The database is not committed; every
+command first updates it from the reports, so a fresh checkout rebuilds it.
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import time
+
+from report_model import STALE_STATES
+from utils.report_parser import parse_report, rank_field, report_run_at
+
+
+REPORT_INDEX_DB = "data/report_index.db"
+REPORTS_DIR = "reports"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    name TEXT PRIMARY KEY,
+    run_at TEXT NOT NULL,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS mentions (
+    report TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    key TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    canonical_id TEXT,
+    rank INTEGER,
+    delta TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mentions_model ON mentions (model_id, key, run_at);
+CREATE INDEX IF NOT EXISTS idx_mentions_canonical ON mentions (canonical_id, key, run_at);
+CREATE INDEX IF NOT EXISTS idx_mentions_key ON mentions (key, run_at);
+CREATE INDEX IF NOT EXISTS idx_mentions_report ON mentions (report);
+"""
+
+
+def _file_fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class ReportIndex:
+    def __init__(self, db_file=REPORT_INDEX_DB, identity=None):
+        self.db_file = db_file
+        # 可选的 ModelIdentity，用于按规范 ID 跨来源查询
+        self.identity = identity
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _canonical(self, model_id):
+        return self.identity.resolve(model_id) if self.identity is not None else None
+
+    def add(self, name, run_at, mentions, fingerprint=None):
+        """
+        (Re)index one report: mentions are (key, model_id, rank, delta).
+        Re-adding the same report name replaces its mentions.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM mentions WHERE report = ?", (name,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reports (name, run_at, fingerprint) VALUES (?, ?, ?)",
+                (name, run_at, fingerprint),
+            )
+            self.conn.executemany(
+                "INSERT INTO mentions (report, run_at, key, model_id, canonical_id, rank, delta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (name, run_at, key, model_id, self._canonical(model_id), rank, delta)
+                    for key, model_id, rank, delta in mentions
+                ],
+            )
+
+    def add_report(self, report, path):
+        """Index a report_model.Report written to `path`; stale sections (STALE_STATES) are skipped as in update()."""
+        stale = {status.source for status in report.statuses or [] if status.state in STALE_STATES}
+        # 与 update() 解析 Markdown 一致：排名取报告排名列显示的值（OpenRouter 为行号）
+        mentions = [
+            (section.key, row.model_id, getattr(row, rank_field(section.columns) or "rank"), row.delta)
+            for section in report.sections
+            if section.source not in stale
+            for row in section.rows
+        ]
+        run_at = report.generated_at.isoformat(timespec="seconds")
+        self.add(os.path.basename(path), run_at, mentions, _file_fingerprint(path))
+        return len(mentions)
+
+    def update(self, specs, reports_dir=REPORTS_DIR):
+        """Index report_*.md files that are new or changed since the last update."""
+        known = dict(self.conn.execute("SELECT name, fingerprint FROM reports"))
+        indexed = 0
+        for path in sorted(glob.glob(os.path.join(reports_dir, "report_*.md"))):
+            run_at = report_run_at(path)
+            name = os.path.basename(path)
+            fingerprint = _file_fingerprint(path)
+            if run_at is None or known.get(name) == fingerprint:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                snapshots = parse_report(f.read(), specs, keep_delta=True)
+            mentions = [
+                (key, item["model_id"], item["rank"], item.get("delta"))
+                for key, items in snapshots.items()
+                for item in items
+            ]
+            self.add(name, run_at, mentions, fingerprint)
+            indexed += 1
+        return indexed
+
+    def _model_clause(self, model):
+        # 先按原始 model_id 精确匹配；查不到时按规范 ID 匹配所有别名
+        if self.conn.execute("SELECT 1 FROM mentions WHERE model_id = ? LIMIT 1", (model,)).fetchone():
+            return "model_id = ?", model
+        canonical = self._canonical(model)
+        if canonical is not None:
+            return "canonical_id = ?", canonical
+        return "model_id = ?", model
+
+    def mentions(self, model, key=None, since=None, until=None):
+        """[(run_at, key, model_id, rank, delta)] in time order."""
+        clause, value = self._model_clause(model)
+        query = f"SELECT run_at, key, model_id, rank, delta FROM mentions WHERE {clause}"
+        params = [value]
+        if key is not None:
+            query += " AND key = ?"
+            params.append(key)
+        if since is not None:
+            query += " AND run_at >= ?"
+            params.append(since)
+        if until is not None:
+            # 只给日期时包含当天
+            query += " AND run_at <= ?"
+            params.append(until if "T" in until else f"{until}T23:59:59")
+        query += " ORDER BY run_at, key, rank"
+        return self.conn.execute(query, params).fetchall()
+
+    def first_seen(self, model, key=None):
+        """(run_at, key, model_id, rank, delta) of the earliest mention, or None."""
+        clause, value = self._model_clause(model)
+        query = f"SELECT run_at, key, model_id, rank, delta FROM mentions WHERE {clause}"
+        params = [value]
+        if key is not None:
+            query += " AND key = ?"
+            params.append(key)
+        return self.conn.execute(query + " ORDER BY run_at, rank LIMIT 1", params).fetchone()
+
+    def days(self, model, key=None):
+        """Dates on which the model was in a report table (under `key` if given)."""
+        return sorted({run_at[:10] for run_at, *_ in self.mentions(model, key)})
+
+    def keys(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT key FROM mentions ORDER BY key")]
+
+
+def _print_mentions(rows):
+    for run_at, key, model_id, rank, delta in rows:
+        print(f"{run_at}  {key:<28} #{rank:<3} {delta or '-':<5} {model_id}")
+
+
+def main():
+    from scrapers.registry import available_sources, load_source
+    from utils.model_identity import ModelIdentity
+
+    parser = argparse.ArgumentParser(description="Query the reports archive index.")
+    parser.add_argument("--db", default=REPORT_INDEX_DB)
+    parser.add_argument("--reports", default=REPORTS_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("update", help="index new or changed reports")
+    commands.add_parser("keys", help="list indexed source/category keys")
+    for command, text in (
+        ("first", "first appearance of a model"),
+        ("history", "every mention of a model"),
+        ("days", "dates a model was in a table"),
+    ):
+        sub = commands.add_parser(command, help=text)
+        sub.add_argument("model", help="model ID as a source wrote it, or any alias")
+        sub.add_argument("--key", help="source or source_category, e.g. lmsys_WebDev")
+        if command == "history":
+            sub.add_argument("--since")
+            sub.add_argument("--until")
+    args = parser.parse_args()
+
+    identity = ModelIdentity()
+    index = ReportIndex(args.db, identity)
+    start = time.perf_counter()
+    # 查询前先补上新增或修改过的报告；已索引的报告不会重复解析
+    specs = [load_source(name) for name in available_sources()]
+    indexed = index.update(specs, args.reports)
+    identity.save()
+    if args.command == "update" or indexed:
+        print(f"Indexed {indexed} reports in {time.perf_counter() - start:.2f}s.")
+
+    start = time.perf_counter()
+    if args.command == "keys":
+        print("\n".join(index.keys()))
+    elif args.command == "first":
+        row = index.first_seen(args.model, args.key)
+        if row is None:
+            print(f"{args.model} not found.")
+        else:
+            _print_mentions([row])
+    elif args.command == "history":
+        _print_mentions(index.mentions(args.model, args.key, args.since, args.until))
+    elif args.command == "days":
+        print("\n".join(index.days(args.model, args.key)))
+    if args.command != "update":
+        print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Parse generated Markdown reports back into ranking snapshots.
+
+Section headings and table columns are matched against each source's
+SectionStyle, so reports written before or after a layout tweak parse the
+same way as long as the heading template and column order still match.
+"""
+import re
+from datetime import datetime
+
+from report_model import STALE_STATES, STATUS_TEXT
+
+PLACEHOLDER = re.compile(r"\\\{(\w+)\\\}")
+FIELD = re.compile(r"\{(\w+)(?:\[(\w+)\])?\}")
+REPORT_NAME = re.compile(r"report_(\d{8}_\d{6})\.md$")
+# 数据源状态区中 STALE_STATES 各状态的图标，标出不代表当次运行数据的来源
+STALE_STATUS = re.compile(
+    "^- (?:{}) (.+?): ".format("|".join(sorted({re.escape(STATUS_TEXT[state][0]) for state in STALE_STATES})))
+)
+
+
+def report_run_at(path):
+    """report_YYYYMMDD_HHMMSS.md -> ISO run time, or None."""
+    match = REPORT_NAME.search(path)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat(timespec="seconds")
+
+
+def _title_pattern(style):
+    pattern = PLACEHOLDER.sub(lambda m: f"(?P<{m.group(1)}>.+?)", re.escape(style.title))
+    return re.compile(f"^## {pattern}$")
+
+
+def _column_fields(style, keep_delta=False):
+    # 每列模板对应的字段："rank"、"model_id"、"score"、"delta"、原始字段名，或 None（不需要的列）
+    fields = []
+    for _, template in style.columns:
+        match = FIELD.search(template)
+        if match is None or (match.group(1) == "delta" and not keep_delta):
+            fields.append(None)
+        elif match.group(1) in ("idx", "rank"):
+            fields.append("rank")
+        elif match.group(1) == "raw":
+            fields.append(match.group(2))
+        else:
+            fields.append(match.group(1))
+    return fields
+
+
+def rank_field(columns):
+    """Row field shown in the rank column ("idx" for a row number, "rank" for the source's rank), or None."""
+    for _, template in columns:
+        match = FIELD.search(template)
+        if match is not None and match.group(1) in ("idx", "rank"):
+            return match.group(1)
+    return None
+
+
+def _resolve_category(style, groups):
+    if groups.get("category"):
+        return groups["category"]
+    label = groups.get("category_label")
+    if label is None:
+        return None
+    for category, known in style.category_labels.items():
+        # 旧版标题带单位后缀，如 "吞吐速度 (Tokens/s)"
+        if label == known or label.startswith(f"{known} "):
+            return category
+    return None
+
+
+def _strip_markup(cell):
+    cell = cell.strip()
+    for mark in ("**", "`"):
+        if len(cell) >= 2 * len(mark) and cell.startswith(mark) and cell.endswith(mark):
+            cell = cell[len(mark):-len(mark)]
+    return cell
+
+
+def plain_delta(cell):
+    """'🟢 ↑2' / '🆕 **New**' / '⚪ -' -> '↑2' / 'New' / '-'."""
+    parts = cell.replace("**", "").split()
+    return parts[-1] if parts else "-"
+
+
+def split_row(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def iter_sections(text):
+    """Yield (heading, table rows as cell lists) for every `## ` section."""
+    heading, rows = None, []
+    for line in text.splitlines():
+        if line.startswith("## "):
+            if heading is not None:
+                yield heading, rows
+            heading, rows = line.strip(), []
+        elif heading is not None and line.startswith("|"):
+            cells = split_row(line)
+            if all(set(cell) <= set(":- ") for cell in cells):
+                continue
+            rows.append(cells)
+    if heading is not None:
+        yield heading, rows
+
+
+def stale_labels(text):
+    return {match.group(1) for match in map(STALE_STATUS.match, text.splitlines()) if match}
+
+
+def parse_report(text, specs, keep_delta=False):
+    """
+    {history key: [items]} for every section of `specs` found in the report,
+    skipping sources the report marks as stale (report_model.STALE_STATES).
+    With keep_delta each item also gets the report's `delta` ('↑2', 'New', '-').
+    """
+    matchers = [(_title_pattern(spec.section), spec) for spec in specs]
+    stale = stale_labels(text)
+    snapshots = {}
+
+    for heading, rows in iter_sections(text):
+        for pattern, spec in matchers:
+            match = pattern.match(heading)
+            if match is None:
+                continue
+            if spec.label in stale:
+                break
+
+            if spec.multi_category:
+                category = _resolve_category(spec.section, match.groupdict())
+                if category is None:
+                    break
+                key = f"{spec.name}_{category}"
+            else:
+                key = spec.name
+
+            fields = _column_fields(spec.section, keep_delta)
+            items = []
+            # 第一行是表头
+            for cells in rows[1:]:
+                item = {
+                    field: _strip_markup(cell)
+                    for field, cell in zip(fields, cells)
+                    if field is not None
+                }
+                if "delta" in item:
+                    item["delta"] = plain_delta(item["delta"])
+                try:
+                    item["rank"] = int(item["rank"])
+                except (KeyError, ValueError):
+                    continue
+                if item.get("model_id"):
+                    items.append(item)
+            if items:
+                snapshots[key] = items
+            break
+
+    return snapshots
@@ -0,0 +1,126 @@
+import json
+import os
+
+
+STATUS_FILE = "data/source_status.json"
+
+
+def _load_json(file_path):
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+class RunContext:
+    """
+    State of one pipeline run shared between stages: each source's payload,
+    the scrape statuses, the DeltaEngine and the model identity index.
+    Scrapers hand their payloads over in memory; `*_current.json` and
+    `source_status.json` are only written by persist() at the end of the
+    run, as the durable record.
+    """
+
+    def __init__(
+        self, sources=(), payloads=None, statuses=None, engine=None, identity=None, status_file=STATUS_FILE
+    ):
+        self.sources = list(sources)
+        self.payloads = dict(payloads or {})
+        self.statuses = dict(statuses or {})
+        self.status_file = status_file
+        self._engine = engine
+        self._identity = identity
+        # 已补上 canonical_id 的来源
+        self._annotated = set()
+        # 本次抓取到、内容有变化、需在 persist() 时写盘的来源
+        self._dirty = set()
+
+    @property
+    def engine(self):
+        # 整个运行只解析一次历史
+        if self._engine is None:
+            from compare import DeltaEngine
+
+            self._engine = DeltaEngine()
+        return self._engine
+
+    @property
+    def identity(self):
+        if self._identity is None:
+            from utils.model_identity import ModelIdentity
+
+            self._identity = ModelIdentity()
+        return self._identity
+
+    def stage(self, source_name, payload, changed=True):
+        """Keep a scraper's payload for this run; `changed` ones are written by persist()."""
+        self.payloads[source_name] = payload
+        self._annotated.discard(source_name)
+        if changed:
+            self._dirty.add(source_name)
+        else:
+            self._dirty.discard(source_name)
+
+    def _spec(self, source_name):
+        return next((spec for spec in self.sources if spec.name == source_name), None)
+
+    def has_payload(self, source_name):
+        if source_name in self.payloads:
+            return True
+        spec = self._spec(source_name)
+        return spec is not None and os.path.exists(spec.output_file)
+
+    def payload(self, spec):
+        """
+        This run's payload of `spec`, or None. A failed source has none (the
+        report falls back to history); an unchanged source that did not
+        re-extract its payload (e.g. HTTP 304) reuses the last `*_current.json`.
+        Items get a `canonical_id` shared across sources on first access.
+        """
+        status = self.statuses.get(spec.name)
+        if status is not None and not status.get("success"):
+            return None
+        if spec.name not in self.payloads:
+            if not os.path.exists(spec.output_file):
+                return None
+            self.payloads[spec.name] = _load_json(spec.output_file)
+        if spec.name not in self._annotated:
+            self.identity.annotate(self.payloads[spec.name])
+            self._annotated.add(spec.name)
+        return self.payloads[spec.name]
+
+    def history_updates(self):
+        """{history key: items} of every source that changed this run."""
+        updates = {}
+        for spec in self.sources:
+            status = self.statuses.get(spec.name, {})
+            # 未变化的来源与历史快照一致，无需重写
+            if not status.get("success") or status.get("unchanged"):
+                continue
+            data = self.payload(spec)
+            if data is not None:
+                updates.update(spec.history_keys(data))
+        return updates
+
+    def persist(self):
+        """
+        Write changed `*_current.json` files, source_status.json and the
+        alias table; drop failed sources' files.
+        """
+        for spec in self.sources:
+            status = self.statuses.get(spec.name, {})
+            if not status.get("success"):
+                # 失败的来源删除旧文件，下次运行的报告改用历史数据
+                if os.path.exists(spec.output_file):
+                    os.remove(spec.output_file)
+                continue
+            if spec.name not in self._dirty:
+                continue
+            os.makedirs(os.path.dirname(spec.output_file) or ".", exist_ok=True)
+            with open(spec.output_file, "w", encoding="utf-8") as f:
+                json.dump(self.payloads[spec.name], f, indent=4, ensure_ascii=False)
+        self._dirty.clear()
+
+        os.makedirs(os.path.dirname(self.status_file) or ".", exist_ok=True)
+        with open(self.status_file, "w", encoding="utf-8") as f:
+            json.dump(self.statuses, f, indent=4, ensure_ascii=False)
+        if self._identity is not None:
+            self._identity.save()
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import threading
+
+
+class CancelToken:
+    """
+    Cancellation flag of one attempt whose blocking work runs in a thread.
+    Cancelling the awaiting task cannot stop the thread, so the thread runs
+    its side effects (staging results) through run(), which does nothing
+    once the attempt is cancelled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+
+    def run(self, func, *args, **kwargs):
+        """func(*args, **kwargs), or None if cancelled; the check and the call are atomic with cancel()."""
+        with self._lock:
+            if self.cancelled:
+                return None
+            return func(*args, **kwargs)
+
+
+async def run_cancellable(func, **kwargs):
+    """Run blocking func(cancel_token=..., **kwargs) in a thread; cancelling this coroutine cancels the token."""
+    token = CancelToken()
+    try:
+        return await asyncio.to_thread(func, cancel_token=token, **kwargs)
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+
+
+class ScraperScheduler:
+    """
+    Run scraper jobs with bounded concurrency, a deadline per source, retries
+    with jittered exponential backoff and an optional hedged second attempt.
+
+    A job is a zero-argument callable returning a fresh awaitable, so every
+    attempt starts from scratch. A falsy result or an exception counts as a
+    failed attempt.
+    """
+
+    def __init__(
+        self,
+        concurrency=4,
+        deadlines=None,
+        default_deadline=240.0,
+        retries=2,
+        backoff_base=2.0,
+        backoff_cap=30.0,
+        hedge_after=None,
+    ):
+        self.concurrency = concurrency
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # {source: 秒数}：首个尝试超过该时长仍未结束时，并行发起第二个尝试
+        self.hedge_after = hedge_after or {}
+
+    def _backoff(self, attempt):
+        # full jitter: [0, min(cap, base * 2^(n-1))]
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def run(self, jobs):
+        slots = asyncio.Semaphore(self.concurrency)
+        names = list(jobs)
+        outcomes = await asyncio.gather(*(self._run_job(name, jobs[name], slots) for name in names))
+        return dict(zip(names, outcomes))
+
+    async def _run_job(self, name, job, slots):
+        loop = asyncio.get_running_loop()
+        async with slots:
+            start = loop.time()
+            deadline = start + self.deadlines.get(name, self.default_deadline)
+            attempt_log = []
+            result, error = None, None
+
+            for attempt in range(1, self.retries + 2):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    error = error or f"deadline of {self.deadlines.get(name, self.default_deadline)}s exceeded"
+                    break
+
+                result, error = await self._attempt(name, job, remaining, attempt_log)
+                if result:
+                    break
+
+                remaining = deadline - loop.time()
+                if attempt <= self.retries and remaining > 0:
+                    delay = min(self._backoff(attempt), remaining)
+                    print(f"[{name}] attempt {attempt} failed ({error}); retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+
+            return {
+                "result": result,
+                "error": None if result else error,
+                "attempts": len(attempt_log),
+                "latency": round(loop.time() - start, 2),
+                "attempt_log": attempt_log,
+            }
+
+    async def _attempt(self, name, job, remaining, attempt_log):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def launch(hedged):
+            task = asyncio.ensure_future(job())
+            started[task] = (loop.time(), hedged)
+            return task
+
+        pending = {launch(hedged=False)}
+        hedge_after = self.hedge_after.get(name)
+        end = loop.time() + remaining
+        result, error = None, "no result"
+
+        try:
+            if hedge_after is not None and hedge_after < remaining:
+                done, pending = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    print(f"[{name}] first attempt still running after {hedge_after}s; starting hedged attempt.")
+                    pending.add(launch(hedged=True))
+                else:
+                    pending |= done
+
+            while pending:
+                timeout = end - loop.time()
+                if timeout <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result, error = self._record(task, started, attempt_log)
+                    if result:
+                        return result, None
+                if not done:
+                    break
+
+            if pending:
+                error = "deadline exceeded"
+            return result, error
+        finally:
+            for task in pending:
+                task.cancel()
+                begun, hedged = started[task]
+                attempt_log.append({
+                    "latency": round(loop.time() - begun, 2),
+                    "outcome": "cancelled" if result else "timeout",
+                    "hedged": hedged,
+                })
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _record(self, task, started, attempt_log):
+        loop = asyncio.get_running_loop()
+        begun, hedged = started[task]
+        entry = {"latency": round(loop.time() - begun, 2), "hedged": hedged}
+        try:
+            result = task.result()
+        except Exception as e:
+            entry["outcome"] = "error"
+            attempt_log.append(entry)
+            return None, repr(e)
+
+        entry["outcome"] = "ok" if result else "failed"
+        attempt_log.append(entry)
+        return result, None if result else "scraper returned no data"